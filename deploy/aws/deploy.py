@@ -1,14 +1,90 @@
+from deploy_lambda import save_profile
 from deploy_lambda import LambdaDeployHelper
 from deploy_rest_api import RestApiDeployHelper
 from deploy_step_function import StepFuncDeployHelper
-from deploy_schedules import ScheduleDeployHelper
+from deploy_eventbridge import ScheduleDeployHelper
+
+import settings
+from utils import dag_utils
+from utils import common_utils
+from utils import stepfunc_utils
+
+
+class DeployScheduler:
+    """Deploy the whole app in one process, as a dependency graph derived from the template.
+
+        lambda -> stepfunc     (functions called by the state machine definition)
+        lambda -> rest-api     (functions integrated by the swagger)
+        lambda/stepfunc -> schedule (the target of the rule)
+
+    A resource is deployed as soon as everything it depends on is deployed, so the total
+    time is the critical path instead of the sum of all phases.
+    """
+
+    def __init__(self, template: dict = None):
+        # ONE CHECKOUT & ONE PARSED TEMPLATE SHARED BY ALL PHASES
+        self.template = template or common_utils.get_template()
+        self.lambda_helper = LambdaDeployHelper(self.template)
+        self.rest_api_helper = RestApiDeployHelper(self.template)
+        self.stepfunc_helper = StepFuncDeployHelper(self.template)
+        self.schedule_helper = ScheduleDeployHelper(self.template)
+        self.functions = []
+        self.results = {}
+
+    def build_graph(self) -> dag_utils.TaskGraph:
+        graph = dag_utils.TaskGraph()
+        # LAMBDA: SHARED DEPENDENCIES (LAYERS, POLICY, ROLES) & PLAN FIRST, THEN EVERY FUNCTION ON ITS OWN
+        self.functions = self.lambda_helper.prepare()
+        for specs in self.functions:
+            graph.add(f'lambda:{specs["name"]}', self.deploy_function, specs)
+        # FUNCTIONS WHICH FAILED TO PLAN STAY IN THE GRAPH AS FAILED, SO WHAT DEPENDS ON THEM IS BLOCKED
+        for name, result in sorted(self.lambda_helper.results.items()):
+            if result['status'] == 'FAILED':
+                graph.add(f'lambda:{name}', self.fail, result['error'])
+        # STATE MACHINES
+        for specs in self.stepfunc_helper.prepare():
+            func_names = stepfunc_utils.get_state_machine_function_names(specs['definition'])
+            deps = [f'lambda:{x}' for x in func_names]
+            graph.add(f'stepfunc:{specs["name"]}', self.stepfunc_helper.deploy_state_machine, specs, deps=deps)
+        # REST API
+        if (self.template.get('services') or {}).get('rest-api'):
+            deps = [f'lambda:{x}' for x in self.rest_api_helper.get_function_names()]
+            graph.add('restapi', self.rest_api_helper.deploy, deps=deps)
+        # SCHEDULES
+        for specs in self.schedule_helper.prepare():
+            deps = [f'{specs["target-type"]}:{specs["target-name"]}']
+            graph.add(f'schedule:{specs["name"]}', self.schedule_helper.deploy_schedule, specs, deps=deps)
+        return graph
+
+    def deploy_function(self, specs: dict):
+        result = self.lambda_helper.deploy_function_safely(specs)
+        if result['status'] == 'FAILED':
+            raise RuntimeError(result['error'])
+
+    @staticmethod
+    def fail(error: str):
+        raise RuntimeError(error)
+
+    def deploy(self):
+        graph = self.build_graph()
+        for i, level in enumerate(graph.levels()):
+            print(f'DEPLOY GRAPH LEVEL [{i}]: {level}')
+        self.results = graph.run(workers=settings.DEPLOY_CONCURRENCY, retries=0)
+        self.stepfunc_helper.plan.print()
+        self.schedule_helper.plan.print()
+        dag_utils.print_results(self.results, 'DEPLOYMENT')
+        self.lambda_helper.finish(self.functions)
+        failed = [name for name, r in self.results.items() if r['status'] != dag_utils.DONE]
+        if failed:
+            raise RuntimeError(f'FAILED TO DEPLOY: {failed}')
+        print('[ OK ]')
 
 
 def main():
-    LambdaDeployHelper().deploy()
-    RestApiDeployHelper().deploy()
-    StepFuncDeployHelper().deploy()
-    ScheduleDeployHelper().deploy()
+    try:
+        DeployScheduler().deploy()
+    finally:
+        save_profile('deploy')
 
 
 if __name__ == '__main__':
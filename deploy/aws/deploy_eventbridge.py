@@ -1,6 +1,7 @@
 import logging
 
 from utils import iam_utils
+from utils import plan_utils
 from utils import event_utils
 from utils import common_utils
 
@@ -8,27 +9,43 @@ logger = logging.getLogger(__name__)
 
 
 class ScheduleDeployHelper:
-    def __init__(self):
-        self.template = common_utils.get_template()
+    def __init__(self, template: dict = None):
+        self.template = template or common_utils.get_template()
+        self.plan = plan_utils.DeployPlan()
 
     def deploy(self):
+        for specs in self.prepare():
+            self.deploy_schedule(specs)
+        self.plan.print()
+        return
+
+    def prepare(self) -> list:
+        snapshot = plan_utils.RemoteSnapshot().collect(['schedule'])
+        targets = []
         for specs in self.template['resources'].get('schedule') or []:
+            specs = event_utils.render_specs(specs, snapshot=snapshot)
             if specs.get('no-deploy') is True:
                 print('SKIP DEPLOYMENT FOR SCHEDULE [{}]'.format(specs['name']))
                 continue
-            specs = event_utils.render_specs(specs)
-            # DEPLOY IAM ROLE/POLICY
-            if specs['target-type'] == 'stepfunc':
-                iam_utils.deploy_policy(specs['po-name'], specs['po-path'])
-                iam_utils.deploy_role(specs['ro-name'], specs['po-name'], 'eventbridge')
-            # SET RULE
-            if specs['event-type'] == 'cron':
-                event_utils.set_cron(specs['rule-name'], specs['cron'], role_arn=specs['ro-arn'])
-            elif specs['event-type'] == 'event-filter':
-                event_utils.set_event_filter(specs['rule-name'], specs['filter'], role_arn=specs['ro-arn'])
-            # SET TARGET
-            event_utils.set_target(specs['rule-name'], specs['target-arn'], role_arn=specs['ro-arn'])
-        return
+            targets.append(specs)
+        return targets
+
+    def deploy_schedule(self, specs: dict) -> dict:
+        changes = self.plan.add('schedule', specs['name'], plan_utils.diff_schedule(specs))['changes']
+        # DEPLOY IAM ROLE/POLICY
+        if specs['target-type'] == 'stepfunc':
+            iam_utils.deploy_policy(specs['po-name'], specs['po-path'])
+            iam_utils.deploy_role(specs['ro-name'], specs['po-name'], 'eventbridge')
+        # SET RULE
+        if not changes:
+            print('SKIP UPDATE: RULE [{}] NOT CHANGED'.format(specs['rule-name']))
+        elif specs['event-type'] == 'cron':
+            event_utils.set_cron(specs['rule-name'], specs['cron'], role_arn=specs['ro-arn'])
+        elif specs['event-type'] == 'event-filter':
+            event_utils.set_event_filter(specs['rule-name'], specs['filter'], role_arn=specs['ro-arn'])
+        # SET TARGET
+        event_utils.set_target(specs['rule-name'], specs['target-arn'], role_arn=specs['ro-arn'])
+        return specs
 
 
 def main():
@@ -11,8 +11,8 @@ logger = logging.getLogger(__name__)
 
 
 class DeployHelper:
-    def __init__(self):
-        self.template = common_utils.get_template()
+    def __init__(self, template: dict = None):
+        self.template = template or common_utils.get_template()
         repo_path = self.template['info']['repo_path']
         swagger_path = os.path.realpath(os.path.join(
             os.path.expanduser(repo_path),
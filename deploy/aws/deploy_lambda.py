@@ -1,86 +1,211 @@
-import os
+import time
 import logging
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 
 from utils import iam_utils
+from utils import plan_utils
 from utils import common_utils
 from utils import lambda_utils
+from utils import throttle_utils
+from utils import profile_utils
 
 import settings
 logger = logging.getLogger(__name__)
 
 
 class LambdaDeployHelper:
-    def __init__(self):
-        self.template = common_utils.get_template()
+    def __init__(self, template: dict = None):
+        self.template = template or common_utils.get_template()
         self.repo_path = self.template['info']['repo_path']
+        self.results = {}
+        self.plan = plan_utils.DeployPlan()
 
     def deploy(self):
-        self.deploy_functions()
+        targets = self.prepare()
+        workers = max(1, min(settings.LAMBDA_DEPLOY_CONCURRENCY, len(targets)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            print(f'DEPLOYING [{len(targets)}] LAMBDA WITH [{workers}] WORKERS')
+            list(executor.map(self.deploy_function_safely, targets))
+        self.finish(targets)
+
+    def prepare(self) -> list:
+        """Render all functions, deploy their shared dependencies and plan them, return those to deploy."""
+        specs_list = self.template['resources'].get('lambda') or []
+        workers = max(1, min(settings.LAMBDA_DEPLOY_CONCURRENCY, len(specs_list)))
+        snapshot = plan_utils.RemoteSnapshot().collect(['lambda'])
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            specs_list = list(executor.map(partial(lambda_utils.render_specs, snapshot=snapshot), specs_list))
+            targets = []
+            for specs in specs_list:
+                if specs.get('no-deploy') is True:
+                    print('SKIP DEPLOYMENT FOR LAMBDA [{}]'.format(specs['name']))
+                    self.results[specs['name']] = {'status': 'SKIPPED', 'seconds': 0}
+                    continue
+                targets.append(specs)
+            # SHARED DEPENDENCIES ARE DEPLOYED ONCE, BEFORE FUNCTIONS ARE DEPLOYED IN PARALLEL
+            with profile_utils.span('deploy-shared-dependencies'):
+                self.deploy_shared_dependencies(targets)
+            planned = list(executor.map(self.plan_function_safely, targets))
+        self.plan.print()
+        return [specs for specs, result in zip(targets, planned) if result['status'] == 'OK']
+
+    def finish(self, targets: list):
+        self.wait_functions_ready(targets)
         self.clear()
+        self.report()
+        throttle_utils.get_rate_limiter().report()
+        failed = [name for name, r in self.results.items() if r['status'] == 'FAILED']
+        if failed:
+            raise RuntimeError('FAILED TO DEPLOY LAMBDA: {}'.format(failed))
         print('[ OK ]')
 
-    def deploy_functions(self):
-        for specs in self.template['resources'].get('lambda') or []:
-            specs = lambda_utils.render_specs(specs)
-            print('==>DEPLOYING LAMBDA {}'.format(specs['name']))
-            full_name = specs['full_name']
-            if specs.get('no-deploy') is True:
-                print('SKIP DEPLOYMENT FOR LAMBDA [{}]'.format(specs['name']))
+    def deploy_shared_dependencies(self, specs_list: list):
+        # DEPLOY LAYERS (EACH UNIQUE MANIFEST ONCE, SHARED BY ALL FUNCTIONS USING IT)
+        resolver = lambda_utils.LayerResolver(self.repo_path)
+        resolver.resolve(specs_list)
+        resolver.assign(specs_list)
+        # DEPLOY IAM POLICY (ONE POLICY IS SHARED BY ALL FUNCTIONS)
+        deployed = set()
+        for specs in specs_list:
+            if specs['po-name'] not in deployed:
+                iam_specs = {}
+                iam_utils.deploy_policy(specs['po-name'], specs['po-path'], **iam_specs)
+                deployed.add(specs['po-name'])
+        # DEPLOY IAM ROLES ALL AT ONCE: THEY PROPAGATE TOGETHER WHILE CODE IS PLANNED & UPLOADED
+        iam_utils.deploy_roles([(x['ro-name'], x['po-name'], 'lambda') for x in specs_list])
+        return
+
+    def plan_function(self, specs: dict) -> dict:
+        lambda_utils.build_python_code_archive(self.repo_path, specs)
+        specs['remote_preserve'] = 0
+        if specs['remote']:
+            specs['remote_preserve'] = lambda_utils.get_function_concurrency(specs['full_name'], specs['alias'])
+        return self.plan.add('lambda', specs['name'], plan_utils.diff_lambda(specs))
+
+    def plan_function_safely(self, specs: dict) -> dict:
+        # ISOLATE FAILURES: ONE FUNCTION FAILING TO BUILD OR PLAN IS NOT DEPLOYED, THE OTHERS STILL ARE
+        start = time.time()
+        result = {'status': 'OK'}
+        try:
+            self.plan_function(specs)
+        except Exception as e:
+            logger.exception(e)
+            print('FAILED TO PLAN LAMBDA [{}]: {}'.format(specs['name'], e))
+            result = {'status': 'FAILED', 'error': str(e), 'seconds': round(time.time() - start, 1)}
+            self.results[specs['name']] = result
+        return result
+
+    def deploy_function_safely(self, specs: dict) -> dict:
+        # ISOLATE FAILURES: ONE BROKEN FUNCTION SHOULD NOT ABORT THE OTHERS
+        start = time.time()
+        result = {'status': 'OK'}
+        try:
+            with profile_utils.span('deploy-function', resource=specs['name']):
+                self.deploy_function(specs)
+        except Exception as e:
+            logger.exception(e)
+            print('FAILED TO DEPLOY LAMBDA [{}]: {}'.format(specs['name'], e))
+            result = {'status': 'FAILED', 'error': str(e)}
+        result['seconds'] = round(time.time() - start, 1)
+        self.results[specs['name']] = result
+        return result
+
+    def wait_functions_ready(self, specs_list: list):
+        # FUNCTIONS SETTLE IN THE BACKGROUND WHILE OTHERS ARE STILL DEPLOYING, ONLY WAIT AT THE END
+        start = time.time()
+        for specs in specs_list:
+            result = self.results.get(specs['name']) or {}
+            if result.get('status') != 'OK' or not specs.get('pending'):
                 continue
-            # DEPLOY LAYERS
-            for layer in specs.get('layers') or []:
-                if layer['type'] == 'python-requirements':
-                    path = os.path.join(self.repo_path, layer['manifest'])
-                    sha = lambda_utils.build_python_package_layer(path)
-                    layer['arn'] = lambda_utils.deploy_python_package_layer(sha)
-                elif layer['type'] == 'nodejs-package':
-                    pass  # TODO: SUPPORT MORE LANGUAGES
-            specs['layer_arn_list'] = [x['arn'] for x in specs.get('layers', [])]
-            # DEPLOY IAM ROLE/POLICY
-            iam_specs = {}
-            iam_utils.deploy_policy(specs['po-name'], specs['po-path'], **iam_specs)
-            iam_utils.deploy_role(specs['ro-name'], specs['po-name'], 'lambda')
-            print('DONE: DEPLOYED LAMBDA IAM ROLE/POLICY FOR [{}]'.format(specs['name']))
-            # DEPLOY FUNCTION
+            try:
+                lambda_utils.wait_function_ready(specs)
+            except Exception as e:
+                logger.exception(e)
+                print('FAILED TO DEPLOY LAMBDA [{}]: {}'.format(specs['name'], e))
+                result.update({'status': 'FAILED', 'error': str(e)})
+        print('DONE: ALL LAMBDA READY IN [{}s]'.format(round(time.time() - start, 1)))
+
+    def deploy_function(self, specs: dict) -> dict:
+        print('==>DEPLOYING LAMBDA {}'.format(specs['name']))
+        full_name = specs['full_name']
+        changes = self.plan.get('lambda', specs['name'])['changes']
+        # DEPLOY FUNCTION
+        if 'code' in changes or 'create' in changes:
             lambda_utils.compile_and_upload_python_code(self.repo_path, specs)
-            # CREATE FUNCTION
-            if not specs['remote']:
-                assert 'python' in specs['runtime']  # TODO: SUPPORT MORE RUNTIMES
-                specs['remote'] = lambda_utils.create_python_function(specs)
-            else:
-                # lambda_utils.update_python_function(specs, False)  # OPTIONAL: UPDATE $LATEST FOR GUI DEBUG
-                specs['remote'] = lambda_utils.update_python_function(specs)
-                if settings.ENABLE_LAMBDA_CONFIG_UPDATE:
-                    # FIXME: THIS WILL CAUSE FUNCTION PENDING
-                    specs['remote'] = lambda_utils.update_function_config(specs)
-            # SET PROVISIONED CONCURRENCY
+        else:
+            print('SKIP UPLOAD: CODE NOT CHANGED FOR [{}]'.format(specs['name']))
+            lambda_utils.remove_code_archive(specs)
+        # CREATE FUNCTION
+        if not specs['remote']:
+            assert 'python' in specs['runtime']  # TODO: SUPPORT MORE RUNTIMES
+            specs['remote'] = iam_utils.retry_role_propagation(lambda_utils.create_python_function, specs)
+        else:
+            # lambda_utils.update_python_function(specs, False)  # OPTIONAL: UPDATE $LATEST FOR GUI DEBUG
+            update_config = settings.ENABLE_LAMBDA_CONFIG_UPDATE and 'config' in changes
+            if 'code' in changes:
+                # WITH A CONFIG UPDATE TO FOLLOW, ONLY PUBLISH ONCE BOTH ARE ON "$LATEST"
+                specs['remote'] = lambda_utils.update_python_function(specs, not update_config)
+                if not update_config:
+                    specs['latest_version'] = specs['remote'].get('Version') or specs['latest_version']
+            if update_config:
+                # FIXME: THIS WILL CAUSE FUNCTION PENDING
+                iam_utils.retry_role_propagation(lambda_utils.update_function_config, specs)
+                # THE ALIAS SERVES A PUBLISHED VERSION, A CONFIG UPDATE ON "$LATEST" ALONE IS NEVER LIVE
+                specs['remote'] = lambda_utils.publish_function_version(specs)
+                specs['latest_version'] = specs['remote']['Version']
+        # UPDATE ALIAS POINTING TO THE LATEST VERSION
+        ver = specs.get('latest_version') or specs['remote'].get('Version') or '$LATEST'
+        alias_version = specs['alias_info'].get('FunctionVersion')
+        if not alias_version:
+            specs['alias_info'] = lambda_utils.create_func_alias(full_name, settings.FUNC_ALIAS, ver)
+        elif alias_version != ver:
+            specs['alias_info'] = lambda_utils.update_func_alias(full_name, settings.FUNC_ALIAS, ver)
+        specs['alias_arn'] = specs['alias_info']['AliasArn']
+        specs['latest_version'] = specs['alias_info']['FunctionVersion']
+        # SET PROVISIONED CONCURRENCY (ON THE ALIAS)
+        if 'concurrency' in changes or ('create' in changes and specs.get('preserve')):
             if specs.get('preserve'):
                 lambda_utils.set_function_preservation(specs)
             else:
                 lambda_utils.remove_function_preservation(specs)
-            # UPDATE ALIAS POINTING TO THE LATEST VERSION
-            ver = specs.get('latest_version') or specs['remote'].get('Version') or '$LATEST'
-            alias_version = specs['alias_info'].get('FunctionVersion')
-            if not alias_version:
-                specs['alias_info'] = lambda_utils.create_func_alias(full_name, settings.FUNC_ALIAS, ver)
-            elif alias_version != ver:
-                specs['alias_info'] = lambda_utils.update_func_alias(full_name, settings.FUNC_ALIAS, ver)
-            specs['alias_arn'] = specs['alias_info']['AliasArn']
-            specs['latest_version'] = specs['alias_info']['FunctionVersion']
-            print('=' * 60)
-        return
+        print('DONE: DEPLOYED LAMBDA [{}]'.format(specs['name']))
+        return specs
+
+    def report(self):
+        print('=' * 60)
+        print('LAMBDA DEPLOYMENT SUMMARY:')
+        for name, result in sorted(self.results.items(), key=lambda x: -x[1]['seconds']):
+            line = '\t[{}] {} ({}s)'.format(result['status'], name, result['seconds'])
+            if result.get('error'):
+                line += ': {}'.format(result['error'])
+            print(line)
+        counts = {}
+        for result in self.results.values():
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+        print('TOTAL: {}'.format(counts))
+        print('=' * 60)
 
     def clear(self):
-        if not settings.LOCAL_REPO_PATH:
-            assert 0 == os.system(f'rm -rdf {self.repo_path} ||true')
+        # FYI: THE CHECKOUT IS KEPT IN "REPO_CACHE_DIR" AND SHARED WITH THE OTHER DEPLOY PHASES
         for specs in self.template['resources']['lambda']:
             print('REMOVING LAMBDA OLDER VERSIONS: {}'.format(specs['full_name']))
             lambda_utils.clean_func_old_versions(specs.get('versions') or [])
 
 
+def save_profile(name: str):
+    if settings.ENABLE_PROFILE:
+        recorder = profile_utils.get_recorder()
+        recorder.report(settings.PROFILE_TOP_N)
+        recorder.save(settings.PROFILE_DIR, name)
+
+
 def main():
     h = LambdaDeployHelper()
-    h.deploy()
+    try:
+        h.deploy()
+    finally:
+        save_profile('deploy-lambda')
 
 
 if __name__ == '__main__':
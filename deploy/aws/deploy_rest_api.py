@@ -1,6 +1,9 @@
 import os
+import re
+import json
 import logging
 
+from utils import plan_utils
 from utils import common_utils
 from utils import rest_api_utils
 
@@ -9,8 +12,8 @@ logger = logging.getLogger(__name__)
 
 
 class RestApiDeployHelper:
-    def __init__(self):
-        self.template = common_utils.get_template()
+    def __init__(self, template: dict = None):
+        self.template = template or common_utils.get_template()
         if not self.template['services'].get('rest-api'):
             return
         repo_path = self.template['info']['repo_path']
@@ -23,6 +26,16 @@ class RestApiDeployHelper:
         remote = rest_api_utils.get_api_by_name(self.specs['full-name'])
         self.api_id = remote.get('id')
 
+    def get_function_names(self) -> list:
+        """Short names of the functions integrated by the API (by "x-lambda-name" or by function ARN)."""
+        if not self.template['services'].get('rest-api'):
+            return []
+        raw = json.dumps(self.swagger)
+        names = re.findall(r'"x-lambda-name":\s*"([^"]+)"', raw)
+        prefix = common_utils.get_name_prefix('lambda')
+        names += [x.replace(prefix, '') for x in re.findall(r':function:([\w-]+)', raw)]
+        return sorted(set(names))
+
     def deploy(self):
         if not self.template['services'].get('rest-api'):
             print('SKIP DEPLOYMENT OF REST API FOR NOT FOUND DEFINITION')
@@ -32,19 +45,44 @@ class RestApiDeployHelper:
             return
         # DEPLOY API
         if not self.api_id:
-            self.api_id = rest_api_utils.create_api(self.specs['full-name'], self.specs)
-        rest_api_utils.import_routes(self.api_id, self.swagger)
-        # DEPLOY STAGES
-        dpl = rest_api_utils.get_api_latest_deployment(self.api_id)
-        if not dpl:
-            dpl = rest_api_utils.create_api_deployment(self.api_id)
-        dpl_id = dpl['id']
-        stages = rest_api_utils.get_api_stages(self.api_id)
-        if settings.STAGE_NAME not in stages:
+            self.api_id = rest_api_utils.create_api(self.specs['full-name'], self.specs)['id']
+        # DEPLOY ROUTES: ONLY THE ONES CHANGED SINCE THE LAST DEPLOYMENT
+        fingerprints = rest_api_utils.get_swagger_fingerprints(self.swagger)
+        state = rest_api_utils.get_route_state(self.specs['full-name'])
+        if state.get('api_id') != self.api_id:
+            state = {}
+        remote_route_map = rest_api_utils.get_api_route_map(self.api_id) if state else {}
+        diff = plan_utils.diff_rest_api_routes(fingerprints, state, remote_route_map)
+        stage = rest_api_utils.get_api_stage(self.api_id, settings.STAGE_NAME)
+        if diff is not None and not any(diff.values()) and stage.get('deploymentId') == state.get('deployment_id'):
+            print('SKIP DEPLOYMENT FOR [REST-API]: NO ROUTE CHANGED')
+            return True
+        self.deploy_routes(diff, remote_route_map)
+        # DEPLOY STAGES: A NEW DEPLOYMENT, SO THAT THE STAGE SERVES THE ROUTES JUST IMPORTED
+        dpl_id = rest_api_utils.create_api_deployment(self.api_id, rest_api_utils.get_fingerprint(fingerprints))['id']
+        if not stage:
             rest_api_utils.create_api_stage(self.api_id, settings.STAGE_NAME, dpl_id)
+        else:
+            rest_api_utils.update_api_stage_deployment(self.api_id, settings.STAGE_NAME, dpl_id)
+        state = {'api_id': self.api_id, 'deployment_id': dpl_id, 'routes': fingerprints}
+        rest_api_utils.save_route_state(self.specs['full-name'], state)
         print('OK.')
         return True
 
+    def deploy_routes(self, diff: dict, remote_route_map: dict):
+        if diff is None:
+            rest_api_utils.import_routes(self.api_id, self.swagger)
+            return
+        for action, route_keys in diff.items():
+            for route_key in route_keys:
+                print(f'\t[{action.upper()}] ROUTE [{route_key}]')
+        if diff['create'] or diff['update']:
+            partial = rest_api_utils.get_partial_swagger(self.swagger, diff['create'] + diff['update'])
+            rest_api_utils.import_routes(self.api_id, partial, mode='merge')
+        remote = {rest_api_utils.get_route_key(m, r): info for (m, r), info in remote_route_map.items()}
+        for route_key in diff['delete']:
+            rest_api_utils.delete_api_method(self.api_id, remote[route_key]['id'], remote[route_key]['method'])
+
 
 def main():
     h = RestApiDeployHelper()
@@ -2,6 +2,7 @@ import logging
 
 import settings
 from utils import iam_utils
+from utils import plan_utils
 from utils import common_utils
 from utils import stepfunc_utils
 from utils import cloudwatch_utils
@@ -10,11 +11,20 @@ logger = logging.getLogger(__name__)
 
 
 class StepFuncDeployHelper:
-    def __init__(self):
-        self.template = common_utils.get_template()
+    def __init__(self, template: dict = None):
+        self.template = template or common_utils.get_template()
         self.repo_path = self.template['info']['repo_path']
+        self.plan = plan_utils.DeployPlan()
 
     def deploy(self):
+        for specs in self.prepare():
+            self.deploy_state_machine(specs)
+        self.plan.print()
+        return
+
+    def prepare(self) -> list:
+        snapshot = plan_utils.RemoteSnapshot().collect(['stepfunc'])
+        targets = []
         for specs in self.template['resources'].get('stepfunc') or []:
             if any([
                 settings.DEPLOY_TYPE not in ['full', 'stepfunc'],
@@ -22,25 +32,42 @@ class StepFuncDeployHelper:
             ]):
                 print('SKIP DEPLOYMENT FOR STATE MACHINE [{}]'.format(specs['name']))
                 continue
-            specs = stepfunc_utils.render_specs(specs)
-            # DEPLOY LOG GROUP
-            if not specs['log_group_info']:
-                cloudwatch_utils.create_log_group(specs['log_group_name'])
-                specs['log_group_info'] = cloudwatch_utils.get_log_group(specs['log_group_name'])
-                specs['log_group_arn'] = specs['log_group_info'].get('arn')
-            # DEPLOY IAM/POLICY
-            iam_specs = {}
-            iam_utils.deploy_policy(specs['po_name'], specs['po_path'], **iam_specs)
-            iam_utils.deploy_role(specs['ro_name'], specs['po_name'], 'stepfunc')
-            print('DONE: DEPLOYED STEPFUNC IAM ROLE/POLICY FOR [{}]'.format(specs['name']))
-            # DEPLOY STATE MACHINE
-            machine = specs.get('machine')
-            if not machine:
-                specs['machine'] = stepfunc_utils.create_stepfunc(specs)
-            else:
-                specs['machine'] = stepfunc_utils.update_stepfunc(machine['stateMachineArn'], specs)
+            targets.append(stepfunc_utils.render_specs(specs, snapshot=snapshot))
+        # SHARED DEPENDENCIES ARE DEPLOYED ONCE, BEFORE STATE MACHINES ARE DEPLOYED IN PARALLEL
+        self.deploy_shared_dependencies(targets)
+        return targets
+
+    def deploy_shared_dependencies(self, specs_list: list):
+        # DEPLOY IAM POLICY (ONE POLICY IS SHARED BY ALL STATE MACHINES)
+        deployed = set()
+        for specs in specs_list:
+            if specs['po_name'] not in deployed:
+                iam_specs = {}
+                iam_utils.deploy_policy(specs['po_name'], specs['po_path'], **iam_specs)
+                deployed.add(specs['po_name'])
+        # DEPLOY IAM ROLES ALL AT ONCE
+        if specs_list:
+            iam_utils.deploy_roles([(x['ro_name'], x['po_name'], 'stepfunc') for x in specs_list])
+            print('DONE: DEPLOYED STEPFUNC IAM ROLES/POLICIES FOR [{}] STATE MACHINES'.format(len(specs_list)))
         return
 
+    def deploy_state_machine(self, specs: dict) -> dict:
+        changes = self.plan.add('stepfunc', specs['name'], plan_utils.diff_stepfunc(specs))['changes']
+        # DEPLOY LOG GROUP
+        if not specs['log_group_info']:
+            cloudwatch_utils.create_log_group(specs['log_group_name'])
+            specs['log_group_info'] = cloudwatch_utils.get_log_group(specs['log_group_name'])
+            specs['log_group_arn'] = specs['log_group_info'].get('arn')
+        # DEPLOY STATE MACHINE (IAM ROLE/POLICY ARE DEPLOYED BY "prepare")
+        machine = specs.get('machine')
+        if not machine:
+            specs['machine'] = iam_utils.retry_role_propagation(stepfunc_utils.create_stepfunc, specs)
+        elif changes:
+            iam_utils.retry_role_propagation(stepfunc_utils.update_stepfunc, machine['stateMachineArn'], specs)
+        else:
+            print('SKIP UPDATE: STATE MACHINE [{}] NOT CHANGED'.format(specs['name']))
+        return specs
+
 
 def main():
     h = StepFuncDeployHelper()
@@ -1,66 +1,122 @@
+import os
 import logging
 
+import settings
+from utils import dag_utils
 from utils import iam_utils
+from utils import plan_utils
 from utils import event_utils
 from utils import common_utils
 from utils import lambda_utils
 from utils import stepfunc_utils
 from utils import rest_api_utils
+from utils import throttle_utils
 
 logger = logging.getLogger(__name__)
 
+NOT_FOUND_ERRORS = ['NotFound', 'NoSuchEntity', 'DoesNotExist', 'ResourceNotFound']
+
+
+def ignore_not_found(func):
+    # RESOURCES ALREADY GONE COUNT AS REMOVED, SO A RESUMED/REPEATED TEARDOWN NEVER FAILS ON THEM
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if not any(x in str(e) or x in type(e).__name__ for x in NOT_FOUND_ERRORS):
+                raise
+            print(f'SKIP: ALREADY REMOVED: {args}')
+    return wrapper
+
 
 class DestroyHelper:
-    def __init__(self):
-        self.template = common_utils.get_template()
+    """Tear down the app as a dependency graph: callers before targets, roles before their policies.
+
+    Only the resources the template declares are removed (and the IAM roles & policies of the app
+    prefix, as before). Independent resources are removed in parallel, and the results are written
+    to a JSON log so an interrupted teardown continues where it stopped.
+    """
+
+    def __init__(self, template: dict = None, log_path: str = None):
+        self.template = template or common_utils.get_template()
         self.repo_path = self.template['info']['repo_path']
+        prefix = common_utils.get_name_prefix()
+        self.log_path = log_path or os.path.join(settings.DESTROY_LOG_DIR, f'{prefix.strip("-")}.json')
+        self.results = {}
 
     def remove(self):
-        self.remove_lambda()
-        self.remove_iam()
-        self.remove_stepfunc()
-        self.remove_rest_api()
-        self.remove_schedule()
+        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        log = dag_utils.TaskLog(self.log_path)
+        snapshot = plan_utils.RemoteSnapshot().collect(['lambda', 'stepfunc', 'schedule'])
+        graph = self.build_graph()
+        # DONE IN AN EARLIER RUN: ONLY SKIPPED IF THE RESOURCE IS GONE, IT MAY HAVE BEEN DEPLOYED AGAIN SINCE
+        recreated = log.discard([x for x in log.done() if x in graph.tasks and self.is_live(x, snapshot)])
+        if recreated:
+            print(f'FOUND [{len(recreated)}] RESOURCES LOGGED AS REMOVED BUT STILL LIVE, REMOVING THEM AGAIN')
+        self.results = graph.run(workers=settings.DESTROY_CONCURRENCY, retries=2, log=log)
+        dag_utils.print_results(self.results, 'TEARDOWN')
+        throttle_utils.get_rate_limiter().report()
+        failed = [name for name, r in self.results.items() if r['status'] != dag_utils.DONE]
+        if failed:
+            raise RuntimeError(f'FAILED TO REMOVE [{len(failed)}] RESOURCES, RUN AGAIN TO RESUME: {self.log_path}')
+        log.remove()
         print('[ OK ]')
 
-    def remove_lambda(self):
-        for specs in self.template['resources'].get('lambda') or []:
-            specs = lambda_utils.render_specs(specs)
-            lambda_utils.clean_func_old_versions(specs.get('versions') or [])
-            lambda_utils.remove_function(specs['full_name'])
-        return True
+    @staticmethod
+    def is_live(task: str, snapshot: plan_utils.RemoteSnapshot) -> bool:
+        kind, name = task.split(':', 1)
+        resources = {'lambda': snapshot.functions, 'stepfunc': snapshot.state_machines, 'schedule': snapshot.rules}
+        # ROLES, POLICIES & THE REST API ARE LISTED LIVE, THEY ARE ONLY IN THE GRAPH WHILE THEY EXIST
+        return name in resources[kind] if kind in resources else True
 
-    def remove_iam(self):
+    def build_graph(self) -> dag_utils.TaskGraph:
+        graph = dag_utils.TaskGraph()
+        resources = self.template['resources']
+        callers = []
+        # LEVEL: ENTRY POINTS (SCHEDULES WITH THEIR TARGETS, REST API)
+        for specs in resources.get('schedule') or []:
+            name = event_utils.get_rule_full_name(specs['name'])
+            callers.append(graph.add(f'schedule:{name}', ignore_not_found(event_utils.remove_rule), name))
+        callers += self.add_rest_api(graph)
+        # LEVEL: STATE MACHINES (THEY INVOKE FUNCTIONS)
+        machines = []
+        for specs in resources.get('stepfunc') or []:
+            name = stepfunc_utils.get_stepfunc_full_name(specs['name'])
+            arn = stepfunc_utils.get_stepfunc_arn_by_name(name)
+            machines.append(graph.add(
+                f'stepfunc:{name}', ignore_not_found(stepfunc_utils.remove_state_machine), arn, deps=callers,
+            ))
+        # LEVEL: FUNCTIONS
+        functions = []
+        for specs in resources.get('lambda') or []:
+            name = lambda_utils.get_func_full_name(specs['name'])
+            functions.append(graph.add(
+                f'lambda:{name}', ignore_not_found(lambda_utils.remove_function), name, deps=callers + machines,
+            ))
+        # LEVEL: ROLES (DETACHED, THEN DELETED), THEN POLICIES
         prefix = common_utils.get_name_prefix()
-        ro_list = iam_utils.list_roles_by_prefix(prefix)
-        removed = iam_utils.remove_roles(ro_list)
-        print(f'REMOVED {len(removed)} ROLES')
-        po_list = iam_utils.list_policies_by_prefix(prefix)
-        removed = iam_utils.remove_policies(po_list)
-        print(f'REMOVED {len(removed)} POLICIES')
-        return True
-
-    def remove_stepfunc(self):
-        for specs in self.template['resources'].get('stepfunc') or []:
-            specs = stepfunc_utils.render_specs(specs)
-            if specs['arn']:
-                stepfunc_utils.remove_state_machine(specs['arn'])
-        return True
-
-    def remove_rest_api(self):
-        if self.template['services'].get('rest-api'):
-            specs = rest_api_utils.render_specs(self.template['services']['rest-api'])
-            api = rest_api_utils.get_api_by_name(specs['full-name'])
-            if api:
-                rest_api_utils.remove_api(api['id'])
-        return True
-
-    def remove_schedule(self):
-        for specs in self.template['resources'].get('schedule') or []:
-            rule_name = event_utils.get_rule_full_name(specs['name'])
-            rule = event_utils.get_rule(rule_name)
-            if rule:
-                event_utils.remove_rule(rule_name)
+        roles = [
+            graph.add(f'role:{name}', ignore_not_found(iam_utils.remove_role), name,
+                      deps=callers + machines + functions)
+            for name in iam_utils.list_roles_by_prefix(prefix)
+        ]
+        for arn in iam_utils.list_policies_by_prefix(prefix):
+            graph.add(f'policy:{arn}', ignore_not_found(iam_utils.remove_policy), arn, deps=roles)
+        return graph
+
+    def add_rest_api(self, graph: dag_utils.TaskGraph) -> list:
+        services = self.template.get('services') or {}
+        if not services.get('rest-api'):
+            return []
+        specs = rest_api_utils.render_specs(services['rest-api'])
+        name = specs['full-name']
+        api = rest_api_utils.get_api_by_name(name)
+        apis = []
+        if api:
+            apis.append(graph.add(f'restapi:{api["id"]}', ignore_not_found(rest_api_utils.remove_api), api['id']))
+        # THE ROUTE FINGERPRINTS OF THE LAST DEPLOYMENT WOULD NOT MATCH A NEW API OF THE SAME NAME
+        graph.add(f'restapi-state:{name}', rest_api_utils.remove_route_state, name, deps=apis)
+        return apis
 
 
 def main():
@@ -70,4 +126,3 @@ def main():
 
 if __name__ == '__main__':
     main()
-
@@ -25,6 +25,7 @@ STEPFUNC_PO_PATH = os.path.realpath(os.path.expanduser(
     './iam/iam-policy-stepfunc-execution.json'
 ))
 PO_NAME = 'lambda-general'
+LAYER_RESOLVER = lambda_utils.LayerResolver(REPO_PATH)
 # ACTIONS = {'services': [], 'resources': []}
 
 
@@ -37,6 +38,9 @@ def prepare_template() -> dict:
             specs = prepare_rest_api(specs)
         elif service == 'eventbridge':
             pass  # TODO
+    if (template.get('resources') or {}).get('lambda'):
+        s3_client.prefetch(lambda_utils.get_layer_s3_prefix('python'))
+        LAYER_RESOLVER.resolve(template['resources']['lambda'], build=False)
     for k, items in (template.get('resources') or {}).items():
         if k == 'lambda':
             _ = [prepare_lambda(x) for x in items]
@@ -95,10 +99,10 @@ def prepare_lambda(specs: dict) -> dict:
     # LAYER
     for layer in specs.get('layers') or []:
         if layer['type'] == 'python-requirements':
-            path = os.path.join(REPO_PATH, layer['manifest'])
-            layer['sha'] = lambda_utils.file_to_sha(os.path.realpath(os.path.expanduser(path)))
-            layer['meta'] = lambda_utils.get_latest_layer_by_name(layer['sha'])
-            layer['s3_key'] = lambda_utils.get_layer_s3_key_by_sha(layer['sha'], 'python')
+            resolved = LAYER_RESOLVER.resolved[LAYER_RESOLVER.get_manifest_path(layer)]
+            layer['sha'] = resolved['sha']
+            layer['meta'] = resolved['meta']
+            layer['s3_key'] = resolved['s3_key']
             layer['arn'] = lambda_utils.get_layer_arn(layer['sha'])
             layer['exists'] = s3_client.exists(layer['s3_key'])
     specs['layer_arn_list'] = [x['arn'] for x in specs.get('layers', [])]
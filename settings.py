@@ -1,5 +1,9 @@
 import os
-from boto3 import session
+
+from utils.aws_clients import ClientRegistry
+from utils.throttle_utils import get_rate_limiter
+from utils.profile_utils import get_recorder
+from utils.profile_utils import enable_profile
 
 FUNC_ALIAS = 'latest_release'
 
@@ -9,11 +13,21 @@ BUILD_NO = os.environ.get('BUILD_NO')
 APPLICATION_NAME = os.environ.get('APPLICATION_NAME') or ''
 REPO_URL = os.environ.get('REPO_URL')
 LOCAL_REPO_PATH = os.environ.get('LOCAL_REPO_PATH')
+REPO_CACHE_DIR = os.environ.get('REPO_CACHE_DIR') or '/tmp/serverless-iac-repos'  # CLONES BY REPO_URL + COMMIT
+REPO_CACHE_MAX_COUNT = int(os.environ.get('REPO_CACHE_MAX_COUNT') or 5)  # CHECKOUTS KEPT, LEAST RECENTLY USED GO FIRST
+LAYER_CACHE_DIR = os.environ.get('LAYER_CACHE_DIR') or '/tmp/serverless-iac-layers'  # LAYER ZIPS BY MANIFEST HASH
+LAYER_CACHE_MAX_MB = int(os.environ.get('LAYER_CACHE_MAX_MB') or 2048)
 
 LAMBDA_MAX_VERSION = 5  # PREVENT FROM LAMBDA QUOTA CONSUMTION
 DEPLOY_TYPE = os.environ.get('DEPLOY_TYPE') or 'full'  # full | lambda | layer | httpapi | restapi | stepfunc | schedule
 DEPLOY_TARGET = os.environ.get('DEPLOY_TARGET')  # THE NAME OF TARGET RESOURCE
 ENABLE_LAMBDA_CONFIG_UPDATE = True if str(os.environ.get('ENABLE_LAMBDA_CONFIG_UPDATE')).lower() == 'true' else False
+DEPLOY_FORCE = True if str(os.environ.get('DEPLOY_FORCE')).lower() == 'true' else False  # IGNORE PLAN, UPDATE ALL
+LAMBDA_DEPLOY_CONCURRENCY = int(os.environ.get('LAMBDA_DEPLOY_CONCURRENCY') or 8)  # 1 == SERIAL DEPLOYMENT
+DEPLOY_CONCURRENCY = int(os.environ.get('DEPLOY_CONCURRENCY') or 8)  # WORKERS OF THE FULL DEPLOY GRAPH
+DESTROY_CONCURRENCY = int(os.environ.get('DESTROY_CONCURRENCY') or 16)
+DESTROY_LOG_DIR = os.environ.get('DESTROY_LOG_DIR') or '/tmp/serverless-iac-destroy'  # RESUMABLE TEARDOWN LOGS
+IAM_PROPAGATION_TIMEOUT = int(os.environ.get('IAM_PROPAGATION_TIMEOUT') or 60)  # SECONDS FOR A NEW ROLE TO BE USABLE
 
 # AWS
 AWS_IAM_PROFILE_NAME = os.environ.get('AWS_IAM_PROFILE_NAME')
@@ -29,20 +43,53 @@ DISABLE_API_AUTHORIZER = True if os.environ.get('DISABLE_API_AUTHORIZER') else F
 
 ENABLE_XRAY = True if os.environ.get('ENABLE_XRAY') else False
 
-ses = session.Session(profile_name=AWS_IAM_PROFILE_NAME)
-gw_client = ses.client('apigatewayv2')
-rest_client = ses.client('apigateway')
-lambda_client = ses.client('lambda')
-iam_client = ses.client('iam')
-log_client = ses.client('logs')
-sts_client = ses.client('sts')
-event_client = ses.client('events')
-sfn_client = ses.client('stepfunctions')
-sqs_client = ses.client('sqs')
-sns_client = ses.client('sns')
-s3_client = ses.client('s3')
-s3_resource = ses.resource('s3')
-AWS_ACCOUNT_ID = sts_client.get_caller_identity().get('Account')
+# CLIENTS ARE CREATED ON FIRST USE, SO IMPORTING SETTINGS MAKES NO NETWORK CALLS
+AWS_MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_MAX_POOL_CONNECTIONS') or max(10, LAMBDA_DEPLOY_CONCURRENCY * 2))
+# CLIENT-SIDE TOKEN BUCKETS PER API, SEEDED WITH THE DOCUMENTED CONTROL-PLANE QUOTAS & ADAPTED ON THROTTLES
+AWS_RATE_LIMIT = False if str(os.environ.get('AWS_RATE_LIMIT')).lower() == 'false' else True
+# ONE CLIENT-SIDE LIMITER ONLY: BOTOCORE "adaptive" RATE LIMITS TOO, SO IT IS THE DEFAULT ONLY WITHOUT THE BUCKETS
+AWS_RETRY_MODE = os.environ.get('AWS_RETRY_MODE') or ('standard' if AWS_RATE_LIMIT else 'adaptive')
+AWS_MAX_ATTEMPTS = int(os.environ.get('AWS_MAX_ATTEMPTS') or 10)
+clients = ClientRegistry(
+    profile_name=AWS_IAM_PROFILE_NAME,
+    region_name=AWS_REGION,
+    max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+    retry_mode=AWS_RETRY_MODE,
+    max_attempts=AWS_MAX_ATTEMPTS,
+)
+if AWS_RATE_LIMIT:
+    clients.add_hook(get_rate_limiter().register)
+# RECORD EVERY AWS CALL & SHELL-OUT, SAVED AS A JSON TIMELINE + CHROME TRACE AT THE END OF A DEPLOYMENT
+ENABLE_PROFILE = True if str(os.environ.get('ENABLE_PROFILE')).lower() == 'true' else False  # OPT-IN
+PROFILE_DIR = os.environ.get('PROFILE_DIR') or '/tmp/serverless-iac-profile'
+PROFILE_TOP_N = int(os.environ.get('PROFILE_TOP_N') or 10)
+if ENABLE_PROFILE:
+    enable_profile()
+    clients.add_hook(get_recorder().register)
+gw_client = clients.lazy_client('apigatewayv2')
+rest_client = clients.lazy_client('apigateway')
+lambda_client = clients.lazy_client('lambda')
+iam_client = clients.lazy_client('iam')
+log_client = clients.lazy_client('logs')
+sts_client = clients.lazy_client('sts')
+event_client = clients.lazy_client('events')
+sfn_client = clients.lazy_client('stepfunctions')
+sqs_client = clients.lazy_client('sqs')
+sns_client = clients.lazy_client('sns')
+s3_client = clients.lazy_client('s3')
+s3_resource = clients.lazy_resource('s3')
+
+# S3 TRANSFER PROFILE: PARALLEL MULTIPART/RANGED TRANSFERS FOR LARGE OBJECTS (E.G. LAYER ZIPS)
+S3_TRANSFER_CHUNK_SIZE_MB = int(os.environ.get('S3_TRANSFER_CHUNK_SIZE_MB') or 16)
+S3_TRANSFER_MAX_CONCURRENCY = int(os.environ.get('S3_TRANSFER_MAX_CONCURRENCY') or 10)
+S3_TRANSFER_THRESHOLD_MB = int(os.environ.get('S3_TRANSFER_THRESHOLD_MB') or 16)
+
+
+def __getattr__(name):
+    # AWS_ACCOUNT_ID IS RESOLVED (AND MEMOIZED) ONLY WHEN SOMETHING ACTUALLY NEEDS IT
+    if name == 'AWS_ACCOUNT_ID':
+        return clients.get_account_id()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 #############################################################
@@ -0,0 +1,226 @@
+"""
+Deploy benchmark: run every deploy helper (and the teardown) against the in-memory AWS stand-in,
+on synthetic apps of N functions / routes / schedules, and report per phase:
+wall time, AWS API calls (total & top operations) and peak traced memory.
+
+    PYTHONPATH=. python tests/benchmark/bench_deploy.py --sizes 10 100 500 --latency 0.02 --json /tmp/bench.json
+
+Compare the call counts between commits: they are deterministic, so any increase is a regression.
+"""
+import os
+import sys
+import json
+import time
+import copy
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+from unittest.mock import patch
+
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'deploy', 'aws'))
+
+import settings  # NOQA: E402
+from utils import iam_utils  # NOQA: E402
+from utils import common_utils  # NOQA: E402
+from utils import lambda_utils  # NOQA: E402
+from utils import rest_api_utils  # NOQA: E402
+from utils.s3_utils import S3Bucket  # NOQA: E402
+from tests.benchmark.fake_aws import FakeAws  # NOQA: E402
+from tests.benchmark.fake_aws import REGION  # NOQA: E402
+
+from deploy import DeployScheduler  # NOQA: E402
+from destroy_app import DestroyHelper  # NOQA: E402
+from deploy_lambda import LambdaDeployHelper  # NOQA: E402
+from deploy_rest_api import RestApiDeployHelper  # NOQA: E402
+from deploy_eventbridge import ScheduleDeployHelper  # NOQA: E402
+from deploy_step_function import StepFuncDeployHelper  # NOQA: E402
+
+# THE HELPERS ONE AFTER ANOTHER, THEN THE WHOLE APP AS ONE GRAPH (A FIRST DEPLOY, AFTER THE DESTROY)
+PHASES = [
+    'lambda', 'stepfunc', 'restapi', 'schedule', 'lambda-noop', 'restapi-noop', 'destroy',
+    'graph', 'graph-destroy',
+]
+BENCH_SETTINGS = {
+    'STAGE_NAME': 'bench',
+    'STAGE_SUBNAME': 's1',
+    'APPLICATION_NAME': 'app',
+    'BUILD_NO': 'b1',
+    'AWS_REGION': REGION,
+    'AWS_LAMBDA_BUCKET': 'bench-bucket',
+    'DEPLOY_TYPE': 'full',
+    'DEPLOY_FORCE': False,
+}
+STATE_MACHINE = {
+    'StartAt': 'Run',
+    'States': {
+        'Run': {
+            'Type': 'Task',
+            'Resource': 'arn:aws:states:::lambda:invoke',
+            'Parameters': {'Payload.$': '$', 'FunctionName': 'func-0000'},
+            'End': True,
+        },
+    },
+}
+
+
+def get_func_name(i: int) -> str:
+    return 'func-{:04d}'.format(i)
+
+
+def make_app(repo_path: str, size: int) -> str:
+    """Write a synthetic app: "size" functions, routes & schedules, one state machine per 10 functions."""
+    os.makedirs(os.path.join(repo_path, 'definitions'), exist_ok=True)
+    os.makedirs(os.path.join(repo_path, 'application'), exist_ok=True)
+    with open(os.path.join(repo_path, 'application', 'handlers.py'), 'w') as f:
+        f.write('def handler(event, context):\n    return {"statusCode": 200}\n')
+    with open(os.path.join(repo_path, 'definitions', 'state_machine.json'), 'w') as f:
+        json.dump(STATE_MACHINE, f)
+    swagger = {
+        'swagger': '2.0',
+        'info': {'title': 'bench', 'version': '1.0.0'},
+        'paths': {
+            f'/r{i}': {'get': {'x-lambda-name': get_func_name(i), 'responses': {'200': {'description': 'OK'}}}}
+            for i in range(size)
+        },
+    }
+    with open(os.path.join(repo_path, 'definitions', 'swagger.yaml'), 'w') as f:
+        yaml.safe_dump(swagger, f)
+    machines = [f'sm-{i:03d}' for i in range(max(1, size // 10))]
+    template = {
+        'info': {'title': f'bench-{size}'},
+        'services': {
+            'rest-api': {'name': 'api', 'swagger-path': './definitions/swagger.yaml'},
+            'lambda': {'runtime': 'python3.9', 'handler': 'application.handlers.handler', 'upload-ignore': []},
+        },
+        'resources': {
+            'lambda': [{'name': get_func_name(i)} for i in range(size)],
+            'stepfunc': [{'name': x, 'definition-path': './definitions/state_machine.json'} for x in machines],
+            'schedule': [
+                {
+                    'name': f'sched-{i:04d}',
+                    'cron': 'rate(1 hour)',
+                    'target-type': 'stepfunc' if i % 10 == 0 else 'lambda',
+                    'target-name': machines[(i // 10) % len(machines)] if i % 10 == 0 else get_func_name(i),
+                }
+                for i in range(size)
+            ],
+        },
+    }
+    with open(os.path.join(repo_path, 'definitions', 'template.yaml'), 'w') as f:
+        yaml.safe_dump(template, f)
+    return repo_path
+
+
+@contextlib.contextmanager
+def fake_environment(fake: FakeAws, work_dir: str):
+    """Route all registry clients to "fake", with the bench settings & fresh per-session caches."""
+    patches = [patch.object(settings, k, v) for k, v in BENCH_SETTINGS.items()]
+    patches += [
+        patch.object(settings, 'DESTROY_LOG_DIR', os.path.join(work_dir, 'destroy')),
+        patch.object(settings.clients, 'region_name', REGION),
+        patch.object(lambda_utils, 's3_client', S3Bucket(BENCH_SETTINGS['AWS_LAMBDA_BUCKET'])),
+        patch.object(rest_api_utils, 's3_client', S3Bucket(BENCH_SETTINGS['AWS_LAMBDA_BUCKET'])),
+        patch.dict(os.environ, {'AWS_ACCESS_KEY_ID': 'bench', 'AWS_SECRET_ACCESS_KEY': 'bench'}),
+    ]
+    _ = [p.start() for p in patches]
+    settings.clients.reset()
+    settings.clients.add_hook(fake.register)
+    iam_utils._INVENTORY.clear()
+    try:
+        yield fake
+    finally:
+        settings.clients.remove_hook(fake.register)
+        settings.clients.reset()
+        iam_utils._INVENTORY.clear()
+        _ = [p.stop() for p in patches]
+
+
+def run_phase(name: str, func, fake: FakeAws, quiet: bool = True) -> dict:
+    before = dict(fake.calls)
+    tracemalloc.reset_peak()
+    start = time.time()
+    error = None
+    out = open(os.devnull, 'w') if quiet else sys.stdout
+    try:
+        with contextlib.redirect_stdout(out):
+            func()
+    except Exception as e:  # pylint: disable=broad-except
+        error = f'{type(e).__name__}: {e}'
+    finally:
+        if quiet:
+            out.close()
+    seconds = time.time() - start
+    calls = {k: v - before.get(k, 0) for k, v in fake.calls.items() if v - before.get(k, 0)}
+    return {
+        'phase': name,
+        'seconds': round(seconds, 3),
+        'calls': sum(calls.values()),
+        'operations': dict(sorted(calls.items(), key=lambda x: -x[1])),
+        'peak_mb': round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 2),
+        'error': error,
+    }
+
+
+def run_benchmark(size: int, latency: float = 0, quiet: bool = True, latencies: dict = None) -> list:
+    work_dir = tempfile.mkdtemp(prefix=f'bench-{size}-')
+    fake = FakeAws(latency=latency, latencies=latencies)
+    try:
+        template = common_utils.load_template(make_app(os.path.join(work_dir, 'repo'), size))
+        phases = {
+            'lambda': lambda: LambdaDeployHelper(copy.deepcopy(template)).deploy(),
+            'stepfunc': lambda: StepFuncDeployHelper(copy.deepcopy(template)).deploy(),
+            'restapi': lambda: RestApiDeployHelper(copy.deepcopy(template)).deploy(),
+            'schedule': lambda: ScheduleDeployHelper(copy.deepcopy(template)).deploy(),
+            'lambda-noop': lambda: LambdaDeployHelper(copy.deepcopy(template)).deploy(),
+            'restapi-noop': lambda: RestApiDeployHelper(copy.deepcopy(template)).deploy(),
+            'destroy': lambda: DestroyHelper(copy.deepcopy(template)).remove(),
+            'graph': lambda: DeployScheduler(copy.deepcopy(template)).deploy(),
+            'graph-destroy': lambda: DestroyHelper(copy.deepcopy(template)).remove(),
+        }
+        results = []
+        tracemalloc.start()
+        with fake_environment(fake, work_dir):
+            for name in PHASES:
+                result = run_phase(name, phases[name], fake, quiet)
+                result['size'] = size
+                results.append(result)
+        tracemalloc.stop()
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def print_results(results: list, top: int = 3):
+    print('{:>6} {:<12} {:>9} {:>7} {:>8}  {}'.format('SIZE', 'PHASE', 'SECONDS', 'CALLS', 'PEAK MB', 'TOP CALLS'))
+    for r in results:
+        ops = ', '.join(f'{k}={v}' for k, v in list(r['operations'].items())[:top])
+        print('{:>6} {:<12} {:>9.2f} {:>7} {:>8.2f}  {}'.format(
+            r['size'], r['phase'], r['seconds'], r['calls'], r['peak_mb'], ops))
+        if r['error']:
+            print(f'\t[FAILED] {r["error"]}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--latency', type=float, default=0.02, help='SECONDS ADDED TO EVERY AWS CALL')
+    parser.add_argument('--json', help='WRITE THE RESULTS TO THIS FILE')
+    parser.add_argument('--verbose', action='store_true', help='SHOW THE OUTPUT OF THE DEPLOY HELPERS')
+    args = parser.parse_args()
+    results = []
+    for size in args.sizes:
+        results += run_benchmark(size, args.latency, quiet=not args.verbose)
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if any(r['error'] for r in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
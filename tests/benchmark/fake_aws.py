@@ -0,0 +1,521 @@
+"""
+In-memory stand-in for the AWS control-plane APIs used by the deploy helpers.
+
+It answers from a "before-call" botocore event handler, so the real boto3 clients (parameter validation,
+paginators, waiters, s3transfer) run unchanged and no request ever leaves the process. Every call is
+counted per "service.Operation" and can be delayed to simulate the network.
+
+    fake = FakeAws(latency=0.02)
+    settings.clients.add_hook(fake.register)
+"""
+import io
+import time
+import uuid
+import base64
+import hashlib
+import threading
+from datetime import datetime
+from collections import Counter
+
+import yaml
+from botocore.awsrequest import AWSResponse
+from botocore.response import StreamingBody
+
+ACCOUNT_ID = '123456789012'
+REGION = 'us-east-1'
+
+
+class FakeAwsError(Exception):
+    def __init__(self, code: str, status: int = 400, message: str = ''):
+        super().__init__(code)
+        self.code = code
+        self.status = status
+        self.message = message or code
+
+
+def not_found(code: str = 'ResourceNotFoundException', status: int = 404):
+    return FakeAwsError(code, status)
+
+
+def page(items: list, token, size: int) -> tuple:
+    """One page of "items" from the offset in "token", and the token of the next page (None at the end)."""
+    start = int(token or 0)
+    end = start + size
+    return items[start:end], (str(end) if end < len(items) else None)
+
+
+def get_name(name_or_arn: str) -> str:
+    # FUNCTION NAME FROM A NAME, A "NAME:QUALIFIER" OR AN ARN
+    if name_or_arn.startswith('arn:'):
+        return name_or_arn.split(':')[6]
+    return name_or_arn.split(':')[0]
+
+
+class FakeAws:
+    def __init__(self, latency: float = 0, latencies: dict = None, region: str = REGION):
+        self.latency = latency
+        self.latencies = latencies or {}  # {SERVICE: SECONDS}, OVERRIDES "latency"
+        self.region = region
+        self.calls = Counter()  # {'service.Operation': COUNT}
+        self.unknown = Counter()  # CALLS ANSWERED WITH AN EMPTY RESPONSE
+        self.objects = {}  # {(BUCKET, KEY): BYTES}
+        self.uploads = {}  # {UPLOAD_ID: {PART_NUMBER: BYTES}}
+        self.functions = {}  # {NAME: {'config', 'versions', 'aliases', 'concurrency'}}
+        self.roles = {}
+        self.policies = {}
+        self.attachments = {}  # {ROLE_NAME: [POLICY_ARN]}
+        self.machines = {}  # {ARN: DESCRIPTION}
+        self.log_groups = {}
+        self.rules = {}
+        self.targets = {}  # {RULE_NAME: [TARGET]}
+        self.apis = {}  # {API_ID: {'api', 'deployments', 'stages', 'resources'}}
+        self._lock = threading.RLock()
+
+    def register(self, client):
+        """Hook a boto3 client (ClientRegistry calls it for every client it creates)."""
+        service = client.meta.service_model.service_name
+        client.meta.events.register('before-parameter-build', self._keep_params)
+        client.meta.events.register('before-call', self._make_handler(service))
+
+    @staticmethod
+    def _keep_params(params, context, **kwargs):
+        context['fake_params'] = dict(params)
+
+    def _make_handler(self, service: str):
+        def handler(model, context, **kwargs):
+            return self.call(service, model.name, context.get('fake_params') or {})
+        return handler
+
+    def call(self, service: str, operation: str, params: dict) -> tuple:
+        name = f'{service}.{operation}'
+        with self._lock:
+            self.calls[name] += 1
+        delay = self.latencies.get(service, self.latency)
+        if delay:
+            time.sleep(delay)
+        func = getattr(self, f'{service}_{operation}'.replace('-', '_'), None)
+        status = 200
+        try:
+            with self._lock:
+                if func is None:
+                    self.unknown[name] += 1
+                    parsed = {}
+                else:
+                    parsed = dict(func(**params) or {})
+        except FakeAwsError as e:
+            status = e.status
+            parsed = {'Error': {'Code': e.code, 'Message': e.message}}
+        parsed['ResponseMetadata'] = {'HTTPStatusCode': status, 'RetryAttempts': 0, 'HTTPHeaders': {}}
+        return AWSResponse(None, status, {}, None), parsed
+
+    def count(self, prefix: str = '') -> int:
+        return sum(v for k, v in self.calls.items() if k.startswith(prefix))
+
+    # ----- STS -----
+    def sts_GetCallerIdentity(self, **kwargs):
+        return {'Account': ACCOUNT_ID, 'Arn': f'arn:aws:iam::{ACCOUNT_ID}:user/bench', 'UserId': 'bench'}
+
+    # ----- S3 -----
+    @staticmethod
+    def _read(body) -> bytes:
+        if isinstance(body, (bytes, bytearray)):
+            return bytes(body)
+        if isinstance(body, str):
+            return body.encode('utf-8')
+        if hasattr(body, 'seek'):
+            body.seek(0)
+        return body.read()
+
+    def s3_PutObject(self, Bucket, Key, Body=b'', **kwargs):
+        self.objects[(Bucket, Key)] = self._read(Body)
+        return {'ETag': hashlib.md5(self.objects[(Bucket, Key)]).hexdigest()}
+
+    def s3_HeadObject(self, Bucket, Key, **kwargs):
+        if (Bucket, Key) not in self.objects:
+            raise not_found('404')
+        return {'ContentLength': len(self.objects[(Bucket, Key)])}
+
+    def s3_DeleteObject(self, Bucket, Key, **kwargs):
+        self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def s3_GetObject(self, Bucket, Key, Range=None, **kwargs):
+        if (Bucket, Key) not in self.objects:
+            raise not_found('NoSuchKey')
+        data = self.objects[(Bucket, Key)]
+        if Range:
+            start, end = Range.replace('bytes=', '').split('-')
+            data = data[int(start):int(end) + 1]
+        return {'Body': StreamingBody(io.BytesIO(data), len(data)), 'ContentLength': len(data)}
+
+    def s3_ListObjectsV2(self, Bucket, Prefix='', ContinuationToken=None, MaxKeys=1000, **kwargs):
+        keys = sorted(k for b, k in self.objects if b == Bucket and k.startswith(Prefix))
+        keys, token = page(keys, ContinuationToken, MaxKeys)
+        resp = {'Contents': [{'Key': k, 'Size': len(self.objects[(Bucket, k)])} for k in keys], 'KeyCount': len(keys)}
+        resp.update({'IsTruncated': True, 'NextContinuationToken': token} if token else {'IsTruncated': False})
+        return resp
+
+    def s3_CreateMultipartUpload(self, Bucket, Key, **kwargs):
+        upload_id = uuid.uuid4().hex
+        self.uploads[upload_id] = {}
+        return {'Bucket': Bucket, 'Key': Key, 'UploadId': upload_id}
+
+    def s3_UploadPart(self, Bucket, Key, UploadId, PartNumber, Body=b'', **kwargs):
+        self.uploads[UploadId][PartNumber] = self._read(Body)
+        return {'ETag': hashlib.md5(self.uploads[UploadId][PartNumber]).hexdigest()}
+
+    def s3_CompleteMultipartUpload(self, Bucket, Key, UploadId, **kwargs):
+        parts = self.uploads.pop(UploadId)
+        self.objects[(Bucket, Key)] = b''.join(parts[i] for i in sorted(parts))
+        return {'Bucket': Bucket, 'Key': Key}
+
+    def s3_AbortMultipartUpload(self, UploadId, **kwargs):
+        self.uploads.pop(UploadId, None)
+
+    # ----- LAMBDA -----
+    def _get_function(self, name_or_arn: str) -> dict:
+        func = self.functions.get(get_name(name_or_arn))
+        if func is None:
+            raise not_found()
+        return func
+
+    def _function_arn(self, name: str) -> str:
+        return f'arn:aws:lambda:{self.region}:{ACCOUNT_ID}:function:{name}'
+
+    def _publish(self, func: dict) -> dict:
+        func['last_version'] += 1
+        version = str(func['last_version'])
+        func['versions'][version] = dict(func['config'], Version=version)
+        return func['versions'][version]
+
+    def lambda_ListFunctions(self, Marker=None, MaxItems=50, **kwargs):
+        configs = [dict(self.functions[k]['config']) for k in sorted(self.functions)]
+        configs, token = page(configs, Marker, MaxItems)
+        return {'Functions': configs, 'NextMarker': token} if token else {'Functions': configs}
+
+    def lambda_ListLayers(self, **kwargs):
+        return {'Layers': []}
+
+    def lambda_GetFunction(self, FunctionName, Qualifier=None, **kwargs):
+        func = self._get_function(FunctionName)
+        if Qualifier and Qualifier != '$LATEST':
+            version = func['aliases'].get(Qualifier, {}).get('FunctionVersion') or Qualifier
+            if version not in func['versions']:
+                raise not_found()
+            return {'Configuration': dict(func['versions'][version])}
+        return {'Configuration': dict(func['config'])}
+
+    def lambda_GetFunctionConfiguration(self, FunctionName, **kwargs):
+        return dict(self._get_function(FunctionName)['config'])
+
+    def lambda_ListVersionsByFunction(self, FunctionName, Marker=None, MaxItems=50, **kwargs):
+        func = self._get_function(FunctionName)
+        versions = [func['config']] + [func['versions'][k] for k in sorted(func['versions'], key=int)]
+        versions, token = page(versions, Marker, MaxItems)
+        return {'Versions': versions, 'NextMarker': token} if token else {'Versions': versions}
+
+    def lambda_ListAliases(self, FunctionName, Marker=None, MaxItems=50, **kwargs):
+        func = self._get_function(FunctionName)
+        aliases = [dict(func['aliases'][k]) for k in sorted(func['aliases'])]
+        aliases, token = page(aliases, Marker, MaxItems)
+        return {'Aliases': aliases, 'NextMarker': token} if token else {'Aliases': aliases}
+
+    def lambda_CreateFunction(self, FunctionName, Code, Publish=False, **kwargs):
+        if FunctionName in self.functions:
+            raise FakeAwsError('ResourceConflictException', 409)
+        blob = self.objects.get((Code.get('S3Bucket'), Code.get('S3Key'))) or b''
+        config = {
+            'FunctionName': FunctionName,
+            'FunctionArn': self._function_arn(FunctionName),
+            'Version': '$LATEST',
+            'CodeSha256': base64.b64encode(hashlib.sha256(blob).digest()).decode('utf-8'),
+            'CodeSize': len(blob),
+            'State': 'Active',
+            'LastUpdateStatus': 'Successful',
+        }
+        config.update({k: kwargs[k] for k in ['Role', 'Handler', 'Runtime', 'Timeout', 'MemorySize'] if k in kwargs})
+        config['Environment'] = kwargs.get('Environment') or {}
+        config['TracingConfig'] = kwargs.get('TracingConfig') or {'Mode': 'PassThrough'}
+        config['Layers'] = [{'Arn': x} for x in kwargs.get('Layers') or []]
+        if kwargs.get('EphemeralStorage'):
+            config['EphemeralStorage'] = kwargs['EphemeralStorage']
+        func = {'config': config, 'versions': {}, 'last_version': 0, 'aliases': {}, 'concurrency': {}}
+        self.functions[FunctionName] = func
+        return self._publish(func) if Publish else dict(config)
+
+    def lambda_UpdateFunctionCode(self, FunctionName, S3Bucket=None, S3Key=None, Publish=False, **kwargs):
+        func = self._get_function(FunctionName)
+        blob = self.objects.get((S3Bucket, S3Key)) or b''
+        func['config']['CodeSha256'] = base64.b64encode(hashlib.sha256(blob).digest()).decode('utf-8')
+        func['config']['CodeSize'] = len(blob)
+        return self._publish(func) if Publish else dict(func['config'])
+
+    def lambda_PublishVersion(self, FunctionName, **kwargs):
+        return self._publish(self._get_function(FunctionName))
+
+    def lambda_UpdateFunctionConfiguration(self, FunctionName, **kwargs):
+        func = self._get_function(FunctionName)
+        func['config'].update({k: v for k, v in kwargs.items() if k != 'Layers'})
+        if 'Layers' in kwargs:
+            func['config']['Layers'] = [{'Arn': x} for x in kwargs['Layers']]
+        return dict(func['config'])
+
+    def lambda_GetAlias(self, FunctionName, Name, **kwargs):
+        alias = self._get_function(FunctionName)['aliases'].get(Name)
+        if alias is None:
+            raise not_found()
+        return dict(alias)
+
+    def lambda_CreateAlias(self, FunctionName, Name, FunctionVersion, **kwargs):
+        func = self._get_function(FunctionName)
+        arn = f'{func["config"]["FunctionArn"]}:{Name}'
+        func['aliases'][Name] = {'AliasArn': arn, 'Name': Name, 'FunctionVersion': FunctionVersion}
+        return dict(func['aliases'][Name])
+
+    def lambda_UpdateAlias(self, FunctionName, Name, FunctionVersion, **kwargs):
+        self.lambda_GetAlias(FunctionName, Name)
+        return self.lambda_CreateAlias(FunctionName, Name, FunctionVersion)
+
+    def lambda_GetProvisionedConcurrencyConfig(self, FunctionName, Qualifier, **kwargs):
+        count = self._get_function(FunctionName)['concurrency'].get(Qualifier)
+        if not count:
+            raise not_found('ProvisionedConcurrencyConfigNotFoundException')
+        return {'RequestedProvisionedConcurrentExecutions': count}
+
+    def lambda_PutProvisionedConcurrencyConfig(self, FunctionName, Qualifier, ProvisionedConcurrentExecutions):
+        self._get_function(FunctionName)['concurrency'][Qualifier] = ProvisionedConcurrentExecutions
+        return {'RequestedProvisionedConcurrentExecutions': ProvisionedConcurrentExecutions}
+
+    def lambda_DeleteProvisionedConcurrencyConfig(self, FunctionName, Qualifier, **kwargs):
+        self._get_function(FunctionName)['concurrency'].pop(Qualifier, None)
+
+    def lambda_DeleteFunction(self, FunctionName, Qualifier=None, **kwargs):
+        func = self._get_function(FunctionName)
+        if Qualifier:
+            func['versions'].pop(Qualifier, None)
+        else:
+            self.functions.pop(func['config']['FunctionName'])
+
+    # ----- IAM -----
+    def iam_ListRoles(self, PathPrefix='/', Marker=None, MaxItems=100, **kwargs):
+        roles, token = page([self.roles[k] for k in sorted(self.roles)], Marker, MaxItems)
+        return {'Roles': roles, 'IsTruncated': bool(token), 'Marker': token} if token else {'Roles': roles}
+
+    def iam_ListPolicies(self, Scope='All', PathPrefix='/', Marker=None, MaxItems=100, **kwargs):
+        policies, token = page([self.policies[k] for k in sorted(self.policies)], Marker, MaxItems)
+        resp = {'Policies': policies, 'IsTruncated': bool(token)}
+        if token:
+            resp['Marker'] = token
+        return resp
+
+    def iam_GetRole(self, RoleName, **kwargs):
+        if RoleName not in self.roles:
+            raise not_found('NoSuchEntity')
+        return {'Role': self.roles[RoleName]}
+
+    def iam_CreateRole(self, RoleName, **kwargs):
+        if RoleName in self.roles:
+            raise FakeAwsError('EntityAlreadyExists', 409)
+        self.roles[RoleName] = {
+            'RoleName': RoleName, 'Path': '/', 'RoleId': uuid.uuid4().hex, 'CreateDate': datetime.utcnow(),
+            'Arn': f'arn:aws:iam::{ACCOUNT_ID}:role/{RoleName}',
+        }
+        self.attachments[RoleName] = []
+        return {'Role': self.roles[RoleName]}
+
+    def iam_DeleteRole(self, RoleName, **kwargs):
+        if self.attachments.get(RoleName):
+            raise FakeAwsError('DeleteConflict', 409)
+        self.iam_GetRole(RoleName)
+        self.roles.pop(RoleName)
+        self.attachments.pop(RoleName, None)
+
+    def iam_CreatePolicy(self, PolicyName, PolicyDocument, **kwargs):
+        arn = f'arn:aws:iam::{ACCOUNT_ID}:policy/{PolicyName}'
+        if arn in self.policies:
+            raise FakeAwsError('EntityAlreadyExists', 409)
+        self.policies[arn] = {'PolicyName': PolicyName, 'Arn': arn, 'Path': '/', 'DefaultVersionId': 'v1'}
+        return {'Policy': self.policies[arn]}
+
+    def iam_GetPolicy(self, PolicyArn, **kwargs):
+        if PolicyArn not in self.policies:
+            raise not_found('NoSuchEntity')
+        return {'Policy': self.policies[PolicyArn]}
+
+    def iam_ListPolicyVersions(self, PolicyArn, **kwargs):
+        self.iam_GetPolicy(PolicyArn)
+        return {'Versions': [{'VersionId': 'v1', 'IsDefaultVersion': True}], 'IsTruncated': False}
+
+    def iam_DeletePolicy(self, PolicyArn, **kwargs):
+        if any(PolicyArn in x for x in self.attachments.values()):
+            raise FakeAwsError('DeleteConflict', 409)
+        self.iam_GetPolicy(PolicyArn)
+        self.policies.pop(PolicyArn)
+
+    def iam_ListAttachedRolePolicies(self, RoleName, **kwargs):
+        self.iam_GetRole(RoleName)
+        attached = [{'PolicyArn': x, 'PolicyName': x.split('/')[-1]} for x in self.attachments[RoleName]]
+        return {'AttachedPolicies': attached, 'IsTruncated': False}
+
+    def iam_AttachRolePolicy(self, RoleName, PolicyArn, **kwargs):
+        self.iam_GetRole(RoleName)
+        self.iam_GetPolicy(PolicyArn)
+        if PolicyArn not in self.attachments[RoleName]:
+            self.attachments[RoleName].append(PolicyArn)
+
+    def iam_DetachRolePolicy(self, RoleName, PolicyArn, **kwargs):
+        self.iam_GetRole(RoleName)
+        self.attachments[RoleName].remove(PolicyArn)
+
+    # ----- STEP FUNCTIONS -----
+    def stepfunctions_ListStateMachines(self, nextToken=None, maxResults=100, **kwargs):
+        machines = [self.machines[k] for k in sorted(self.machines)]
+        machines, token = page(machines, nextToken, maxResults)
+        items = [{k: x[k] for k in ['name', 'stateMachineArn', 'type', 'creationDate']} for x in machines]
+        return {'stateMachines': items, 'nextToken': token} if token else {'stateMachines': items}
+
+    def stepfunctions_DescribeStateMachine(self, stateMachineArn, **kwargs):
+        if stateMachineArn not in self.machines:
+            raise FakeAwsError('StateMachineDoesNotExist', 400)
+        return dict(self.machines[stateMachineArn])
+
+    def stepfunctions_CreateStateMachine(self, name, **kwargs):
+        arn = f'arn:aws:states:{self.region}:{ACCOUNT_ID}:stateMachine:{name}'
+        if arn in self.machines:
+            raise FakeAwsError('StateMachineAlreadyExists', 400)
+        self.machines[arn] = dict(kwargs, name=name, stateMachineArn=arn, creationDate=datetime.utcnow())
+        self.machines[arn].setdefault('type', 'STANDARD')
+        self.machines[arn].pop('tags', None)
+        return {'stateMachineArn': arn, 'creationDate': self.machines[arn]['creationDate']}
+
+    def stepfunctions_UpdateStateMachine(self, stateMachineArn, **kwargs):
+        self.stepfunctions_DescribeStateMachine(stateMachineArn)
+        self.machines[stateMachineArn].update(kwargs)
+        return {'updateDate': datetime.utcnow()}
+
+    def stepfunctions_DeleteStateMachine(self, stateMachineArn, **kwargs):
+        self.machines.pop(stateMachineArn, None)
+
+    # ----- CLOUDWATCH LOGS -----
+    def logs_DescribeLogGroups(self, logGroupNamePrefix='', nextToken=None, limit=50, **kwargs):
+        groups = [self.log_groups[k] for k in sorted(self.log_groups) if k.startswith(logGroupNamePrefix)]
+        groups, token = page(groups, nextToken, limit)
+        return {'logGroups': groups, 'nextToken': token} if token else {'logGroups': groups}
+
+    def logs_CreateLogGroup(self, logGroupName, **kwargs):
+        if logGroupName in self.log_groups:
+            raise FakeAwsError('ResourceAlreadyExistsException', 400)
+        arn = f'arn:aws:logs:{self.region}:{ACCOUNT_ID}:log-group:{logGroupName}:*'
+        self.log_groups[logGroupName] = {'logGroupName': logGroupName, 'arn': arn}
+
+    def logs_PutRetentionPolicy(self, logGroupName, retentionInDays, **kwargs):
+        self.log_groups[logGroupName]['retentionInDays'] = retentionInDays
+
+    # ----- EVENTBRIDGE -----
+    def events_ListRules(self, NamePrefix='', NextToken=None, Limit=100, **kwargs):
+        rules = [self.rules[k] for k in sorted(self.rules) if k.startswith(NamePrefix)]
+        rules, token = page(rules, NextToken, Limit)
+        return {'Rules': rules, 'NextToken': token} if token else {'Rules': rules}
+
+    def events_DescribeRule(self, Name, **kwargs):
+        if Name not in self.rules:
+            raise not_found()
+        return dict(self.rules[Name])
+
+    def events_PutRule(self, Name, **kwargs):
+        arn = f'arn:aws:events:{self.region}:{ACCOUNT_ID}:rule/{Name}'
+        rule = {k: v for k, v in kwargs.items() if k != 'Tags'}
+        self.rules[Name] = dict(rule, Name=Name, Arn=arn)
+        self.targets.setdefault(Name, [])
+        return {'RuleArn': arn}
+
+    def events_ListTargetsByRule(self, Rule, NextToken=None, Limit=100, **kwargs):
+        self.events_DescribeRule(Rule)
+        targets, token = page(self.targets[Rule], NextToken, Limit)
+        return {'Targets': targets, 'NextToken': token} if token else {'Targets': targets}
+
+    def events_PutTargets(self, Rule, Targets, **kwargs):
+        self.events_DescribeRule(Rule)
+        ids = [x['Id'] for x in Targets]
+        self.targets[Rule] = [x for x in self.targets[Rule] if x['Id'] not in ids] + list(Targets)
+        return {'FailedEntryCount': 0, 'FailedEntries': []}
+
+    def events_RemoveTargets(self, Rule, Ids, **kwargs):
+        self.targets[Rule] = [x for x in self.targets.get(Rule) or [] if x['Id'] not in Ids]
+        return {'FailedEntryCount': 0, 'FailedEntries': []}
+
+    def events_DeleteRule(self, Name, **kwargs):
+        if self.targets.get(Name):
+            raise FakeAwsError('ValidationException', 400, 'Rule still has targets.')
+        self.rules.pop(Name, None)
+        self.targets.pop(Name, None)
+
+    # ----- API GATEWAY (REST) -----
+    def _get_api(self, restApiId: str) -> dict:
+        if restApiId not in self.apis:
+            raise not_found('NotFoundException')
+        return self.apis[restApiId]
+
+    def apigateway_GetRestApis(self, position=None, limit=25, **kwargs):
+        apis = [self.apis[k]['api'] for k in sorted(self.apis)]
+        apis, token = page(apis, position, limit)
+        return {'items': apis, 'position': token} if token else {'items': apis}
+
+    def apigateway_CreateRestApi(self, name, **kwargs):
+        api_id = uuid.uuid4().hex[:10]
+        api = {'id': api_id, 'name': name, 'createdDate': datetime.utcnow()}
+        self.apis[api_id] = {'api': api, 'deployments': [], 'stages': [], 'resources': {}}
+        return dict(api)
+
+    def apigateway_PutRestApi(self, restApiId, body, mode='merge', **kwargs):
+        api = self._get_api(restApiId)
+        paths = yaml.safe_load(self._read(body).decode('utf-8')).get('paths') or {}
+        resources = {'/': {'id': 'root', 'path': '/'}} if mode == 'overwrite' else api['resources']
+        for path, methods in paths.items():
+            resources[path] = {
+                'id': hashlib.md5(path.encode('utf-8')).hexdigest()[:6], 'path': path,
+                'resourceMethods': {m.upper(): {} for m in methods if not m.startswith('x-')},
+            }
+        api['resources'] = resources
+        return dict(api['api'])
+
+    def apigateway_DeleteMethod(self, restApiId, resourceId, httpMethod, **kwargs):
+        resource = next((x for x in self._get_api(restApiId)['resources'].values() if x['id'] == resourceId), None)
+        if resource is None or httpMethod not in resource.get('resourceMethods', {}):
+            raise not_found('NotFoundException')
+        resource['resourceMethods'].pop(httpMethod)
+
+    def apigateway_GetResources(self, restApiId, position=None, limit=25, **kwargs):
+        resources = self._get_api(restApiId)['resources']
+        resources, token = page([resources[k] for k in sorted(resources)], position, limit)
+        return {'items': resources, 'position': token} if token else {'items': resources}
+
+    def apigateway_GetDeployments(self, restApiId, position=None, limit=25, **kwargs):
+        deployments, token = page(self._get_api(restApiId)['deployments'], position, limit)
+        return {'items': deployments, 'position': token} if token else {'items': deployments}
+
+    def apigateway_CreateDeployment(self, restApiId, **kwargs):
+        deployment = {'id': uuid.uuid4().hex[:6], 'createdDate': datetime.utcnow()}
+        self._get_api(restApiId)['deployments'].append(deployment)
+        return dict(deployment)
+
+    def apigateway_GetStages(self, restApiId, **kwargs):
+        return {'item': list(self._get_api(restApiId)['stages'])}
+
+    def apigateway_CreateStage(self, restApiId, stageName, deploymentId, **kwargs):
+        stage = {'stageName': stageName, 'deploymentId': deploymentId}
+        self._get_api(restApiId)['stages'].append(stage)
+        return dict(stage)
+
+    def apigateway_UpdateStage(self, restApiId, stageName, patchOperations, **kwargs):
+        stage = next((x for x in self._get_api(restApiId)['stages'] if x['stageName'] == stageName), None)
+        if stage is None:
+            raise not_found('NotFoundException')
+        for op in patchOperations:
+            if op['path'] == '/deploymentId':
+                stage['deploymentId'] = op['value']
+        return dict(stage)
+
+    def apigateway_DeleteRestApi(self, restApiId, **kwargs):
+        self._get_api(restApiId)
+        self.apis.pop(restApiId)
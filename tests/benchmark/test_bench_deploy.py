@@ -0,0 +1,274 @@
+import io
+import os
+import ast
+import copy
+import shutil
+import tempfile
+import threading
+import contextlib
+from unittest import TestCase
+from unittest.mock import patch
+
+import yaml
+
+import settings
+from utils import dag_utils
+from utils import common_utils
+from tests.benchmark import bench_deploy
+from tests.benchmark.fake_aws import FakeAws
+from tests.benchmark.fake_aws import FakeAwsError
+
+
+class TestDeployBenchmark(TestCase):
+    """Smallest benchmark run: every phase must pass, and the bulk listings must not grow with the app."""
+
+    SIZE = 24  # 2 STATE MACHINES, SHARING THEIR POLICY
+
+    @classmethod
+    def setUpClass(cls):
+        # SLOW IAM CALLS, SO THAT TASKS RACING ON A SHARED POLICY OR ROLE DO OVERLAP
+        results = bench_deploy.run_benchmark(size=cls.SIZE, latencies={'iam': 0.01})
+        cls.results = {r['phase']: r for r in results}
+
+    def test_phases(self):
+        self.assertEqual(bench_deploy.PHASES, list(self.results))
+        self.assertEqual({}, {k: r['error'] for k, r in self.results.items() if r['error']})
+
+    def test_call_counts(self):
+        ops = self.results['lambda']['operations']
+        self.assertEqual(1, ops['lambda.ListFunctions'])
+        self.assertEqual(1, ops['iam.ListRoles'])
+        self.assertEqual(1, ops['sts.GetCallerIdentity'])
+        self.assertEqual(self.SIZE, ops['lambda.CreateFunction'])
+        self.assertEqual(1, self.results['schedule']['operations']['events.ListRules'])
+
+    def test_noop_redeploy(self):
+        ops = self.results['lambda-noop']['operations']
+        for name in ['lambda.CreateFunction', 'lambda.UpdateFunctionCode', 'lambda.UpdateAlias', 's3.PutObject']:
+            self.assertNotIn(name, ops)
+        # VERSIONS & ALIASES COME FROM THE SNAPSHOT, NO "GET" CALL PER FUNCTION
+        for name in ['lambda.GetFunction', 'lambda.GetAlias']:
+            self.assertNotIn(name, ops)
+        self.assertEqual(self.SIZE, ops['lambda.ListAliases'])
+
+    def test_restapi(self):
+        ops = self.results['restapi']['operations']
+        self.assertEqual(1, ops['apigateway.PutRestApi'])
+        self.assertEqual(1, ops['apigateway.CreateDeployment'])
+        ops = self.results['restapi-noop']['operations']
+        for name in ['apigateway.PutRestApi', 'apigateway.CreateDeployment', 's3.PutObject']:
+            self.assertNotIn(name, ops)
+
+    def test_graph(self):
+        ops = self.results['graph']['operations']
+        self.assertEqual(self.SIZE, ops['lambda.CreateFunction'])
+        self.assertEqual(2, ops['stepfunctions.CreateStateMachine'])
+        self.assertEqual(5, ops['iam.CreatePolicy'])  # LAMBDA, STEPFUNC & 3 SCHEDULE POLICIES, EACH ONCE
+
+    def test_destroy(self):
+        ops = self.results['destroy']['operations']
+        self.assertEqual(self.SIZE, ops['lambda.DeleteFunction'])
+        self.assertEqual(self.SIZE, ops['events.DeleteRule'])
+        self.assertEqual(1, ops['apigateway.DeleteRestApi'])
+
+
+class TestLambdaDeploy(TestCase):
+    """Deploy two functions, then change or break one of them."""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.fake = FakeAws()
+        repo_path = bench_deploy.make_app(os.path.join(self.work_dir, 'repo'), 2)
+        self.template = common_utils.load_template(repo_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def deploy(self, helper=None) -> dict:
+        before = dict(self.fake.calls)
+        with open(os.devnull, 'w') as out, contextlib.redirect_stdout(out):
+            (helper or bench_deploy.LambdaDeployHelper(copy.deepcopy(self.template))).deploy()
+        return {k: v - before.get(k, 0) for k, v in self.fake.calls.items() if v - before.get(k, 0)}
+
+    def get_alias_config(self, name: str) -> dict:
+        func = next(v for k, v in self.fake.functions.items() if k.endswith(name))
+        return func['versions'][func['aliases'][settings.FUNC_ALIAS]['FunctionVersion']]
+
+    def test_deploy__plan_failure(self):
+        build = bench_deploy.lambda_utils.build_python_code_archive
+
+        def build_or_fail(repo_path, specs):
+            assert specs['name'] != 'func-0000', 'BROKEN BUILD'
+            return build(repo_path, specs)
+
+        with bench_deploy.fake_environment(self.fake, self.work_dir), \
+                patch.object(bench_deploy.lambda_utils, 'build_python_code_archive', side_effect=build_or_fail):
+            helper = bench_deploy.LambdaDeployHelper(copy.deepcopy(self.template))
+            with self.assertRaisesRegex(RuntimeError, 'func-0000'):
+                self.deploy(helper)
+        statuses = {k: r['status'] for k, r in helper.results.items()}
+        self.assertEqual({'func-0000': 'FAILED', 'func-0001': 'OK'}, statuses)
+        self.assertEqual(['func-0001'], [k[-9:] for k in self.fake.functions])
+
+    @patch('settings.ENABLE_LAMBDA_CONFIG_UPDATE', True)
+    def test_deploy__config_only(self):
+        with bench_deploy.fake_environment(self.fake, self.work_dir):
+            self.deploy()
+            self.template['resources']['lambda'][0]['mem'] = 256
+            ops = self.deploy()
+            self.assertNotIn('lambda.UpdateFunctionCode', ops)
+            self.assertEqual(1, ops['lambda.UpdateFunctionConfiguration'])
+            self.assertEqual(1, ops['lambda.PublishVersion'])
+            self.assertEqual(1, ops['lambda.UpdateAlias'])
+            self.assertEqual(256, self.get_alias_config('func-0000')['MemorySize'])
+            self.assertEqual(128, self.get_alias_config('func-0001')['MemorySize'])
+            ops = self.deploy()
+            for name in ['lambda.UpdateFunctionConfiguration', 'lambda.PublishVersion', 'lambda.UpdateAlias']:
+                self.assertNotIn(name, ops)
+
+
+class TestLambdaDeployPool(TestCase):
+    """Functions are deployed by a pool of workers, one failing function leaves the others deployed."""
+
+    SIZE = 3
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.fake = FakeAws()
+        repo_path = bench_deploy.make_app(os.path.join(self.work_dir, 'repo'), self.SIZE)
+        self.template = common_utils.load_template(repo_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_deploy__failure_isolated(self):
+        create = bench_deploy.lambda_utils.create_python_function
+        # EVERY WORKER WAITS FOR THE OTHERS: PASSES ONLY IF ALL FUNCTIONS ARE DEPLOYED AT THE SAME TIME
+        barrier = threading.Barrier(self.SIZE, timeout=10)
+
+        def create_or_fail(specs):
+            barrier.wait()
+            assert specs['name'] != 'func-0001', 'BROKEN FUNCTION'
+            return create(specs)
+
+        out = io.StringIO()
+        with bench_deploy.fake_environment(self.fake, self.work_dir), \
+                patch.object(settings, 'LAMBDA_DEPLOY_CONCURRENCY', self.SIZE), \
+                patch.object(bench_deploy.lambda_utils, 'create_python_function', side_effect=create_or_fail), \
+                contextlib.redirect_stdout(out):
+            helper = bench_deploy.LambdaDeployHelper(copy.deepcopy(self.template))
+            with self.assertRaisesRegex(RuntimeError, 'func-0001'):
+                helper.deploy()
+        self.assertEqual({'func-0000': 'OK', 'func-0001': 'FAILED', 'func-0002': 'OK'},
+                         {k: r['status'] for k, r in helper.results.items()})
+        self.assertIn('BROKEN FUNCTION', helper.results['func-0001']['error'])
+        self.assertEqual(['func-0000', 'func-0002'], sorted(k[-9:] for k in self.fake.functions))
+        # THE SUMMARY IS PRINTED BEFORE THE RUN FAILS
+        summary = out.getvalue().split('LAMBDA DEPLOYMENT SUMMARY:')[1]
+        self.assertIn('[FAILED] func-0001', summary)
+        total = next(x for x in summary.splitlines() if x.startswith('TOTAL: '))
+        self.assertEqual({'OK': 2, 'FAILED': 1}, ast.literal_eval(total[len('TOTAL: '):]))
+
+
+class TestDestroyResume(TestCase):
+    """Teardown only removes the template's resources, and resumes from its log without sparing recreated ones."""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.fake = FakeAws()
+        repo_path = bench_deploy.make_app(os.path.join(self.work_dir, 'repo'), 2)
+        self.template = common_utils.load_template(repo_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def destroy(self, template: dict, done: list) -> dict:
+        helper = bench_deploy.DestroyHelper(copy.deepcopy(template))
+        os.makedirs(os.path.dirname(helper.log_path), exist_ok=True)
+        log = dag_utils.TaskLog(helper.log_path)
+        for name in done:
+            log.record(f'lambda:{name}', {'status': dag_utils.DONE})
+        before = dict(self.fake.calls)
+        helper.remove()
+        self.assertFalse(os.path.isfile(helper.log_path))
+        return {k: v - before.get(k, 0) for k, v in self.fake.calls.items() if v - before.get(k, 0)}
+
+    def test_remove__recreated_resources(self):
+        with bench_deploy.fake_environment(self.fake, self.work_dir), \
+                open(os.devnull, 'w') as out, contextlib.redirect_stdout(out):
+            bench_deploy.LambdaDeployHelper(copy.deepcopy(self.template)).deploy()
+            self.destroy(self.template, done=list(self.fake.functions))
+        self.assertEqual({}, self.fake.functions)
+
+    def test_remove__resume_skips_removed(self):
+        with bench_deploy.fake_environment(self.fake, self.work_dir), \
+                open(os.devnull, 'w') as out, contextlib.redirect_stdout(out):
+            bench_deploy.LambdaDeployHelper(copy.deepcopy(self.template)).deploy()
+            removed = sorted(self.fake.functions)[0]
+            self.fake.functions.pop(removed)
+            ops = self.destroy(self.template, done=[removed])
+        self.assertEqual(1, ops['lambda.DeleteFunction'])
+        self.assertEqual({}, self.fake.functions)
+
+    def test_remove__template_resources_only(self):
+        with bench_deploy.fake_environment(self.fake, self.work_dir), \
+                open(os.devnull, 'w') as out, contextlib.redirect_stdout(out):
+            bench_deploy.LambdaDeployHelper(copy.deepcopy(self.template)).deploy()
+            template = copy.deepcopy(self.template)
+            template['resources']['lambda'] = template['resources']['lambda'][:1]
+            self.destroy(template, done=[])
+        self.assertEqual(['func-0001'], [k[-9:] for k in self.fake.functions])
+
+
+class TestRestApiRouteDiff(TestCase):
+    """Redeploy after editing the swagger: only the changed routes are pushed, in one new deployment."""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.fake = FakeAws()
+        repo_path = bench_deploy.make_app(os.path.join(self.work_dir, 'repo'), 5)
+        self.template = common_utils.load_template(repo_path)
+        self.swagger_path = os.path.join(repo_path, 'definitions', 'swagger.yaml')
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def deploy(self) -> dict:
+        before = dict(self.fake.calls)
+        with open(os.devnull, 'w') as out, contextlib.redirect_stdout(out):
+            bench_deploy.RestApiDeployHelper(copy.deepcopy(self.template)).deploy()
+        return {k: v - before.get(k, 0) for k, v in self.fake.calls.items() if v - before.get(k, 0)}
+
+    def test_deploy__changed_routes(self):
+        with bench_deploy.fake_environment(self.fake, self.work_dir):
+            self.deploy()
+            with open(self.swagger_path) as f:
+                swagger = yaml.safe_load(f)
+            swagger['paths']['/r1']['get']['summary'] = 'changed'
+            swagger['paths'].pop('/r2')
+            with open(self.swagger_path, 'w') as f:
+                yaml.safe_dump(swagger, f)
+            ops = self.deploy()
+            self.assertEqual(1, ops['apigateway.PutRestApi'])
+            self.assertEqual(1, ops['apigateway.DeleteMethod'])
+            self.assertEqual(1, ops['apigateway.CreateDeployment'])
+            self.assertEqual(1, ops['apigateway.UpdateStage'])
+            api = next(iter(self.fake.apis.values()))
+            self.assertEqual({}, api['resources']['/r2']['resourceMethods'])
+            self.assertEqual(api['deployments'][-1]['id'], api['stages'][0]['deploymentId'])
+            self.assertNotIn('apigateway.PutRestApi', self.deploy())
+
+    def test_destroy__removes_route_state(self):
+        with bench_deploy.fake_environment(self.fake, self.work_dir), \
+                open(os.devnull, 'w') as out, contextlib.redirect_stdout(out):
+            self.deploy()
+            self.assertEqual(1, len([k for _, k in self.fake.objects if k.endswith('-ROUTES.json')]))
+            bench_deploy.DestroyHelper(copy.deepcopy(self.template)).remove()
+        self.assertEqual([], [k for _, k in self.fake.objects if k.endswith('-ROUTES.json')])
+
+    def test_route_state__s3_error(self):
+        with bench_deploy.fake_environment(self.fake, self.work_dir):
+            self.assertEqual({}, bench_deploy.rest_api_utils.get_route_state('missing'))
+            with patch.object(self.fake, 's3_HeadObject', side_effect=FakeAwsError('AccessDenied', 403)):
+                with self.assertRaisesRegex(Exception, 'AccessDenied'):
+                    bench_deploy.rest_api_utils.get_route_state('missing')
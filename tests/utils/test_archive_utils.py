@@ -0,0 +1,61 @@
+import io
+import os
+import shutil
+import zipfile
+import tempfile
+from unittest import TestCase
+
+from utils import archive_utils
+from utils import layer_utils
+from utils import lambda_utils
+
+
+class TestArchive(TestCase):
+    def setUp(self):
+        self.repo_path = tempfile.mkdtemp()
+        for relpath in ['app/handler.py', 'app/__pycache__/handler.pyc', 'tests/test_a.py', 'README.md']:
+            path = os.path.join(self.repo_path, relpath)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(relpath * 100)
+        os.chmod(os.path.join(self.repo_path, 'app/handler.py'), 0o755)
+
+    def tearDown(self):
+        shutil.rmtree(self.repo_path)
+
+    def test_list_files__ignored(self):
+        patterns = ['tests/*', '*/__pycache__/*']
+        relpaths = archive_utils.list_files(self.repo_path, patterns)
+        self.assertEqual(['README.md', 'app/handler.py'], relpaths)
+        self.assertEqual(['app/handler.py'], archive_utils.list_files(self.repo_path, patterns, prefix='app'))
+
+    def test_build_zip__readable(self):
+        relpaths = archive_utils.list_files(self.repo_path)
+        buffer = io.BytesIO()
+        summary = archive_utils.build_zip(self.repo_path, relpaths, buffer)
+        self.assertEqual(len(relpaths), summary['files'])
+        self.assertEqual(len(buffer.getvalue()), summary['zip_size'])
+        with zipfile.ZipFile(buffer) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(relpaths, [x for x in zf.namelist() if not x.endswith('/')])
+            self.assertEqual(['app/', 'app/__pycache__/', 'tests/'], [x for x in zf.namelist() if x.endswith('/')])
+            self.assertTrue(zf.getinfo('app/').is_dir())
+            self.assertEqual(b'README.md' * 100, zf.read('README.md'))
+            self.assertEqual(0o100755, zf.getinfo('app/handler.py').external_attr >> 16)
+
+    def test_build_zip__non_seekable_stream(self):
+        relpaths = archive_utils.list_files(self.repo_path)
+        buffer = io.BytesIO()
+        archive_utils.build_zip(self.repo_path, relpaths, layer_utils.TeeWriter(buffer))
+        with zipfile.ZipFile(buffer) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(b'README.md' * 100, zf.read('README.md'))
+
+    def test_build_python_code_archive__same_sha(self):
+        specs = {'name': 'func1', 'upload-ignore': ['tests/*']}
+        blob1 = lambda_utils.build_python_code_archive(self.repo_path, specs)
+        sha1 = specs['code_sha256']
+        os.utime(os.path.join(self.repo_path, 'README.md'), (0, 0))
+        blob2 = lambda_utils.build_python_code_archive(self.repo_path, specs)
+        self.assertEqual(blob1, blob2)
+        self.assertEqual(sha1, specs['code_sha256'])
@@ -0,0 +1,49 @@
+import time
+import asyncio
+import threading
+from types import ModuleType
+from unittest import TestCase
+
+from utils import async_utils
+
+
+class TestAsyncFacade(TestCase):
+    def setUp(self):
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+        self.module = ModuleType('fake_utils')
+        self.module.get_info = lambda *args, **kwargs: self.get_info(*args, **kwargs)
+        self.module.get_info.__name__ = 'get_info'
+        self.module.PREFIX = 'x-'
+        self.facade = async_utils.AsyncFacade(limits={'fake': 2}, max_workers=8)
+        self.aio = async_utils.AsyncModule(self.module, 'fake', self.facade.limiter, self.facade.executor)
+
+    def tearDown(self):
+        self.facade.executor.shutdown()
+
+    def get_info(self, name, suffix=''):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+        return name + suffix
+
+    def test_wrapper(self):
+        self.assertEqual('get_info', self.aio.get_info.__name__)
+        self.assertEqual('x-', self.aio.PREFIX)
+        self.assertEqual('a!', async_utils.run(self.aio.get_info('a', suffix='!')))
+
+    def test_map__service_limit(self):
+        names = [f'func{i}' for i in range(8)]
+        results = async_utils.run(self.facade.map(self.aio.get_info, names))
+        self.assertEqual(names, results)
+        self.assertEqual(2, self.peak)
+
+    def test_limiter__per_loop(self):
+        # A NEW LOOP (EVERY async_utils.run) GETS ITS OWN SEMAPHORES
+        async def get():
+            return self.facade.limiter.get('fake')
+        self.assertIsNot(asyncio.run(get()), asyncio.run(get()))
@@ -0,0 +1,41 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from utils.aws_clients import ClientRegistry
+
+
+class TestClientRegistry(TestCase):
+    def setUp(self):
+        self.mock_session = MagicMock()
+        self.patches = [
+            patch('utils.aws_clients.session.Session', return_value=self.mock_session),
+        ]
+        _ = [p.start() for p in self.patches]
+
+    def tearDown(self):
+        _ = [p.stop() for p in self.patches]
+
+    def test_lazy_client__not_created_until_used(self):
+        registry = ClientRegistry(region_name='us-east-1')
+        client = registry.lazy_client('lambda')
+        self.mock_session.client.assert_not_called()
+        client.list_functions()
+        self.mock_session.client.assert_called_once()
+        self.assertEqual('lambda', self.mock_session.client.call_args[0][0])
+
+    def test_get_client__cached_per_service_and_region(self):
+        self.mock_session.client.side_effect = lambda *args, **kwargs: MagicMock()
+        registry = ClientRegistry(region_name='us-east-1')
+        c1 = registry.get_client('iam')
+        c2 = registry.get_client('iam')
+        c3 = registry.get_client('iam', region_name='us-west-2')
+        self.assertIs(c1, c2)
+        self.assertIsNot(c1, c3)
+        self.assertEqual(2, self.mock_session.client.call_count)
+
+    def test_get_account_id__memoized(self):
+        self.mock_session.client().get_caller_identity.return_value = {'Account': '123'}
+        registry = ClientRegistry(region_name='us-east-1')
+        self.assertEqual('123', registry.get_account_id())
+        self.assertEqual('123', registry.get_account_id())
+        self.assertEqual(1, self.mock_session.client().get_caller_identity.call_count)
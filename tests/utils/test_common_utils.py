@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+import subprocess
+from unittest import TestCase
+from unittest.mock import patch
+
+from utils import common_utils
+
+
+class TestDownloadApplicationCode(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.origin = os.path.join(self.tmp_dir, 'origin')
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+        self.git('init', '-q', '-b', 'main', self.origin)
+        self.commit('v1')
+        self.git('-C', self.origin, 'tag', '-a', 'release-1', '-m', 'release-1')
+        self.patches = [
+            patch('utils.common_utils.settings.REPO_URL', f'file://{self.origin}'),
+            patch('utils.common_utils.settings.REPO_CACHE_DIR', self.cache_dir),
+            patch('utils.common_utils.settings.REPO_CACHE_MAX_COUNT', 2),
+            patch('utils.common_utils.settings.BUILD_NO', 'main'),
+        ]
+        _ = [p.start() for p in self.patches]
+
+    def tearDown(self):
+        _ = [p.stop() for p in self.patches]
+        shutil.rmtree(self.tmp_dir)
+
+    @staticmethod
+    def git(*args) -> str:
+        cmd = ['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com'] + list(args)
+        return subprocess.check_output(cmd, universal_newlines=True).strip()
+
+    def commit(self, content: str) -> str:
+        with open(os.path.join(self.origin, 'version.txt'), 'w') as f:
+            f.write(content)
+        self.git('-C', self.origin, 'add', 'version.txt')
+        self.git('-C', self.origin, 'commit', '-q', '-m', content)
+        return self.git('-C', self.origin, 'rev-parse', 'HEAD')
+
+    @staticmethod
+    def read_version(path: str) -> str:
+        with open(os.path.join(path, 'version.txt')) as f:
+            return f.read()
+
+    def test_resolve_commit(self):
+        head = self.git('-C', self.origin, 'rev-parse', 'HEAD')
+        self.assertEqual(head, common_utils.resolve_commit(f'file://{self.origin}', 'main'))
+        self.assertEqual(head, common_utils.resolve_commit(f'file://{self.origin}', 'release-1'))
+        self.assertEqual('a' * 40, common_utils.resolve_commit(f'file://{self.origin}', 'a' * 40))
+        with self.assertRaisesRegex(AssertionError, 'NOT FOUND'):
+            common_utils.resolve_commit(f'file://{self.origin}', 'missing')
+
+    def test_resolve_ref(self):
+        self.assertEqual('refs/heads/main', common_utils.resolve_ref(f'file://{self.origin}', 'main')[0])
+        self.assertEqual('refs/tags/release-1', common_utils.resolve_ref(f'file://{self.origin}', 'release-1')[0])
+        self.assertEqual((None, 'a' * 40), common_utils.resolve_ref(f'file://{self.origin}', 'a' * 40))
+
+    def test_download__ref_moved_during_clone(self):
+        resolved = common_utils.resolve_ref(f'file://{self.origin}', 'main')
+        self.commit('v2')
+        with patch('utils.common_utils.resolve_ref', return_value=resolved):
+            with self.assertRaisesRegex(AssertionError, 'MOVED'):
+                common_utils.download_application_code()
+        self.assertEqual([], os.listdir(self.cache_dir))
+
+    def test_download__branch_moved(self):
+        path = common_utils.download_application_code()
+        self.assertEqual(path, common_utils.download_application_code())
+        self.assertEqual('v1', self.read_version(path))
+        self.commit('v2')
+        moved_path = common_utils.download_application_code()
+        self.assertNotEqual(path, moved_path)
+        self.assertEqual('v2', self.read_version(moved_path))
+
+    def test_download__tag_and_commit(self):
+        tagged = common_utils.resolve_commit(f'file://{self.origin}', 'release-1')
+        with patch('utils.common_utils.settings.BUILD_NO', 'release-1'):
+            path = common_utils.download_application_code()
+        with patch('utils.common_utils.settings.BUILD_NO', tagged):
+            self.assertEqual(path, common_utils.download_application_code())
+
+    def test_download__old_commit(self):
+        old = self.git('-C', self.origin, 'rev-parse', 'HEAD')
+        self.commit('v2')
+        with patch('utils.common_utils.settings.BUILD_NO', old):
+            self.assertEqual('v1', self.read_version(common_utils.download_application_code()))
+
+    def test_download__evicts_least_recently_used(self):
+        first = common_utils.download_application_code()
+        self.commit('v2')
+        second = common_utils.download_application_code()
+        os.utime(f'{first}.complete', (0, 0))
+        os.makedirs(os.path.join(self.cache_dir, 'code-abandoned'))
+        os.utime(os.path.join(self.cache_dir, 'code-abandoned'), (0, 0))
+        self.commit('v3')
+        third = common_utils.download_application_code()
+        self.assertEqual(sorted([second, third]), sorted(
+            os.path.join(self.cache_dir, x) for x in os.listdir(self.cache_dir) if not x.endswith('.complete')
+        ))
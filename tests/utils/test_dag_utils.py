@@ -0,0 +1,74 @@
+import os
+import shutil
+import threading
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from utils import dag_utils
+
+
+class TestTaskGraph(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.tmp_dir, 'log.json')
+        self.calls = []
+        self.patches = [
+            patch('utils.dag_utils.time.sleep'),
+        ]
+        _ = [p.start() for p in self.patches]
+
+    def tearDown(self):
+        _ = [p.stop() for p in self.patches]
+        shutil.rmtree(self.tmp_dir)
+
+    def build_graph(self, role_func=None) -> dag_utils.TaskGraph:
+        graph = dag_utils.TaskGraph()
+        graph.add('schedule:a', self.calls.append, 'schedule:a')
+        graph.add('lambda:a', self.calls.append, 'lambda:a', deps=['schedule:a'])
+        graph.add('lambda:b', self.calls.append, 'lambda:b', deps=['schedule:a', 'missing'])
+        graph.add('role:a', role_func or self.calls.append, 'role:a', deps=['lambda:a', 'lambda:b'])
+        graph.add('policy:a', self.calls.append, 'policy:a', deps=['role:a'])
+        return graph
+
+    def test_levels(self):
+        levels = self.build_graph().levels()
+        self.assertEqual([['schedule:a'], ['lambda:a', 'lambda:b'], ['role:a'], ['policy:a']], levels)
+        graph = dag_utils.TaskGraph()
+        graph.add('a', print, deps=['b'])
+        graph.add('b', print, deps=['a'])
+        with self.assertRaisesRegex(AssertionError, 'CIRCULAR'):
+            graph.levels()
+
+    def test_run__retry_block_and_resume(self):
+        role_func = MagicMock(side_effect=Exception('DeleteConflict'))
+        results = self.build_graph(role_func).run(retries=1, log=dag_utils.TaskLog(self.log_path))
+        self.assertEqual(2, role_func.call_count)
+        self.assertEqual(dag_utils.FAILED, results['role:a']['status'])
+        self.assertEqual(dag_utils.BLOCKED, results['policy:a']['status'])
+        self.assertEqual(['schedule:a', 'lambda:a', 'lambda:b'], self.calls[:1] + sorted(self.calls[1:]))
+        # RESUME: ONLY THE TASKS WHICH ARE NOT DONE YET RUN AGAIN
+        self.calls.clear()
+        results = self.build_graph().run(log=dag_utils.TaskLog(self.log_path))
+        self.assertEqual(['role:a', 'policy:a'], self.calls)
+        self.assertTrue(all(x['status'] == dag_utils.DONE for x in results.values()))
+
+    def test_log_discard(self):
+        log = dag_utils.TaskLog(self.log_path)
+        log.record('lambda:a', {'status': dag_utils.DONE})
+        log.record('lambda:b', {'status': dag_utils.DONE})
+        self.assertEqual(['lambda:a'], log.discard(['lambda:a', 'lambda:c']))
+        self.assertEqual(['lambda:b'], dag_utils.TaskLog(self.log_path).done())
+        self.build_graph().run(log=dag_utils.TaskLog(self.log_path))
+        self.assertIn('lambda:a', self.calls)
+        self.assertNotIn('lambda:b', self.calls)
+
+    def test_run__critical_path(self):
+        # "slow" ONLY FINISHES AFTER "b" RAN: "b" MUST NOT WAIT FOR THE WHOLE LEVEL OF ITS DEPENDENCY "a"
+        event = threading.Event()
+        graph = dag_utils.TaskGraph()
+        graph.add('slow', lambda: self.assertTrue(event.wait(timeout=5)))
+        graph.add('a', self.calls.append, 'a')
+        graph.add('b', event.set, deps=['a'])
+        results = graph.run(workers=4, retries=0)
+        self.assertTrue(all(x['status'] == dag_utils.DONE for x in results.values()))
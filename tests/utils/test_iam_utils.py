@@ -0,0 +1,70 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from utils import iam_utils
+
+
+class TestRolePropagation(TestCase):
+    def setUp(self):
+        self.mock_iam = MagicMock()
+        self.mock_iam.get_role.side_effect = Exception('NoSuchEntity')
+        self.mock_iam.get_paginator.return_value.paginate.return_value = [{'AttachedPolicies': []}]
+        self.inventory = iam_utils.IamInventory()
+        self.inventory.roles, self.inventory.policies = {}, {}
+        self.mock_iam.create_role.side_effect = lambda **kwargs: {'Role': {'RoleName': kwargs['RoleName']}}
+        self.patches = [
+            patch('utils.iam_utils.iam_client', self.mock_iam),
+            patch('utils.iam_utils.time.sleep'),
+            patch('utils.iam_utils.get_policy_arn_by_name', side_effect=lambda x: f'arn:policy/{x}'),
+            patch('utils.iam_utils.get_iam_inventory', return_value=self.inventory),
+        ]
+        self.mocks = [p.start() for p in self.patches]
+
+    def tearDown(self):
+        _ = [p.stop() for p in self.patches]
+
+    def test_deploy_roles__no_sleep(self):
+        roles = iam_utils.deploy_roles([('ro1', 'po1', 'lambda'), ('ro2', 'po1', 'lambda'), ('ro1', 'po1', 'lambda')])
+        self.assertEqual(['ro1', 'ro2'], sorted(roles))
+        self.assertEqual(2, self.mock_iam.attach_role_policy.call_count)
+        self.mocks[1].assert_not_called()
+        self.assertEqual(['ro1', 'ro2'], iam_utils.list_roles_by_prefix('ro'))
+        self.mock_iam.get_role.assert_not_called()
+
+    def test_retry_role_propagation(self):
+        func = MagicMock(side_effect=[Exception('The role defined for the function cannot be assumed by Lambda'), 'ok'])
+        self.assertEqual('ok', iam_utils.retry_role_propagation(func, 'a', timeout=60))
+        self.assertEqual(1, self.mocks[1].call_count)
+        func = MagicMock(side_effect=Exception('AccessDenied'))
+        with self.assertRaisesRegex(Exception, 'AccessDenied'):
+            iam_utils.retry_role_propagation(func)
+
+
+class TestIamInventory(TestCase):
+    def setUp(self):
+        self.mock_iam = MagicMock()
+        self.mock_iam.get_paginator.side_effect = lambda name: MagicMock(paginate=MagicMock(return_value={
+            'list_roles': [{'Roles': [{'RoleName': 'app-role-a'}, {'RoleName': 'other'}]}],
+            'list_policies': [{'Policies': [{'PolicyName': 'app-policy-a', 'Arn': 'arn:po/a'}]}],
+        }[name]))
+        self.patches = [
+            patch('utils.iam_utils.iam_client', self.mock_iam),
+        ]
+        _ = [p.start() for p in self.patches]
+
+    def tearDown(self):
+        _ = [p.stop() for p in self.patches]
+
+    def test_lookups__listed_once(self):
+        inventory = iam_utils.IamInventory()
+        self.assertEqual(['app-role-a'], inventory.list_role_names('app-'))
+        self.assertEqual(['arn:po/a'], inventory.list_policy_arns('app-'))
+        self.assertEqual({'RoleName': 'other'}, inventory.get_role('other'))
+        self.assertEqual({}, inventory.get_policy('arn:po/b'))
+        inventory.discard_role('other')
+        self.assertEqual({}, inventory.get_role('other'))
+        self.assertEqual(2, self.mock_iam.get_paginator.call_count)
+        policy_args = self.mock_iam.get_paginator.call_args_list[1]
+        self.assertEqual('list_policies', policy_args[0][0])
+        self.mock_iam.get_role.assert_not_called()
+        self.mock_iam.get_policy.assert_not_called()
@@ -0,0 +1,73 @@
+import io
+import os
+import shutil
+import zipfile
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from utils import lambda_utils
+
+
+class TestCodeArchive(TestCase):
+    def setUp(self):
+        self.repo_path = tempfile.mkdtemp()
+        for relpath in ['app/handler.py', 'app/__pycache__/handler.pyc', 'tests/test_a.py', 'README.md']:
+            path = os.path.join(self.repo_path, relpath)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(relpath)
+
+    def tearDown(self):
+        shutil.rmtree(self.repo_path)
+
+    def test_get_code_archive_files__ignored(self):
+        specs = {'name': 'func1', 'upload-ignore': []}
+        blob = lambda_utils.build_python_code_archive(self.repo_path, specs)
+        with zipfile.ZipFile(io.BytesIO(blob)) as zf:
+            self.assertEqual(['README.md', 'app/handler.py'], [x for x in zf.namelist() if not x.endswith('/')])
+
+    def test_build_deterministic_zip__same_sha(self):
+        specs = {'name': 'func1', 'upload-ignore': []}
+        blob1 = lambda_utils.build_python_code_archive(self.repo_path, specs)
+        sha1 = specs['code_sha256']
+        os.utime(os.path.join(self.repo_path, 'README.md'), (0, 0))
+        lambda_utils.build_python_code_archive(self.repo_path, specs)
+        self.assertEqual(sha1, specs['code_sha256'])
+        with zipfile.ZipFile(io.BytesIO(blob1)) as zf:
+            self.assertEqual(b'README.md', zf.read('README.md'))
+
+
+class TestLayerResolver(TestCase):
+    def setUp(self):
+        self.mock_lambda = MagicMock()
+        self.mock_lambda.get_paginator.return_value.paginate.return_value = [{'Layers': [{
+            'LayerName': lambda_utils.get_layer_full_name('sha-a'),
+            'LatestMatchingVersion': {'LayerVersionArn': 'arn:layer-a:3'},
+        }]}]
+        self.mock_lambda.publish_layer_version.return_value = {'LayerVersionArn': 'arn:layer-b:1', 'Version': 1}
+        self.patches = [
+            patch('utils.lambda_utils.lambda_client', self.mock_lambda),
+            patch('utils.lambda_utils.prefetch_layer_s3_keys'),
+            patch('utils.lambda_utils.layer_utils.get_layer_cache'),
+            patch('utils.lambda_utils.build_python_package_layer', side_effect=lambda x: 'sha-' + x[-1]),
+        ]
+        self.mocks = [p.start() for p in self.patches]
+
+    def tearDown(self):
+        _ = [p.stop() for p in self.patches]
+
+    def test_resolve__shared_manifests(self):
+        specs_list = [
+            {'name': f'func{i}', 'layers': [{'type': 'python-requirements', 'manifest': 'req-' + 'ab'[i % 2]}]}
+            for i in range(30)
+        ]
+        resolver = lambda_utils.LayerResolver('/repo')
+        resolver.resolve(specs_list)
+        resolver.assign(specs_list)
+        self.assertEqual(2, self.mocks[3].call_count)
+        self.mock_lambda.get_paginator.assert_called_once_with('list_layers')
+        self.mock_lambda.list_layer_versions.assert_not_called()
+        self.mock_lambda.publish_layer_version.assert_called_once()
+        self.assertEqual(['arn:layer-a:3'], specs_list[0]['layer_arn_list'])
+        self.assertEqual(['arn:layer-b:1'], specs_list[29]['layer_arn_list'])
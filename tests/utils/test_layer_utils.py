@@ -0,0 +1,55 @@
+import io
+import os
+import shutil
+import zipfile
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from utils import layer_utils
+
+
+def fake_pip_install(cmd: str) -> int:
+    target = cmd.split(' -t ')[-1]
+    os.makedirs(os.path.join(target, 'pkg'), exist_ok=True)
+    with open(os.path.join(target, 'pkg', '__init__.py'), 'w') as f:
+        f.write('x' * 1000)
+    return 0
+
+
+class TestLayerBuildCache(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = layer_utils.LayerBuildCache(self.cache_dir, max_size=10 * 1024 * 1024)
+        self.patches = [
+            patch('utils.layer_utils.os.system', side_effect=fake_pip_install),
+        ]
+        self.mocks = [p.start() for p in self.patches]
+
+    def tearDown(self):
+        _ = [p.stop() for p in self.patches]
+        shutil.rmtree(self.cache_dir)
+
+    def test_get_or_build__miss_then_hit(self):
+        stream1, stream2 = io.BytesIO(), io.BytesIO()
+        path = self.cache.get_or_build('requirements.txt', 'abc', stream1)
+        self.assertEqual(path, self.cache.get_or_build('requirements.txt', 'abc', stream2))
+        self.assertEqual(1, self.mocks[0].call_count)
+        self.assertEqual({'hit': ['abc'], 'miss': ['abc'], 'evicted': []}, self.cache.report())
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), stream1.getvalue())
+        self.assertEqual(stream1.getvalue(), stream2.getvalue())
+        with zipfile.ZipFile(stream1) as zf:
+            files = [x for x in zf.namelist() if not x.endswith('/')]
+            self.assertEqual([layer_utils.PYTHON_SITE_PACKAGES + '/pkg/__init__.py'], files)
+        self.assertIn('--cache-dir ' + self.cache.pip_cache_dir, self.mocks[0].call_args[0][0])
+        self.assertEqual([], os.listdir(self.cache.work_dir))
+
+    def test_evict__lru(self):
+        old = self.cache.get_or_build('requirements.txt', 'old')
+        os.utime(old, (0, 0))
+        self.cache.max_size = os.path.getsize(old)
+        new = self.cache.get_or_build('requirements.txt', 'new')
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(new))
+        self.assertEqual(['old.zip'], self.cache.stats['evicted'])
@@ -0,0 +1,116 @@
+import json
+from unittest import TestCase
+from unittest.mock import patch
+
+from utils import plan_utils
+from utils import rest_api_utils
+
+
+class TestDeployPlan(TestCase):
+    def setUp(self):
+        self.patches = [
+            patch('utils.plan_utils.common_utils.get_app_env_dict', return_value={'X_STAGE_NAME': 'dev'}),
+            patch('utils.plan_utils.settings.DEPLOY_FORCE', False),
+            patch('utils.plan_utils.settings.ENABLE_XRAY', True),
+        ]
+        _ = [p.start() for p in self.patches]
+        self.lambda_specs = {
+            'name': 'func1', 'role_arn': 'arn:role', 'handler': 'app.handler', 'runtime': 'python3.8',
+            'timeout': 60, 'mem': 128, 'layer_arn_list': ['arn:layer:1'], 'subnet-ids': [], 'sec-group-ids': [],
+            'preserve': 0, 'remote_preserve': 0,
+        }
+        self.lambda_remote = {
+            'Role': 'arn:role', 'Handler': 'app.handler', 'Runtime': 'python3.8', 'Timeout': 60, 'MemorySize': 128,
+            'Environment': {'Variables': {'X_STAGE_NAME': 'dev'}}, 'TracingConfig': {'Mode': 'Active'},
+            'Layers': [{'Arn': 'arn:layer:1', 'CodeSize': 1}], 'VpcConfig': {'SubnetIds': [], 'SecurityGroupIds': []},
+        }
+
+    def tearDown(self):
+        _ = [p.stop() for p in self.patches]
+
+    def test_diff_lambda__create(self):
+        self.assertEqual(['create'], plan_utils.diff_lambda(dict(self.lambda_specs, remote={})))
+
+    def test_diff_lambda_config__unchanged(self):
+        self.assertEqual([], plan_utils.diff_lambda_config(self.lambda_specs, self.lambda_remote))
+
+    def test_diff_lambda_config__changed(self):
+        specs = dict(self.lambda_specs, mem=256, layer_arn_list=['arn:layer:2'])
+        self.assertEqual(['MemorySize', 'Layers'], plan_utils.diff_lambda_config(specs, self.lambda_remote))
+
+    def test_diff_lambda__config_against_alias_version(self):
+        # "$LATEST" WAS UPDATED BUT NEVER PUBLISHED: THE ALIAS STILL SERVES THE OLD MEMORY SIZE
+        alias_config = dict(self.lambda_remote, MemorySize=64)
+        specs = dict(self.lambda_specs, remote=self.lambda_remote, alias_config=alias_config)
+        self.assertIn('config', plan_utils.diff_lambda(specs))
+        specs = dict(self.lambda_specs, remote=dict(self.lambda_remote, MemorySize=64), alias_config=self.lambda_remote)
+        self.assertNotIn('config', plan_utils.diff_lambda(specs))
+
+    def test_diff_lambda__concurrency(self):
+        specs = dict(self.lambda_specs, remote=self.lambda_remote, preserve=2)
+        self.assertIn('concurrency', plan_utils.diff_lambda(specs))
+        self.assertNotIn('config', plan_utils.diff_lambda(specs))
+
+    def test_diff_stepfunc(self):
+        definition = {'StartAt': 'A', 'States': {}}
+        specs = {
+            'definition': definition, 'role_arn': 'arn:role', 'log_group_arn': 'arn:lg',
+            'machine': {
+                'definition': json.dumps(definition), 'roleArn': 'arn:role',
+                'loggingConfiguration': {'destinations': [{'cloudWatchLogsLogGroup': {'logGroupArn': 'arn:lg'}}]},
+                'tracingConfiguration': {'enabled': True},
+            },
+        }
+        self.assertEqual([], plan_utils.diff_stepfunc(specs))
+        specs['definition'] = {'StartAt': 'B', 'States': {}}
+        self.assertEqual(['definition'], plan_utils.diff_stepfunc(specs))
+
+    def test_diff_schedule(self):
+        specs = {'event-type': 'cron', 'cron': 'rate(1 minute)', 'ro-arn': ''}
+        specs['rule'] = {'ScheduleExpression': 'rate(1 minute)', 'State': 'ENABLED'}
+        self.assertEqual([], plan_utils.diff_schedule(specs))
+        specs['cron'] = 'rate(5 minutes)'
+        self.assertEqual(['rule'], plan_utils.diff_schedule(specs))
+
+    def test_plan_actions(self):
+        plan = plan_utils.DeployPlan()
+        self.assertEqual('create', plan.add('lambda', 'a', ['create'])['action'])
+        self.assertEqual('update', plan.add('lambda', 'b', ['code'])['action'])
+        self.assertEqual('noop', plan.add('lambda', 'c', [])['action'])
+
+    def test_diff_rest_api_routes(self):
+        swagger = {
+            'swagger': '2.0',
+            'paths': {
+                '/a': {'get': {'x-lambda-name': 'a'}, 'post': {'x-lambda-name': 'a'}},
+                '/b/{id}': {'parameters': [{'name': 'id', 'in': 'path'}], 'x-amazon-apigateway-any-method': {}},
+            },
+        }
+        fingerprints = rest_api_utils.get_swagger_fingerprints(swagger)
+        self.assertEqual(['*', 'GET /a', 'POST /a', 'X-AMAZON-APIGATEWAY-ANY-METHOD /b/{id}'], sorted(fingerprints))
+        state = {'routes': dict(fingerprints)}
+        remote = {('GET', '/a'): {}, ('POST', '/a'): {}, ('ANY', '/b/{id}'): {}}
+        self.assertEqual(
+            {'create': [], 'update': [], 'delete': []},
+            plan_utils.diff_rest_api_routes(fingerprints, state, remote),
+        )
+        swagger['paths']['/a']['get']['x-lambda-name'] = 'a2'
+        swagger['paths']['/b/{id}']['parameters'][0]['name'] = 'key'
+        swagger['paths']['/c'] = {'get': {}}
+        del swagger['paths']['/a']['post']
+        diff = plan_utils.diff_rest_api_routes(rest_api_utils.get_swagger_fingerprints(swagger), state, remote)
+        self.assertEqual(['GET /c'], diff['create'])
+        self.assertEqual(['GET /a', 'X-AMAZON-APIGATEWAY-ANY-METHOD /b/{id}'], diff['update'])
+        self.assertEqual(['POST /a'], diff['delete'])
+
+    def test_diff_rest_api_routes__full_import(self):
+        swagger = {'swagger': '2.0', 'paths': {'/a': {'get': {}}}}
+        fingerprints = rest_api_utils.get_swagger_fingerprints(swagger)
+        remote = {('GET', '/a'): {}}
+        self.assertIsNone(plan_utils.diff_rest_api_routes(fingerprints, {}, remote))
+        state = {'routes': rest_api_utils.get_swagger_fingerprints(dict(swagger, definitions={'A': {}}))}
+        self.assertIsNone(plan_utils.diff_rest_api_routes(fingerprints, state, remote))
+        state = {'routes': dict(fingerprints)}
+        self.assertIsNone(plan_utils.diff_rest_api_routes(fingerprints, state, {}))
+        with patch('utils.plan_utils.settings.DEPLOY_FORCE', True):
+            self.assertIsNone(plan_utils.diff_rest_api_routes(fingerprints, state, remote))
@@ -0,0 +1,73 @@
+import os
+import json
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import boto3
+from botocore.stub import Stubber
+
+from utils import profile_utils
+
+
+class TestCallRecorder(TestCase):
+    def setUp(self):
+        self.recorder = profile_utils.CallRecorder()
+        self.client = boto3.client(
+            'lambda', region_name='us-east-1', aws_access_key_id='x', aws_secret_access_key='y',
+        )
+        self.recorder.register(self.client)
+        self.stubber = Stubber(self.client)
+        self.stubber.activate()
+
+    def tearDown(self):
+        self.stubber.deactivate()
+
+    def test_register__records_calls(self):
+        self.stubber.add_response('get_function_configuration', {'FunctionName': 'func1'})
+        self.stubber.add_client_error('get_function_configuration', 'ResourceNotFoundException', http_status_code=404)
+        self.client.get_function_configuration(FunctionName='func1')
+        with self.assertRaises(Exception):
+            self.client.get_function_configuration(FunctionName='func2')
+        events = self.recorder.events
+        self.assertEqual(['lambda.GetFunctionConfiguration'] * 2, [x['name'] for x in events])
+        self.assertEqual(['func1', 'func2'], [x['resource'] for x in events])
+        self.assertEqual('ResourceNotFoundException', events[1]['error'])
+        summary = self.recorder.summarize()['lambda.GetFunctionConfiguration']
+        self.assertEqual(2, summary['count'])
+        self.assertEqual(1, summary['errors'])
+
+    def test_system_and_span(self):
+        with patch('utils.profile_utils.os.system', return_value=0):
+            with self.recorder.span('build', resource='abc'):
+                self.assertEqual(0, self.recorder.system('pip install -r x.txt', resource='abc'))
+        shell, phase = self.recorder.events
+        self.assertEqual(('pip', 'shell', 0), (shell['name'], shell['cat'], shell['exit_code']))
+        self.assertEqual(('build', 'phase', 'abc'), (phase['name'], phase['cat'], phase['resource']))
+        self.assertEqual(['pip'], list(self.recorder.summarize()))
+
+    def test_span_and_system__disabled(self):
+        with patch.dict('utils.profile_utils._RECORDER', {'recorder': self.recorder}, clear=True), \
+                patch('utils.profile_utils.os.system', return_value=0) as system:
+            with profile_utils.span('build', resource='abc') as info:
+                self.assertEqual(0, profile_utils.system('pip install -r x.txt', resource='abc'))
+            self.assertEqual({}, info)
+            system.assert_called_once_with('pip install -r x.txt')
+            self.assertEqual([], self.recorder.events)
+            profile_utils.enable_profile()
+            with profile_utils.span('build', resource='abc'):
+                profile_utils.system('pip install -r x.txt', resource='abc')
+            self.assertEqual(['pip', 'build'], [x['name'] for x in self.recorder.events])
+
+    def test_save(self):
+        self.recorder.add('lambda.UpdateFunctionCode', 'aws', self.recorder.started, 1.5, 'func1', bytes_out=10)
+        directory = tempfile.mkdtemp()
+        timeline_path, trace_path = self.recorder.save(directory, 'deploy')
+        with open(timeline_path) as f:
+            self.assertEqual(1, len(json.load(f)['events']))
+        with open(trace_path) as f:
+            trace = json.load(f)['traceEvents']
+        self.assertEqual('lambda.UpdateFunctionCode func1', trace[0]['name'])
+        self.assertEqual(1500000, trace[0]['dur'])
+        self.assertEqual('thread_name', trace[1]['name'])
+        self.assertEqual(2, len(os.listdir(directory)))
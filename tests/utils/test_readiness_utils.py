@@ -0,0 +1,39 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from utils import readiness_utils
+
+
+class TestFunctionReadinessTracker(TestCase):
+    def setUp(self):
+        self.states = {
+            'func1': [{'State': 'Active', 'LastUpdateStatus': 'Successful'}],
+            'func2': [
+                {'State': 'Active', 'LastUpdateStatus': 'InProgress'},
+                {'State': 'Active', 'LastUpdateStatus': 'InProgress'},
+                {'State': 'Active', 'LastUpdateStatus': 'Successful'},
+            ],
+            'func3': [{'State': 'Failed', 'StateReason': 'bad role'}],
+        }
+        self.mock_lambda = MagicMock()
+        self.mock_lambda.get_function_configuration.side_effect = self.get_function_configuration
+        self.tracker = readiness_utils.FunctionReadinessTracker(self.mock_lambda, min_delay=0.01, max_delay=0.02)
+
+    def get_function_configuration(self, FunctionName):
+        states = self.states[FunctionName]
+        return dict(states.pop(0) if len(states) > 1 else states[0])
+
+    def test_track__many(self):
+        futures = {name: self.tracker.track(name) for name in self.states}
+        self.assertEqual('Successful', futures['func1'].result(timeout=5)['LastUpdateStatus'])
+        self.assertEqual('Successful', futures['func2'].result(timeout=5)['LastUpdateStatus'])
+        with self.assertRaisesRegex(RuntimeError, 'bad role'):
+            futures['func3'].result(timeout=5)
+        self.assertEqual(5, self.mock_lambda.get_function_configuration.call_count)
+        self.assertEqual({}, self.tracker.pending)
+
+    def test_track__timeout(self):
+        self.tracker.timeout = 0.05
+        self.states['func2'] = [{'State': 'Pending'}]
+        with self.assertRaises(TimeoutError):
+            self.tracker.wait('func2')
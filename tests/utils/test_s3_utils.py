@@ -0,0 +1,128 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from botocore.exceptions import ClientError
+
+from utils import s3_utils
+
+
+class TestMultipartUploadWriter(TestCase):
+    def setUp(self):
+        self.mock_s3 = MagicMock()
+        self.mock_s3.create_multipart_upload.return_value = {'UploadId': 'u1'}
+        self.mock_s3.upload_part.side_effect = lambda **kwargs: {'ETag': 'e{}'.format(kwargs['PartNumber'])}
+        self.patches = [
+            patch('utils.s3_utils.s3_client', self.mock_s3),
+        ]
+        _ = [p.start() for p in self.patches]
+
+    def tearDown(self):
+        _ = [p.stop() for p in self.patches]
+
+    def test_write__multipart(self):
+        part_size = s3_utils.MIN_PART_SIZE
+        with s3_utils.MultipartUploadWriter('bucket', 'a.zip', part_size=part_size) as writer:
+            writer.write(b'x' * part_size)
+            writer.write(b'y' * (part_size + 10))
+        self.assertEqual(3, self.mock_s3.upload_part.call_count)
+        parts = self.mock_s3.complete_multipart_upload.call_args[1]['MultipartUpload']['Parts']
+        self.assertEqual([1, 2, 3], [x['PartNumber'] for x in parts])
+        self.assertEqual(10, len(self.mock_s3.upload_part.call_args_list[-1][1]['Body']))
+
+    def test_write__small_payload(self):
+        with s3_utils.MultipartUploadWriter('bucket', 'a.zip') as writer:
+            writer.write(b'abc')
+        self.mock_s3.create_multipart_upload.assert_not_called()
+        self.mock_s3.put_object.assert_called_once_with(Bucket='bucket', Key='a.zip', Body=b'abc')
+
+    def test_write__aborted_on_error(self):
+        with self.assertRaises(ValueError):
+            with s3_utils.MultipartUploadWriter('bucket', 'a.zip', part_size=s3_utils.MIN_PART_SIZE) as writer:
+                writer.write(b'x' * s3_utils.MIN_PART_SIZE)
+                raise ValueError('boom')
+        self.mock_s3.abort_multipart_upload.assert_called_once()
+
+
+class TestS3BucketTransfer(TestCase):
+    def setUp(self):
+        self.blob = bytes(range(256)) * 4096  # 1MB
+        self.mock_s3 = MagicMock()
+        self.mock_s3.head_object.return_value = {'ContentLength': len(self.blob)}
+        self.mock_s3.get_object.side_effect = self.get_object
+        self.patches = [
+            patch('utils.s3_utils.s3_client', self.mock_s3),
+        ]
+        _ = [p.start() for p in self.patches]
+
+    def tearDown(self):
+        _ = [p.stop() for p in self.patches]
+
+    def get_object(self, Bucket, Key, Range=None):
+        body = MagicMock()
+        if Range:
+            start, end = [int(x) for x in Range.replace('bytes=', '').split('-')]
+            body.read.return_value = self.blob[start:end + 1]
+        else:
+            body.iter_chunks.return_value = [self.blob]
+        return {'Body': body}
+
+    def test_iter_chunks__ranged(self):
+        bucket = s3_utils.S3Bucket('bucket', transfer={'threshold': 1024, 'max_concurrency': 3})
+        progress = s3_utils.TransferProgress('a.zip', len(self.blob))
+        chunks = list(bucket.iter_chunks('a.zip', chunk_size=100 * 1024, callback=progress))
+        self.assertEqual(11, len(chunks))
+        self.assertEqual(self.blob, b''.join(chunks))
+        self.assertEqual(len(self.blob), progress.transferred)
+        self.assertEqual(100, progress.reported)
+
+    def test_iter_chunks__below_threshold(self):
+        bucket = s3_utils.S3Bucket('bucket')
+        self.assertEqual(self.blob, bucket.download_file_blob('a.zip'))
+        self.mock_s3.get_object.assert_called_once_with(Bucket='bucket', Key='a.zip')
+
+    def test_upload_file__transfer_config(self):
+        bucket = s3_utils.S3Bucket('bucket', transfer={'chunk_size': 64 * s3_utils.MB, 'max_concurrency': 20})
+        bucket.upload_file(__file__, 'a.py')
+        config = self.mock_s3.upload_file.call_args[1]['Config']
+        self.assertEqual(64 * s3_utils.MB, config.multipart_chunksize)
+        self.assertEqual(20, config.max_concurrency)
+
+
+class TestS3BucketExists(TestCase):
+    def setUp(self):
+        self.mock_s3 = MagicMock()
+        self.mock_s3.head_object.side_effect = ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+        paginator = self.mock_s3.get_paginator.return_value
+        paginator.paginate.return_value = [
+            {'Contents': [{'Key': 'layer/a.zip'}, {'Key': 'layer/b.zip'}]},
+            {'Contents': [{'Key': 'layer/c.zip'}]},
+        ]
+        self.patches = [
+            patch('utils.s3_utils.s3_client', self.mock_s3),
+        ]
+        _ = [p.start() for p in self.patches]
+
+    def tearDown(self):
+        _ = [p.stop() for p in self.patches]
+
+    def test_exists__head(self):
+        bucket = s3_utils.S3Bucket('bucket')
+        self.assertFalse(bucket.exists('layer/a.zip'))
+        self.mock_s3.head_object.side_effect = None
+        self.assertTrue(bucket.exists('layer/a.zip'))
+        self.assertEqual(2, self.mock_s3.head_object.call_count)
+
+    def test_exists__prefetched(self):
+        bucket = s3_utils.S3Bucket('bucket')
+        self.assertEqual(3, bucket.prefetch('layer/'))
+        results = [bucket.exists(f'layer/{x}.zip') for x in 'abcdefg']
+        self.assertEqual([True, True, True, False, False, False, False], results)
+        self.mock_s3.head_object.assert_not_called()
+        bucket.upload_file_blob(b'x', 'layer/d.zip')
+        self.assertTrue(bucket.exists('layer/d.zip'))
+
+    def test_exists__expired(self):
+        bucket = s3_utils.S3Bucket('bucket')
+        bucket.prefetch('layer/', ttl=-1)
+        self.assertFalse(bucket.exists('layer/a.zip'))
+        self.mock_s3.head_object.assert_called_once()
@@ -0,0 +1,239 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import yaml
+
+from utils import swagger_parser
+from utils.swagger_parser import RouteTrie
+from utils.swagger_parser import SwaggerParser
+
+SPEC = {
+    'swagger': '2.0',
+    'info': {'title': 'test', 'version': '1.0.0'},
+    'basePath': '/v1',
+    'paths': {
+        '/users': {
+            'get': {
+                'parameters': [
+                    {'name': 'limit', 'in': 'query', 'required': True, 'type': 'integer'},
+                    {'name': 'active', 'in': 'query', 'type': 'boolean'},
+                    {'name': 'ids', 'in': 'query', 'type': 'array', 'items': {'type': 'integer'}},
+                ],
+                'responses': {'200': {'description': 'OK'}},
+            },
+        },
+        '/users/me': {
+            'get': {'responses': {'200': {'description': 'OK'}}},
+        },
+        '/users/{id}': {
+            'parameters': [{'name': 'id', 'in': 'path', 'required': True, 'type': 'integer'}],
+            'get': {'responses': {'200': {'description': 'OK', 'schema': {'$ref': '#/definitions/User'}}}},
+        },
+        '/users/{id}/files/{name}.json': {
+            'parameters': [
+                {'name': 'id', 'in': 'path', 'required': True, 'type': 'integer'},
+                {'name': 'name', 'in': 'path', 'required': True, 'type': 'string'},
+            ],
+            'get': {'responses': {'200': {'description': 'OK'}}},
+        },
+    },
+    'definitions': {
+        'User': {
+            'type': 'object',
+            'required': ['id'],
+            'properties': {
+                'id': {'type': 'integer'},
+                'name': {'type': 'string'},
+                'tags': {'type': 'array', 'items': {'type': 'string'}},
+                'manager': {'$ref': '#/definitions/User'},
+                'files': {'type': 'array', 'items': {'$ref': '#/definitions/File'}},
+            },
+        },
+        'File': {
+            'type': 'object',
+            'properties': {
+                'name': {'type': 'string'},
+                'size': {'type': 'number'},
+            },
+        },
+        'Labels': {
+            'type': 'object',
+            'additionalProperties': {'type': 'string'},
+        },
+    },
+}
+
+
+class TestRouteTrie(TestCase):
+    def setUp(self):
+        self.routes = RouteTrie()
+        for path in ['/a/b/c', '/a/{x}/d', '/a/{x}', '/{y}/b/{z}']:
+            self.routes.add(path)
+
+    def test_match(self):
+        self.assertEqual(('/a/b/c', {}), self.routes.match('/a/b/c'))
+        self.assertEqual(('/a/{x}', {'x': 'b'}), self.routes.match('/a/b'))
+        self.assertEqual(('/{y}/b/{z}', {'y': 'c', 'z': 'e'}), self.routes.match('/c/b/e'))
+
+    def test_match__backtracks(self):
+        self.assertEqual(('/a/{x}/d', {'x': 'b'}), self.routes.match('/a/b/d'))
+        self.assertEqual(('/{y}/b/{z}', {'y': 'a', 'z': 'e'}), self.routes.match('/a/b/e'))
+
+    def test_match__not_found(self):
+        self.assertEqual((None, None), self.routes.match('/a'))
+        self.assertEqual((None, None), self.routes.match('/a/b/c/d'))
+
+
+class TestSwaggerParser(TestCase):
+    def setUp(self):
+        self.parser = SwaggerParser(swagger_dict=SPEC, validation_cache_dir=None)
+
+    def test_get_path_spec(self):
+        self.assertEqual('/v1/users/me', self.parser.get_path_spec('/v1/users/me')[0])
+        self.assertEqual('/v1/users/{id}', self.parser.get_path_spec('/v1/users/42')[0])
+        path_name, path_spec = self.parser.get_path_spec('/v1/users/42', action='get')
+        self.assertEqual(['id'], list(path_spec['parameters']))
+        self.assertEqual((None, None), self.parser.get_path_spec('/v1/users/42', action='post'))
+        self.assertEqual((None, None), self.parser.get_path_spec('/users/42'))
+
+    def test_routes__path_params(self):
+        self.assertEqual(
+            ('/v1/users/{id}/files/{name}.json', {'id': '42', 'name': 'a.b'}),
+            self.parser.routes.match('/v1/users/42/files/a.b.json'),
+        )
+        self.assertEqual((None, None), self.parser.routes.match('/v1/users/42/files/a.txt'))
+
+    def test_validate_definition(self):
+        self.assertTrue(self.parser.validate_definition('User', {'id': '42', 'name': None, 'tags': ['a']}))
+        self.assertTrue(self.parser.validate_definition('User', {'id': 1, 'manager': {'id': 2, 'manager': {'id': 3}}}))
+        self.assertTrue(self.parser.validate_definition('User', {'id': 1, 'files': [{'name': 'a', 'size': 1.5}]}))
+        self.assertFalse(self.parser.validate_definition('User', {'name': 'a'}))
+        self.assertFalse(self.parser.validate_definition('User', {'id': 1, 'extra': 1}))
+        self.assertFalse(self.parser.validate_definition('User', {'id': 1, 'tags': 'a'}))
+        self.assertFalse(self.parser.validate_definition('User', {'id': 1, 'manager': {'name': 'a'}}))
+        self.assertFalse(self.parser.validate_definition('User', {'id': 1, 'files': [{'size': 'big'}]}))
+        self.assertFalse(self.parser.validate_definition('Unknown', {}))
+        definition = {'properties': {'a': {'type': 'integer'}}}
+        self.assertTrue(self.parser.validate_definition('x', {'a': 1}, definition=definition))
+
+    def test_validate_definition_batch(self):
+        self.assertEqual(
+            [True, False, False],
+            self.parser.validate_definition_batch('User', [{'id': 1}, {'id': 'x'}, ['id']]),
+        )
+        self.assertEqual([False], self.parser.validate_definition_batch('Unknown', [{}]))
+
+    def test_get_dict_definition(self):
+        self.assertEqual('File', self.parser.get_dict_definition({'name': 'a', 'size': None}))
+        self.assertEqual('User', self.parser.get_dict_definition({'id': 1, 'name': 'a'}))
+        self.assertEqual(['File', 'Labels'], self.parser.get_dict_definition({}, get_list=True))
+        self.assertIsNone(self.parser.get_dict_definition({'id': 1, 'size': 1}))
+
+    def test_definitions_example__lazy(self):
+        user = self.parser.get_request_data('/v1/users/42', 'get')[200]
+        self.assertEqual({'name': 'string', 'size': 5.5}, user['files'][0])
+        self.assertEqual(['File', 'User'], sorted(self.parser._definitions_example))
+        # THE PUBLIC DICT IS COMPLETE, WHATEVER WAS BUILT BEFORE
+        self.assertEqual(['File', 'Labels', 'User'], sorted(self.parser.definitions_example))
+        self.assertEqual({'any_prop1': 'string', 'any_prop2': 'string'}, self.parser.definitions_example.get('Labels'))
+        self.assertIn('Labels', self.parser.definitions_example)
+        with self.assertRaises(KeyError):
+            _ = self.parser.definitions_example['Unknown']
+
+    def test_definitions_example__recursive(self):
+        user = self.parser.get_request_data('/v1/users/42', 'get')[200]
+        self.assertEqual(42, user['id'])
+        self.assertEqual([{'name': 'string', 'size': 5.5}], user['files'])
+        self.assertIsNot(user, user['manager'])
+        # EVERY CALL GETS ITS OWN COPY: MODIFYING IT DOES NOT CHANGE THE NEXT RESULTS
+        user['files'][0]['name'] = 'changed'
+        self.assertEqual('string', self.parser.get_request_data('/v1/users/42', 'get')[200]['files'][0]['name'])
+
+    def test_get_example_from_prop_spec(self):
+        labels_spec = self.parser.specification['definitions']['Labels']
+        example = self.parser.get_example_from_prop_spec(labels_spec)
+        self.assertEqual({'any_prop1': 'string', 'any_prop2': 'string'}, example)
+        example['any_prop1'] = 'changed'
+        self.assertEqual('string', self.parser.get_example_from_prop_spec(labels_spec)['any_prop1'])
+        self.assertNotIn('properties', labels_spec)
+
+    def test_validate_query_batch(self):
+        queries = [
+            {'limit': '10'},
+            {'limit': ' -5 ', 'active': 'TRUE', 'ids': ['1', 2]},
+            {'limit': '1.5'},
+            {'active': 'true'},
+            {'limit': '10', 'active': 'yes'},
+            {'limit': '10', 'ids': ['1', 'x']},
+            {'limit': '10', 'ids': '1'},
+            {'limit': 7, 'other': 'x'},
+        ]
+        mask = self.parser.validate_query_batch('/v1/users', 'get', queries)
+        self.assertEqual([True, True, False, False, False, False, False, True], mask)
+        action_spec = self.parser.get_path_spec('/v1/users', 'get')[1]
+        self.assertEqual([self.parser._validate_query_parameters(x, action_spec) for x in queries], mask)
+
+    def test_validate_query_batch__unknown_operation(self):
+        self.assertEqual([False], self.parser.validate_query_batch('/v1/users', 'post', [{}]))
+        self.assertEqual([False], self.parser.validate_query_batch('/v1/unknown', 'get', [{}]))
+
+    def test_check_type__integer(self):
+        for value in ['42', ' +42 ', '1_000', 42, 4.2]:
+            self.assertTrue(SwaggerParser.check_type(value, 'integer'), value)
+        for value in ['', '4.2', '1__0', 'x', '--1']:
+            self.assertFalse(SwaggerParser.check_type(value, 'integer'), value)
+
+
+class TestSpecLoading(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.content = yaml.safe_dump(SPEC).replace("'200':", '200:')
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_load_spec(self):
+        spec = swagger_parser.load_spec('a:\n  200: {date: 2020-01-01, b: &x [1], c: *x}\n')
+        self.assertEqual({'a': {'200': {'date': '2020-01-01', 'b': [1], 'c': [1]}}}, spec)
+        self.assertEqual(SPEC, swagger_parser.load_spec(self.content))
+
+    def test_validation_cache(self):
+        with patch('utils.swagger_parser.validate_spec', wraps=swagger_parser.validate_spec) as validate_spec:
+            for _ in range(2):
+                parser = SwaggerParser(swagger_yaml=self.content, validation_cache_dir=self.cache_dir)
+                self.assertEqual(SPEC, parser.specification)
+            path = os.path.join(self.cache_dir, 'swagger.yaml')
+            with open(path, 'w') as f:
+                f.write(self.content)
+            SwaggerParser(swagger_path=path, validation_cache_dir=self.cache_dir)
+        self.assertEqual(1, validate_spec.call_count)
+        self.assertEqual(2, len(os.listdir(self.cache_dir)))
+
+    def test_validation_cache__invalid_spec(self):
+        content = self.content.replace("swagger: '2.0'", "swagger: '3.0'")
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                SwaggerParser(swagger_yaml=content, validation_cache_dir=self.cache_dir)
+        self.assertEqual([], os.listdir(self.cache_dir))
+
+    def test_validation_cache__opt_in(self):
+        with patch('utils.swagger_parser.validate_spec') as validate_spec:
+            for _ in range(2):
+                SwaggerParser(swagger_yaml=self.content)
+        self.assertEqual(2, validate_spec.call_count)
+
+    def test_validation_cache__untrusted(self):
+        with patch('utils.swagger_parser.validate_spec') as validate_spec:
+            SwaggerParser(swagger_yaml=self.content, validation_cache_dir=self.cache_dir)
+            # A BARE MARKER (NOT HOLDING ITS HASH) IS NOT TRUSTED
+            for name in os.listdir(self.cache_dir):
+                open(os.path.join(self.cache_dir, name), 'w').close()
+            SwaggerParser(swagger_yaml=self.content, validation_cache_dir=self.cache_dir)
+            self.assertEqual(2, validate_spec.call_count)
+            # NEITHER IS A DIRECTORY OTHERS CAN WRITE INTO
+            os.chmod(self.cache_dir, 0o777)
+            SwaggerParser(swagger_yaml=self.content, validation_cache_dir=self.cache_dir)
+            self.assertEqual(3, validate_spec.call_count)
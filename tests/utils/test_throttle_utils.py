@@ -0,0 +1,68 @@
+import time
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from utils import throttle_utils
+from utils.aws_clients import ClientRegistry
+
+
+class TestTokenBucket(TestCase):
+    def test_acquire__waits_for_refill(self):
+        bucket = throttle_utils.TokenBucket(rate=50, burst=2)
+        start = time.monotonic()
+        waited = [bucket.acquire() for _ in range(4)]
+        self.assertEqual([0, 0], waited[:2])
+        self.assertGreater(waited[3], 0)
+        self.assertGreaterEqual(time.monotonic() - start, 0.03)
+
+    def test_adaptive_rate(self):
+        bucket = throttle_utils.TokenBucket(rate=10, burst=10)
+        bucket.on_throttle()
+        bucket.on_throttle()
+        self.assertEqual(2.5, bucket.rate)
+        _ = [bucket.on_throttle() for _ in range(10)]
+        self.assertEqual(0.5, bucket.rate)
+        _ = [bucket.on_success() for _ in range(100)]
+        self.assertEqual(10, bucket.rate)
+
+
+class TestRateLimiter(TestCase):
+    def setUp(self):
+        self.limiter = throttle_utils.RateLimiter({
+            'lambda': {'*': (1000, 1000), 'GetFunction': (1000, 1000), 'Invoke': None},
+        })
+
+    def test_get_bucket(self):
+        shared = self.limiter.get_bucket('lambda', 'UpdateFunctionCode')
+        self.assertIs(shared, self.limiter.get_bucket('lambda', 'PublishVersion'))
+        self.assertIsNot(shared, self.limiter.get_bucket('lambda', 'GetFunction'))
+        self.assertIsNone(self.limiter.get_bucket('lambda', 'Invoke'))
+        self.assertIsNone(self.limiter.get_bucket('s3', 'PutObject'))
+
+    def test_handlers__count_throttles(self):
+        client = MagicMock()
+        client.meta.service_model.service_name = 'lambda'
+        self.limiter.register(client)
+        handlers = {c[0][0]: c[0][1] for c in client.meta.events.register.call_args_list}
+        operation = MagicMock()
+        operation.name = 'UpdateFunctionCode'
+        throttled = (MagicMock(status_code=429), {'Error': {'Code': 'TooManyRequestsException'}})
+        ok = (MagicMock(status_code=200), {})
+        handlers['before-send'](event_name='before-send.lambda.UpdateFunctionCode', request=None)
+        handlers['needs-retry'](operation=operation, response=throttled, attempts=1)
+        handlers['before-send'](event_name='before-send.lambda.UpdateFunctionCode', request=None)
+        handlers['needs-retry'](operation=operation, response=ok, attempts=2)
+        metrics = self.limiter.metrics[('lambda', 'UpdateFunctionCode')]
+        self.assertEqual(2, metrics['calls'])
+        self.assertEqual(1, metrics['throttles'])
+        self.assertEqual(550, self.limiter.get_bucket('lambda', 'UpdateFunctionCode').rate)
+
+    def test_registry_hook(self):
+        with patch('utils.aws_clients.session.Session') as mock_session:
+            registry = ClientRegistry(region_name='us-east-1')
+            hook = MagicMock()
+            registry.add_hook(hook)
+            client = registry.get_client('lambda')
+            registry.get_client('lambda')
+        hook.assert_called_once_with(client)
+        self.assertIs(client, mock_session.return_value.client.return_value)
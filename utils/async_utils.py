@@ -0,0 +1,107 @@
+"""
+asyncio facade over the blocking utils modules: same function names, but every call is a coroutine
+which runs the boto3 call in a shared thread pool, limited per AWS service by a semaphore.
+
+    from utils.async_utils import aio
+    infos = await asyncio.gather(*[aio.lambda_utils.get_func_info_by_name(x) for x in names])
+
+REF: https://docs.python.org/3/library/asyncio-eventloop.html#asyncio.loop.run_in_executor
+"""
+import asyncio
+import weakref
+import inspect
+import logging
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import settings
+from utils import iam_utils
+from utils import event_utils
+from utils import lambda_utils
+from utils import http_api_utils
+from utils import rest_api_utils
+from utils import stepfunc_utils
+from utils import cloudwatch_utils
+
+logger = logging.getLogger(__name__)
+
+# MAX CONCURRENT CALLS PER SERVICE (CONTROL-PLANE APIS ARE RATE LIMITED PER ACCOUNT & REGION)
+SERVICE_CONCURRENCY = {
+    'lambda': 20,
+    'iam': 5,
+    'apigateway': 5,
+    'apigatewayv2': 10,
+    'stepfunctions': 10,
+    'events': 10,
+    'logs': 10,
+}
+DEFAULT_SERVICE_CONCURRENCY = 10
+
+
+class ServiceLimiter:
+    """One asyncio.Semaphore per (event loop, service), sized by SERVICE_CONCURRENCY."""
+
+    def __init__(self, limits: dict = None):
+        self.limits = dict(SERVICE_CONCURRENCY, **(limits or {}))
+        self._semaphores = weakref.WeakKeyDictionary()  # {LOOP: {SERVICE: SEMAPHORE}}
+        self._lock = threading.Lock()
+
+    def get(self, service: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphores = self._semaphores.setdefault(loop, {})
+            if service not in semaphores:
+                semaphores[service] = asyncio.Semaphore(self.limits.get(service, DEFAULT_SERVICE_CONCURRENCY))
+            return semaphores[service]
+
+
+class AsyncModule:
+    """Wrap the public functions of a utils module as coroutines, keeping their names."""
+
+    def __init__(self, module, service: str, limiter: ServiceLimiter, executor: ThreadPoolExecutor):
+        self._module = module
+        self._service = service
+        self._limiter = limiter
+        self._executor = executor
+
+    def __getattr__(self, name):
+        func = getattr(self._module, name)
+        if name.startswith('_') or not inspect.isfunction(func):
+            return func
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            async with self._limiter.get(self._service):
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+        return wrapper
+
+    def __repr__(self):
+        return f'<AsyncModule {self._module.__name__} ({self._service})>'
+
+
+class AsyncFacade:
+    def __init__(self, limits: dict = None, max_workers: int = None):
+        self.limiter = ServiceLimiter(limits)
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.AWS_MAX_POOL_CONNECTIONS, thread_name_prefix='aio',
+        )
+        self.lambda_utils = AsyncModule(lambda_utils, 'lambda', self.limiter, self.executor)
+        self.iam_utils = AsyncModule(iam_utils, 'iam', self.limiter, self.executor)
+        self.rest_api_utils = AsyncModule(rest_api_utils, 'apigateway', self.limiter, self.executor)
+        self.http_api_utils = AsyncModule(http_api_utils, 'apigatewayv2', self.limiter, self.executor)
+        self.stepfunc_utils = AsyncModule(stepfunc_utils, 'stepfunctions', self.limiter, self.executor)
+        self.event_utils = AsyncModule(event_utils, 'events', self.limiter, self.executor)
+        self.cloudwatch_utils = AsyncModule(cloudwatch_utils, 'logs', self.limiter, self.executor)
+
+    async def map(self, func, items: list) -> list:
+        return list(await asyncio.gather(*[func(x) for x in items]))
+
+
+def run(coro):
+    """Run a coroutine from blocking code (the deploy helpers are synchronous)."""
+    return asyncio.run(coro)
+
+
+aio = AsyncFacade()
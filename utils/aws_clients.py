@@ -0,0 +1,119 @@
+"""
+REF: https://boto3.amazonaws.com/v1/documentation/api/latest/guide/clients.html#multithreading-or-multiprocessing-with-clients
+REF: https://boto3.amazonaws.com/v1/documentation/api/latest/guide/retries.html
+REF: https://botocore.amazonaws.com/v1/documentation/api/latest/reference/config.html
+"""  # NOQA
+import threading
+import logging
+
+from boto3 import session
+from botocore.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ClientRegistry:
+    """Create boto3 clients on first use and cache them per (service, region, profile).
+
+    Clients are thread-safe and shared by all threads, while Sessions and
+    Resources are not, so sessions are only touched under a lock and
+    resources are cached per thread.
+    """
+
+    def __init__(self, profile_name=None, region_name=None, max_pool_connections=10,
+                 retry_mode='adaptive', max_attempts=10):
+        self.profile_name = profile_name
+        self.region_name = region_name
+        self.config = Config(
+            retries={'mode': retry_mode, 'max_attempts': max_attempts},
+            max_pool_connections=max_pool_connections,
+        )
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._sessions = {}
+        self._clients = {}
+        self._account_ids = {}
+        self._hooks = []
+
+    def add_hook(self, hook):
+        """Call hook(client) for every client created from now on (e.g. to register botocore event handlers)."""
+        with self._lock:
+            self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        with self._lock:
+            self._hooks.remove(hook)
+
+    def get_session(self, profile_name=None) -> session.Session:
+        profile_name = profile_name or self.profile_name
+        with self._lock:
+            if profile_name not in self._sessions:
+                self._sessions[profile_name] = session.Session(profile_name=profile_name)
+            return self._sessions[profile_name]
+
+    def get_client(self, service: str, region_name: str = None, profile_name: str = None):
+        key = (service, region_name or self.region_name, profile_name or self.profile_name)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    ses = self.get_session(key[2])
+                    client = ses.client(service, region_name=key[1], config=self.config)
+                    for hook in self._hooks:
+                        hook(client)
+                    self._clients[key] = client
+                    logger.debug('CREATED AWS CLIENT %s', key)
+        return client
+
+    def get_resource(self, service: str, region_name: str = None, profile_name: str = None):
+        key = (service, region_name or self.region_name, profile_name or self.profile_name)
+        resources = self._local.__dict__.setdefault('resources', {})
+        if key not in resources:
+            with self._lock:
+                ses = self.get_session(key[2])
+                resources[key] = ses.resource(service, region_name=key[1], config=self.config)
+        return resources[key]
+
+    def get_account_id(self, profile_name: str = None) -> str:
+        profile_name = profile_name or self.profile_name
+        if profile_name not in self._account_ids:
+            with self._lock:  # ONE STS CALL EVEN WHEN MANY THREADS ASK AT ONCE
+                if profile_name not in self._account_ids:
+                    sts_client = self.get_client('sts', profile_name=profile_name)
+                    self._account_ids[profile_name] = sts_client.get_caller_identity().get('Account')
+        return self._account_ids[profile_name]
+
+    def lazy_client(self, service: str, **kwargs):
+        return LazyClient(self, service, 'client', **kwargs)
+
+    def lazy_resource(self, service: str, **kwargs):
+        return LazyClient(self, service, 'resource', **kwargs)
+
+    def reset(self):
+        with self._lock:
+            self._sessions.clear()
+            self._clients.clear()
+            self._account_ids.clear()
+            self._local = threading.local()
+
+
+class LazyClient:
+    """Stand-in for a boto3 client/resource which is only created on first attribute access."""
+
+    def __init__(self, registry: ClientRegistry, service: str, kind: str = 'client', **kwargs):
+        self._registry = registry
+        self._service = service
+        self._kind = kind
+        self._kwargs = kwargs
+
+    def resolve(self):
+        if self._kind == 'resource':
+            return self._registry.get_resource(self._service, **self._kwargs)
+        return self._registry.get_client(self._service, **self._kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+    def __repr__(self):
+        return f'<LazyClient {self._kind}:{self._service}>'
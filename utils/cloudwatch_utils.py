@@ -65,3 +65,13 @@ def create_log_group(lg_name: str, **kwargs) -> dict:
     log_client.put_retention_policy(**args)
     print('OK: SET LOGS IN GROUP [{}] EXPIRED IN [{}] DAYS'.format(lg_name, args.get('retentionInDays')))
     return
+
+
+def list_log_groups_by_prefix(prefix: str) -> dict:
+    group_map = {}
+    paginator = log_client.get_paginator('describe_log_groups')
+    response_iterator = paginator.paginate(logGroupNamePrefix=prefix)
+    for resp in response_iterator:
+        group_map.update({x['logGroupName']: x for x in resp['logGroups']})
+    print(f'FOUND [{len(group_map)}] CLOUDWATCH LOG GROUPS BY PREFIX [{prefix}]')
+    return group_map
@@ -1,19 +1,36 @@
 import os
 import re
+import base64
 import uuid
 import json
+import time
 import yaml
 import hashlib
 import logging
+import threading
+import subprocess
 from copy import deepcopy
 from collections import OrderedDict
 
 import settings
+from utils import profile_utils
 logger = logging.getLogger(__name__)
 
 
-def get_template() -> dict:
-    repo_path = settings.LOCAL_REPO_PATH or download_application_code()
+_TEMPLATE_LOCK = threading.Lock()
+_TEMPLATE_CACHE = {}
+
+
+def get_template(reload: bool = False) -> dict:
+    # RESOLVE & PARSE ONLY ONCE PER PROCESS: ALL DEPLOY HELPERS SHARE THE SAME CHECKOUT AND TEMPLATE
+    with _TEMPLATE_LOCK:
+        if reload or 'template' not in _TEMPLATE_CACHE:
+            repo_path = settings.LOCAL_REPO_PATH or download_application_code()
+            _TEMPLATE_CACHE['template'] = load_template(repo_path)
+        return _TEMPLATE_CACHE['template']
+
+
+def load_template(repo_path: str) -> dict:
     repo_path = os.path.realpath(os.path.expanduser(repo_path))
     path = os.path.join(repo_path, 'definitions/template.yaml')
     assert os.path.exists(path), f'SWAWGGER FILE NOT EXISTS: {path}'
@@ -38,11 +55,89 @@ def get_name_prefix(resource: str = '') -> str:
     return prefix
 
 
-def download_application_code():
-    tmp_path = f'/tmp/code-{uuid.uuid4().hex}'
-    assert 0 == os.system(f'git clone -b {settings.BUILD_NO} {settings.REPO_URL} {tmp_path}')
-    assert 0 == os.system(f'tree {tmp_path}')
-    return tmp_path
+def download_application_code() -> str:
+    # CONTENT-ADDRESSED CHECKOUT: KEYED BY THE COMMIT "BUILD_NO" RESOLVES TO, SO A MOVED BRANCH IS CLONED AGAIN
+    ref_name, commit = resolve_ref(settings.REPO_URL, settings.BUILD_NO)
+    key = hashlib.sha256(f'{settings.REPO_URL}#{commit}'.encode('utf-8')).hexdigest()[:16]
+    path = os.path.join(settings.REPO_CACHE_DIR, f'code-{key}')
+    marker = f'{path}.complete'
+    if os.path.exists(marker) and os.path.isdir(path):
+        print(f'REUSING CACHED CHECKOUT OF [{settings.BUILD_NO}] AT [{commit}]: {path}')
+        os.utime(marker)  # LEAST RECENTLY USED CHECKOUTS ARE EVICTED FIRST
+        return path
+    os.makedirs(settings.REPO_CACHE_DIR, exist_ok=True)
+    tmp_path = f'{path}-{uuid.uuid4().hex}'
+    cmd = f'git init -q {tmp_path}'
+    if ref_name:
+        # FETCH THE REF, NOT THE SHA: MOST SERVERS REFUSE A SHA THAT IS NOT THE TIP OF A REF
+        cmd += f' && git -C {tmp_path} fetch -q --depth 1 {settings.REPO_URL} {ref_name}'
+        cmd += f' && git -C {tmp_path} checkout -q FETCH_HEAD'
+    else:
+        # A BARE COMMIT: SHALLOW FETCH IF THE SERVER ALLOWS IT, OTHERWISE ALL THE BRANCHES
+        cmd += f' && (git -C {tmp_path} fetch -q --depth 1 {settings.REPO_URL} {commit}'
+        cmd += f' || git -C {tmp_path} fetch -q {settings.REPO_URL} "+refs/heads/*:refs/heads/*")'
+        cmd += f' && git -C {tmp_path} checkout -q {commit}'
+    code = profile_utils.system(cmd, resource=settings.BUILD_NO)
+    # THE REF MAY HAVE MOVED SINCE IT WAS RESOLVED: THE CHECKOUT MUST BE THE COMMIT THE CACHE KEY IS BUILT FROM
+    fetched = get_head_commit(tmp_path) if code == 0 else None
+    if code != 0 or fetched != commit:
+        profile_utils.system(f'rm -rdf {tmp_path} ||true')
+    assert 0 == code, f'FAILED TO CLONE [{settings.REPO_URL}] AT [{settings.BUILD_NO}]'
+    assert fetched == commit, f'[{settings.BUILD_NO}] MOVED FROM [{commit}] TO [{fetched}] DURING THE CLONE, RETRY'
+    assert 0 == profile_utils.system(f'rm -rdf {path} ||true')
+    os.rename(tmp_path, path)
+    with open(marker, 'w') as f:
+        f.write(f'{settings.REPO_URL}#{settings.BUILD_NO}#{commit}')
+    print(f'DONE: CLONED [{settings.BUILD_NO}] AT [{commit}] INTO {path}')
+    evict_application_code(keep=path)
+    return path
+
+
+def resolve_commit(repo_url: str, ref: str) -> str:
+    """Return the commit of a ref: a full commit sha is immutable, a tag or branch is looked up on the remote."""
+    return resolve_ref(repo_url, ref)[1]
+
+
+def resolve_ref(repo_url: str, ref: str) -> tuple:
+    """Return the full name of a tag or branch and its commit, or (None, ref) for a full commit sha."""
+    if re.match(r'^[0-9a-f]{40}$', str(ref)):
+        return None, ref
+    cmd = ['git', 'ls-remote', repo_url, f'refs/tags/{ref}', f'refs/tags/{ref}^{{}}', f'refs/heads/{ref}']
+    with profile_utils.span('git-ls-remote', 'shell', resource=ref):
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    assert 0 == proc.returncode, f'FAILED TO LIST REFS OF [{repo_url}]: {proc.stderr.strip()}'
+    refs = {name: sha for sha, name in (line.split('\t') for line in proc.stdout.splitlines() if line)}
+    # AN ANNOTATED TAG IS AN OBJECT OF ITS OWN, THE PEELED "^{}" ENTRY IS THE COMMIT IT TAGS
+    if f'refs/tags/{ref}' in refs:
+        return f'refs/tags/{ref}', refs.get(f'refs/tags/{ref}^{{}}') or refs[f'refs/tags/{ref}']
+    assert f'refs/heads/{ref}' in refs, f'REF [{ref}] NOT FOUND IN [{repo_url}]'
+    return f'refs/heads/{ref}', refs[f'refs/heads/{ref}']
+
+
+def get_head_commit(repo_path: str) -> str:
+    cmd = ['git', '-C', repo_path, 'rev-parse', 'HEAD']
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, universal_newlines=True)
+    return proc.stdout.strip() if proc.returncode == 0 else None
+
+
+def evict_application_code(keep: str = None) -> list:
+    """Remove the least recently used checkouts beyond REPO_CACHE_MAX_COUNT, and clones abandoned half-way."""
+    entries, orphans = [], []
+    for name in os.listdir(settings.REPO_CACHE_DIR):
+        path = os.path.join(settings.REPO_CACHE_DIR, name)
+        if not name.startswith('code-') or not os.path.isdir(path):
+            continue
+        if os.path.exists(f'{path}.complete'):
+            entries.append((os.path.getmtime(f'{path}.complete'), path))
+        elif time.time() - os.path.getmtime(path) > 24 * 3600:
+            orphans.append(path)
+    evicted = [path for _, path in sorted(entries, reverse=True)[settings.REPO_CACHE_MAX_COUNT:] if path != keep]
+    for path in evicted:
+        os.remove(f'{path}.complete')
+    for path in evicted + orphans:
+        profile_utils.system(f'rm -rdf {path} ||true')
+        logger.info('EVICTED REPO CACHE: %s', path)
+    return evicted + orphans
 
 
 def get_swagger_definition(template: dict):
@@ -162,6 +257,11 @@ def file_to_sha(path: str) -> str:
     return sha
 
 
+def blob_to_code_sha256(blob: bytes) -> str:
+    # SAME FORMAT AS LAMBDA'S "CodeSha256": BASE64 OF THE RAW SHA256 DIGEST
+    return base64.b64encode(hashlib.sha256(blob).digest()).decode('utf-8')
+
+
 def is_int(s: str) -> bool:
     result = False
     try:
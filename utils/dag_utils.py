@@ -0,0 +1,144 @@
+"""
+Minimal task graph: a task starts as soon as all of its dependencies are done, so independent
+tasks run in parallel and the total time follows the critical path. Tasks are retried, and an
+optional JSON log lets an interrupted run be resumed.
+"""
+import os
+import json
+import time
+import random
+import logging
+import threading
+from concurrent.futures import wait
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import profile_utils
+
+logger = logging.getLogger(__name__)
+
+DONE = 'DONE'
+FAILED = 'FAILED'
+BLOCKED = 'BLOCKED'
+
+
+class TaskLog:
+    """JSON file of task results, tasks already DONE in it are skipped when the graph runs again."""
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.items = {}
+        self._lock = threading.Lock()
+        if path and os.path.isfile(path):
+            with open(path) as f:
+                self.items = json.load(f)
+            print(f'RESUMING FROM LOG [{path}]: [{len(self.done())}] TASKS ALREADY DONE')
+
+    def done(self) -> list:
+        return [name for name, item in self.items.items() if item['status'] == DONE]
+
+    def record(self, name: str, result: dict):
+        with self._lock:
+            self.items[name] = result
+            self._save()
+
+    def discard(self, names: list) -> list:
+        """Forget the given tasks, so they run again even if they were DONE."""
+        with self._lock:
+            discarded = [name for name in names if self.items.pop(name, None) is not None]
+            if discarded:
+                self._save()
+        return discarded
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.items, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        if self.path and os.path.isfile(self.path):
+            os.remove(self.path)
+
+
+class TaskGraph:
+    def __init__(self):
+        self.tasks = {}  # {NAME: {'func', 'args', 'kwargs', 'deps'}}
+
+    def add(self, name: str, func, *args, deps: list = None, **kwargs):
+        assert name not in self.tasks, f'DUPLICATED TASK: {name}'
+        self.tasks[name] = {'func': func, 'args': args, 'kwargs': kwargs, 'deps': list(deps or [])}
+        return name
+
+    def levels(self) -> list:
+        """Group tasks into levels: a task only depends on tasks of earlier levels (unknown deps are ignored)."""
+        deps = {name: {d for d in task['deps'] if d in self.tasks} for name, task in self.tasks.items()}
+        levels, placed = [], set()
+        while len(placed) < len(deps):
+            level = sorted(name for name, d in deps.items() if name not in placed and d <= placed)
+            assert level, 'CIRCULAR DEPENDENCY: {}'.format(sorted(set(deps) - placed))
+            levels.append(level)
+            placed.update(level)
+        return levels
+
+    def run(self, workers: int = 8, retries: int = 2, log: TaskLog = None) -> dict:
+        self.levels()  # FAIL EARLY ON CIRCULAR DEPENDENCIES
+        log = log or TaskLog()
+        deps = {name: [d for d in task['deps'] if d in self.tasks] for name, task in self.tasks.items()}
+        results = {name: log.items[name] for name in log.done() if name in self.tasks}
+        pending = sorted(set(self.tasks) - set(results))
+        running = {}
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            while pending or running:
+                for name in list(pending):
+                    statuses = [results.get(d, {}).get('status') for d in deps[name]]
+                    blocked = [d for d, status in zip(deps[name], statuses) if status in [FAILED, BLOCKED]]
+                    if blocked:
+                        error = f'BLOCKED BY {blocked}'
+                        results[name] = {'status': BLOCKED, 'error': error, 'attempts': 0, 'seconds': 0}
+                        log.record(name, results[name])
+                        pending.remove(name)
+                    elif all(status == DONE for status in statuses):
+                        running[executor.submit(self.run_task, name, retries)] = name
+                        pending.remove(name)
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name] = future.result()
+                    log.record(name, results[name])
+        return results
+
+    def run_task(self, name: str, retries: int = 2) -> dict:
+        task = self.tasks[name]
+        start = time.time()
+        for attempt in range(1, retries + 2):
+            try:
+                with profile_utils.span(name, 'task'):
+                    task['func'](*task['args'], **task['kwargs'])
+                return {'status': DONE, 'attempts': attempt, 'seconds': round(time.time() - start, 1)}
+            except Exception as e:
+                logger.info('TASK [%s] FAILED (ATTEMPT %s): %s', name, attempt, e)
+                error = str(e)
+                if attempt <= retries:
+                    time.sleep(min(2 ** attempt, 10) * random.uniform(0.5, 1))
+        print(f'FAILED TASK [{name}]: {error}')
+        return {'status': FAILED, 'error': error, 'attempts': retries + 1, 'seconds': round(time.time() - start, 1)}
+
+
+def print_results(results: dict, title: str = 'TASKS'):
+    print('=' * 60)
+    print(f'{title} SUMMARY:')
+    for name, result in sorted(results.items()):
+        line = '\t[{}] {} ({}s)'.format(result['status'], name, result.get('seconds', 0))
+        if result.get('error'):
+            line += ': {}'.format(result['error'])
+        print(line)
+    counts = {}
+    for result in results.values():
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    print('TOTAL: {}'.format(counts))
+    print('=' * 60)
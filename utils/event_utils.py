@@ -17,7 +17,7 @@ event_client = settings.event_client
 logger = logging.getLogger(__name__)
 
 
-def render_specs(specs: dict) -> dict:
+def render_specs(specs: dict, snapshot=None) -> dict:
     specs['rule-name'] = get_rule_full_name(specs['name'])
     if specs.get('cron'):
         specs['event-type'] = 'cron'
@@ -39,6 +39,10 @@ def render_specs(specs: dict) -> dict:
         specs['po-path'] = './iam/iam-policy-eventbridge-call-stepfunc.json'
     else:
         raise NotImplementedError('TARGET TYPE [{}] SUPPORTED'.format(specs.get('target-type')))
+    if snapshot is not None:
+        specs['rule'] = snapshot.rules.get(specs['rule-name']) or {}
+    else:
+        specs['rule'] = get_rule(specs['rule-name'])
     # SKIP DEPLOY
     if any([
         settings.DEPLOY_TYPE not in ['full', 'schedule'],
@@ -102,6 +106,16 @@ def get_rule(rule_name: str, bus: str = None):
     return resp
 
 
+def list_rules_by_prefix(prefix: str, bus: str = None) -> dict:
+    rule_map = {}
+    paginator = event_client.get_paginator('list_rules')
+    response_iterator = paginator.paginate(NamePrefix=prefix, EventBusName=bus or 'default')
+    for resp in response_iterator:
+        rule_map.update({x['Name']: x for x in resp['Rules']})
+    print(f'FOUND [{len(rule_map)}] EVENTBRIDGE RULES BY PREFIX [{prefix}]')
+    return rule_map
+
+
 def get_targets(rule_name: str, bus: str = None) -> dict:
     targets = []
     paginator = event_client.get_paginator('list_targets_by_rule')
@@ -130,7 +144,15 @@ def set_target(rule_name: str, func_arn: str, bus: str = None, role_arn: str = N
     return resp
 
 
+def remove_targets(rule_name: str, bus: str = None) -> list:
+    ids = [x['Id'] for x in get_targets(rule_name, bus).values()]
+    for i in range(0, len(ids), 10):  # AT MOST 10 TARGETS PER REQUEST
+        event_client.remove_targets(Rule=rule_name, EventBusName=bus or 'default', Ids=ids[i:i + 10], Force=True)
+    return ids
+
+
 def remove_rule(rule_name: str, bus: str = None):
+    remove_targets(rule_name, bus)  # A RULE CANNOT BE DELETED WHILE IT STILL HAS TARGETS
     response = event_client.delete_rule(
         Name=rule_name,
         EventBusName=bus or 'default',
@@ -3,8 +3,11 @@ REF: https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/
 """
 import os
 import json
-import logging
 import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import settings
 from utils import common_utils
@@ -12,6 +15,96 @@ from settings import iam_client
 
 logger = logging.getLogger(__name__)
 
+# ERRORS RAISED WHILE A NEW ROLE/ATTACHMENT HAS NOT YET PROPAGATED TO THE CONSUMING SERVICE
+PROPAGATION_ERRORS = [
+    'cannot be assumed by Lambda',
+    'is not authorized to assume the provided role',
+    'The role defined for the function',
+    'Neither the global service principal',
+]
+_INVENTORY = {}
+_INVENTORY_LOCK = threading.Lock()
+
+
+class IamInventory:
+    """Roles and customer managed policies of the account, listed once per session and indexed by name.
+
+    Policies are listed with Scope='Local', so the thousands of AWS managed policies are never paginated.
+    """
+
+    def __init__(self, path_prefix: str = '/'):
+        self.path_prefix = path_prefix
+        self.roles = None  # {ROLE_NAME: ROLE}
+        self.policies = None  # {POLICY_ARN: POLICY}
+        self._lock = threading.RLock()
+
+    def load(self, refresh: bool = False):
+        with self._lock:
+            if self.roles is None or refresh:
+                roles = {}
+                paginator = iam_client.get_paginator('list_roles')
+                for resp in paginator.paginate(PathPrefix=self.path_prefix):
+                    roles.update({x['RoleName']: x for x in resp['Roles']})
+                self.roles = roles
+            if self.policies is None or refresh:
+                policies = {}
+                paginator = iam_client.get_paginator('list_policies')
+                for resp in paginator.paginate(Scope='Local', PathPrefix=self.path_prefix):
+                    policies.update({x['Arn']: x for x in resp['Policies']})
+                self.policies = policies
+            print(f'LOADED IAM INVENTORY: [{len(self.roles)}] ROLES, [{len(self.policies)}] LOCAL POLICIES')
+        return self
+
+    def ensure_loaded(self):
+        if self.roles is None or self.policies is None:
+            self.load()
+        return self
+
+    def get_role(self, ro_name: str) -> dict:
+        self.ensure_loaded()
+        with self._lock:
+            return self.roles.get(ro_name) or {}
+
+    def get_policy(self, arn: str) -> dict:
+        self.ensure_loaded()
+        with self._lock:
+            return self.policies.get(arn) or {}
+
+    def list_role_names(self, prefix: str = '') -> list:
+        self.ensure_loaded()
+        with self._lock:
+            return sorted(x for x in self.roles if x.startswith(prefix))
+
+    def list_policy_arns(self, prefix: str = '') -> list:
+        self.ensure_loaded()
+        with self._lock:
+            return sorted(arn for arn, x in self.policies.items() if x['PolicyName'].startswith(prefix))
+
+    def add_role(self, ro: dict):
+        with self._lock:
+            if self.roles is not None:
+                self.roles[ro['RoleName']] = ro
+
+    def add_policy(self, po: dict):
+        with self._lock:
+            if self.policies is not None:
+                self.policies[po['Arn']] = po
+
+    def discard_role(self, ro_name: str):
+        with self._lock:
+            (self.roles or {}).pop(ro_name, None)
+
+    def discard_policy(self, arn: str):
+        with self._lock:
+            (self.policies or {}).pop(arn, None)
+
+
+def get_iam_inventory() -> IamInventory:
+    with _INVENTORY_LOCK:
+        if 'inventory' not in _INVENTORY:
+            _INVENTORY['inventory'] = IamInventory()
+        return _INVENTORY['inventory']
+
 
 def get_role_full_name(short_name: str) -> str:
     full_name = f'{settings.STAGE_NAME}-{settings.STAGE_SUBNAME}-{settings.APPLICATION_NAME}-role-{short_name}'
@@ -35,24 +128,25 @@ def get_policy_arn_by_name(po_name: str) -> str:
     return arn
 
 
-def get_iam_role(ro_name: str) -> dict:
+def get_iam_role(ro_name: str, cached: bool = True) -> dict:
     ro = {}
     try:
-        response = iam_client.get_role(RoleName=ro_name)
-        ro = response['Role']
-        print('DONE: FOUND IAM ROLE [{}]'.format(ro_name))
+        if cached:
+            ro = get_iam_inventory().get_role(ro_name)
+        else:
+            response = iam_client.get_role(RoleName=ro_name)
+            ro = response['Role']
+        if ro:
+            print('DONE: FOUND IAM ROLE [{}]'.format(ro_name))
+        else:
+            print('ROLE NOT EXISTS:', ro_name)
     except Exception:
         print('ROLE NOT EXISTS:', ro_name)
     return ro
 
 
 def list_roles_by_prefix(prefix: str = ''):
-    ro_list = []
-    paginator = iam_client.get_paginator('list_roles')
-    response_iterator = paginator.paginate()
-    for resp in response_iterator:
-        ro_list += resp['Roles']
-    name_list = [x['RoleName'] for x in ro_list if x['RoleName'].startswith(prefix)]
+    name_list = get_iam_inventory().list_role_names(prefix)
     print(f'FOUND [{len(name_list)}] ROLES BY PREFIX [{prefix}]')
     return name_list
 
@@ -68,23 +162,18 @@ def list_role_policies(ro_name):
 
 
 def list_policies_by_prefix(prefix: str = ''):
-    po_list = []
-    args = {'Scope': 'All'}
-    paginator = iam_client.get_paginator('list_policies')
-    response_iterator = paginator.paginate(**args)
-    for resp in response_iterator:
-        po_list += [x for x in resp['Policies'] if x['PolicyName'].startswith(prefix)]
-    arn_list = [x['Arn'] for x in po_list]
+    # FYI: OUR POLICIES ARE ALWAYS CUSTOMER MANAGED ("Local"), AWS MANAGED POLICIES ARE NEVER LISTED
+    arn_list = get_iam_inventory().list_policy_arns(prefix)
     print(f'FOUND [{len(arn_list)}] POLICIES BY PREFIX [{prefix}]')
     return arn_list
 
 
-def list_policy_versions(arn: str) -> list:
+def list_policy_versions(arn: str, include_default: bool = True) -> list:
     paginator = iam_client.get_paginator('list_policy_versions')
     response_iterator = paginator.paginate(PolicyArn=arn)
     versions = []
     for resp in response_iterator:
-        versions += [x['VersionId'] for x in resp['Versions']]
+        versions += [x['VersionId'] for x in resp['Versions'] if include_default or not x.get('IsDefaultVersion')]
     return versions
 
 
@@ -109,6 +198,7 @@ def create_iam_role(ro_name: str, service: str = 'lambda') -> dict:
         MaxSessionDuration=3600,
     )
     ro = response['Role']
+    get_iam_inventory().add_role(ro)
     print('DONE: CREATED IAM ROLE [{}]'.format(ro_name))
     return ro
 
@@ -127,12 +217,19 @@ def attach_policy(ro_name, policy_arn):
     return response
 
 
-def get_iam_policy(arn):
+def get_iam_policy(arn, cached: bool = True):
     response = {}
     try:
-        response = iam_client.get_policy(PolicyArn=arn)
-        response.pop('ResponseMetadata', None)
-        print('DONE: FOUND IAM POLICY [{}]'.format(arn))
+        if cached:
+            po = get_iam_inventory().get_policy(arn)
+            response = {'Policy': po} if po else {}
+        else:
+            response = iam_client.get_policy(PolicyArn=arn)
+            response.pop('ResponseMetadata', None)
+        if response:
+            print('DONE: FOUND IAM POLICY [{}]'.format(arn))
+        else:
+            print('POLICY NOT EXISTS:', arn)
     except Exception:
         print('POLICY NOT EXISTS:', arn)
     return response
@@ -145,6 +242,7 @@ def create_iam_policy(po_name: str, doc_content: str) -> dict:
         Description='this is my policy',
     )
     po = response['Policy']
+    get_iam_inventory().add_policy(po)
     print('DONE: CREATED IAM POLICY [{}]'.format(po_name))
     return po
 
@@ -167,7 +265,14 @@ def deploy_policy(po_name: str, path: str, **iam_specs) -> dict:
     po_content = json.dumps(common_utils.render_json(po_path, **iam_specs))
     po = get_iam_policy(po_arn) or {}
     if not po:
-        po = create_iam_policy(po_name, po_content)
+        try:
+            po = create_iam_policy(po_name, po_content)
+        except Exception as e:
+            if 'EntityAlreadyExists' not in str(e):
+                raise
+            po = get_iam_policy(po_arn, cached=False).get('Policy') or {}  # CREATED BY A CONCURRENT DEPLOY
+            if po:
+                get_iam_inventory().add_policy(po)
     else:
         # po = update_iam_policy(po_arn, po_content)
         pass
@@ -180,7 +285,13 @@ def deploy_role(ro_name: str, po_name: str, event_source: str) -> dict:
     assert len(ro_name) <= 64, f'ROLE NAME SHOULD BE LESS THAN 64: {ro_name}'
     ro = get_iam_role(ro_name)
     if not ro:
-        ro = create_iam_role(ro_name, event_source)
+        try:
+            ro = create_iam_role(ro_name, event_source)
+        except Exception as e:
+            if 'EntityAlreadyExists' not in str(e):
+                raise
+            ro = get_iam_role(ro_name, cached=False)  # CREATED AFTER THE INVENTORY WAS LOADED
+            get_iam_inventory().add_role(ro)
         waiter = iam_client.get_waiter('role_exists')
         waiter.wait(RoleName=ro_name, WaiterConfig={'Delay': 2, 'MaxAttempts': 30})
     else:
@@ -190,18 +301,71 @@ def deploy_role(ro_name: str, po_name: str, event_source: str) -> dict:
     existing_po_arns = list_role_policies(ro_name)
     if po_arn not in existing_po_arns:
         attach_policy(ro_name, po_arn)
-        # FIXME: NEWLY ATTACHED POLICY CANNOT BE IMMEDIATELY ASSUMED BY LAMBDA
-        time.sleep(10)
+        # FYI: NO SLEEP HERE, THE CALLS USING THE ROLE RETRY WHILE IT PROPAGATES ("retry_role_propagation")
     return ro
 
 
+def deploy_roles(role_list: list, workers: int = None) -> dict:
+    """Deploy many (ro_name, po_name, event_source) at once, so all of them propagate in the same window."""
+    role_list = sorted(set(role_list))
+    workers = workers or settings.LAMBDA_DEPLOY_CONCURRENCY
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(role_list)))) as executor:
+        roles = list(executor.map(lambda x: deploy_role(*x), role_list))
+    print(f'DONE: DEPLOYED [{len(role_list)}] IAM ROLES')
+    return {x[0]: ro for x, ro in zip(role_list, roles)}
+
+
+def retry_role_propagation(func, *args, timeout: int = None, **kwargs):
+    """Call "func", retry with bounded exponential backoff while the service cannot assume a fresh role yet.
+
+    IAM reads succeed as soon as a write lands, they tell nothing about when Lambda or Step Functions
+    can assume the role: the only reliable signal is the consuming call itself.
+    """
+    deadline = time.time() + (timeout or settings.IAM_PROPAGATION_TIMEOUT)
+    delay = 1
+    while True:
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if not any(x in str(e) for x in PROPAGATION_ERRORS) or time.time() + delay >= deadline:
+                raise
+            print(f'IAM ROLE NOT PROPAGATED YET, RETRY IN [{delay}s]: {e}')
+            time.sleep(delay * random.uniform(0.8, 1.2))
+            delay = min(delay * 2, 16)
+
+
+def detach_role_policies(ro_name: str) -> list:
+    po_arns = list_role_policies(ro_name)
+    for arn in po_arns:
+        iam_client.detach_role_policy(RoleName=ro_name, PolicyArn=arn)
+        print(f'DONE: DETACHED POLICY [{arn}] FROM ROLE [{ro_name}]')
+    return po_arns
+
+
+def remove_role(ro_name: str):
+    detach_role_policies(ro_name)  # A ROLE CANNOT BE DELETED WHILE POLICIES ARE ATTACHED
+    iam_client.delete_role(RoleName=ro_name)
+    get_iam_inventory().discard_role(ro_name)
+    print(f'DONE: REMOVED ROLE: {ro_name}')
+
+
+def remove_policy(arn: str):
+    # NON-DEFAULT VERSIONS MUST BE DELETED FIRST, THE DEFAULT VERSION GOES WITH THE POLICY
+    versions = list_policy_versions(arn, include_default=False)
+    if versions:
+        with ThreadPoolExecutor(max_workers=len(versions)) as executor:
+            list(executor.map(lambda vid: iam_client.delete_policy_version(PolicyArn=arn, VersionId=vid), versions))
+    iam_client.delete_policy(PolicyArn=arn)
+    get_iam_inventory().discard_policy(arn)
+    print(f'DONE: REMOVED POLICY: {arn}')
+
+
 def remove_roles(name_list: list):
     removed = []
     for name in name_list:
         try:
-            iam_client.delete_role(RoleName=name)
+            remove_role(name)
             removed.append(name)
-            print(f'DONE: REMOVED ROLE: {name}')
         except Exception as e:
             logger.exception(e)
     return removed
@@ -211,14 +375,7 @@ def remove_policies(arn_list: list):
     removed = []
     for arn in arn_list:
         try:
-            versions = list_policy_versions(arn)
-            for vid in versions:
-                try:
-                    iam_client.delete_policy_version(PolicyArn=arn, VersionId=vid)
-                except Exception:
-                    pass
-            iam_client.delete_policy(PolicyArn=arn)
-            print(f'DONE: REMOVED POLICY: {arn}')
+            remove_policy(arn)
             removed.append(arn)
         except Exception as e:
             logger.exception(e)
@@ -4,15 +4,21 @@ REF: https://aws.amazon.com/premiumsupport/knowledge-center/lambda-layer-simulat
 REF: https://stackoverflow.com/questions/33825815/how-to-calculate-the-codesha256-of-aws-lambda-deployment-package-before-uploadin
 """  # NOQA
 import os
+import io
 import json
 import uuid
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 import settings
 from utils import iam_utils
+from utils import layer_utils
+from utils import readiness_utils
+from utils import archive_utils
 from utils.s3_utils import S3Bucket
 from utils.common_utils import is_int
 from utils.common_utils import file_to_sha
+from utils.common_utils import blob_to_code_sha256
 from utils.common_utils import get_app_env_dict
 
 lambda_client = settings.lambda_client
@@ -20,7 +26,7 @@ s3_client = S3Bucket(settings.AWS_LAMBDA_BUCKET)
 logger = logging.getLogger(__name__)
 
 
-def render_specs(specs: dict) -> dict:
+def render_specs(specs: dict, snapshot=None) -> dict:
     specs['full_name'] = get_func_full_name(specs['name'])
     specs['func_s3_key'] = get_func_s3_key_by_name(specs['full_name'])
     specs['timeout'] = specs.get('timeout') or 60
@@ -41,11 +47,22 @@ def render_specs(specs: dict) -> dict:
         specs['sec-group-ids'] = []
         specs['vpc'] = {}
         specs['po-path'] = './iam/iam-policy-lambda-execute.json'
-    # LIVE FETCH
-    specs['remote'] = get_func_info_by_name(specs['full_name'])
-    latest = get_func_latest_version(specs['full_name'])
+    # LIVE FETCH (OR FROM A PRE-COLLECTED SNAPSHOT OF THE WHOLE APP)
+    if snapshot is not None:
+        specs['remote'] = snapshot.functions.get(specs['full_name']) or {}
+        versions = snapshot.versions.get(specs['full_name']) or []
+        aliases = snapshot.aliases.get(specs['full_name']) or {}
+    else:
+        specs['remote'] = get_func_info_by_name(specs['full_name'])
+        versions = get_all_func_versions(specs['full_name']) if specs['remote'] else []
+        aliases = list_func_aliases(specs['full_name']) if specs['remote'] else {}
+    latest = filter_func_latest_version(versions)
+    specs['alias_info'] = aliases.get(specs['alias']) or {}
     specs['latest_version'] = latest.get('Version') or specs['remote'].get('Version')
-    specs['alias_info'] = get_func_alias(specs['full_name'], specs['alias'])
+    specs['latest_code_sha256'] = latest.get('CodeSha256') or specs['remote'].get('CodeSha256')
+    # THE CONFIG IN SERVICE IS THE ONE FROZEN IN THE VERSION THE ALIAS POINTS TO (NOT "$LATEST")
+    alias_version = specs['alias_info'].get('FunctionVersion')
+    specs['alias_config'] = next((x for x in versions if alias_version and x['Version'] == alias_version), {})
     # SKIP DEPLOY
     if any([
         settings.DEPLOY_TYPE not in ['full', 'lambda'],
@@ -99,6 +116,16 @@ def list_all_functions_by_app() -> dict:
     return func_map
 
 
+def list_functions_by_prefix(prefix: str) -> dict:
+    func_map = {}
+    paginator = lambda_client.get_paginator('list_functions')
+    response_iterator = paginator.paginate()
+    for resp in response_iterator:
+        func_map.update({f['FunctionName']: f for f in resp['Functions'] if f['FunctionName'].startswith(prefix)})
+    print(f'FOUND [{len(func_map)}] FUNCTIONS BY PREFIX [{prefix}]')
+    return func_map
+
+
 def get_layers_by_app_name(app_name: str):
     layers = []
     paginator = lambda_client.get_paginator('list_layers')
@@ -132,12 +159,21 @@ def get_lambda_invoke_policy(func_arn, caller_arn):
     return po
 
 
+def get_layer_s3_prefix(layer_type: str) -> str:
+    return f'lambda-layer/{settings.APPLICATION_NAME}/{layer_type}/'
+
+
 def get_layer_s3_key_by_sha(sha: str, layer_type: str) -> str:
     leveled_path = '/'.join([sha[i] for i in range(5)])
-    layer_s3_key = f'lambda-layer/{settings.APPLICATION_NAME}/{layer_type}/{leveled_path}/{sha}.zip'
+    layer_s3_key = f'{get_layer_s3_prefix(layer_type)}{leveled_path}/{sha}.zip'
     return layer_s3_key
 
 
+def prefetch_layer_s3_keys(layer_type: str = 'python') -> int:
+    # ONE LISTING ANSWERS THE EXISTENCE CHECKS OF ALL LAYERS OF THE APP
+    return s3_client.prefetch(get_layer_s3_prefix(layer_type))
+
+
 def create_lambda_invoke_policy(func_arn: str, caller_arn: str):
     args = {
         'FunctionName': func_arn,  # REQUIRED
@@ -175,18 +211,10 @@ def build_python_package_layer(path: str) -> str:
     #     '"pip install -r requirements_abc_service.txt -t python/lib/python3.8/site-packages/; exit"',
     # ]
     # cmd = ' '.join(opts)
-    assert 0 == os.system('rm -rdf {tmp_path} python ||true')
-    print('BUILDING PACKAGES...')
-    cmd = f'pip install -r {path} --compile --prefer-binary -t python/lib/python3.8/site-packages/'
-    assert 0 == os.system(cmd)
-    print('DONE: BUILD LAYER')
-    tmp_path = '/tmp/layer_{}.zip'.format(uuid.uuid4().hex)
-    assert 0 == os.system(f'zip -r {tmp_path} python')
-    assert 0 == os.system(f'zip -sf {tmp_path}; du -sh {tmp_path}')
-    assert 0 == os.system('rm -rdf python ||true')
-    print('DONE: ZIPPED LAYER')
-    s3_client.upload_file(tmp_path, layer_s3_key)
-    assert s3_client.exists(layer_s3_key), f'FAILED TO UPLOAD: {tmp_path}'
+    # A FRESH BUILD IS STREAMED INTO THE CACHE AND THE MULTIPART UPLOAD AT THE SAME TIME
+    with s3_client.open_multipart_writer(layer_s3_key) as writer:
+        layer_utils.get_layer_cache().get_or_build(path, sha, writer)
+    assert s3_client.exists(layer_s3_key, cached=False), f'FAILED TO UPLOAD LAYER: {layer_s3_key}'
     print('DONE: UPLOADED LAYER')
     return sha
 
@@ -217,10 +245,13 @@ def get_latest_layer_by_name(layer_name: str):
     return layer
 
 
-def deploy_python_package_layer(sha: str):
+def deploy_python_package_layer(sha: str, app_layers: dict = None):
     layer_name = get_layer_full_name(sha)
     layer_s3_key = get_layer_s3_key_by_sha(sha, 'python')
-    layer = get_latest_layer_by_name(layer_name)
+    if app_layers is not None:
+        layer = (app_layers.get(layer_name) or {}).get('LatestMatchingVersion') or {}
+    else:
+        layer = get_latest_layer_by_name(layer_name)
     if layer.get('LayerVersionArn'):
         version_arn = layer['LayerVersionArn']
         print(f'SKIP CREATE LAYER: ALREADY EXISTS: {version_arn}')
@@ -229,15 +260,78 @@ def deploy_python_package_layer(sha: str):
     return version_arn
 
 
+class LayerResolver:
+    """Resolve the layers of all functions at once.
+
+    Functions sharing a manifest share the layer, so every unique manifest is built/published
+    once, and the latest versions of all layers of the app come from a single "list_layers" pass.
+    """
+
+    def __init__(self, repo_path: str):
+        self.repo_path = repo_path
+        self.app_layers = None
+        self.resolved = {}
+
+    def get_manifest_path(self, layer: dict) -> str:
+        return os.path.join(self.repo_path, layer['manifest'])
+
+    def collect_manifests(self, specs_list: list) -> list:
+        return sorted({
+            self.get_manifest_path(x)
+            for specs in specs_list for x in specs.get('layers') or [] if x['type'] == 'python-requirements'
+        })
+
+    def load_app_layers(self) -> dict:
+        if self.app_layers is None:
+            self.app_layers = get_layers_by_app_name(settings.APPLICATION_NAME)
+        return self.app_layers
+
+    def resolve(self, specs_list: list, build: bool = True) -> dict:
+        manifests = self.collect_manifests(specs_list)
+        if not manifests:
+            return self.resolved
+        if build:
+            prefetch_layer_s3_keys('python')
+            workers = max(1, min(settings.LAMBDA_DEPLOY_CONCURRENCY, len(manifests)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                shas = list(executor.map(build_python_package_layer, manifests))
+            layer_utils.get_layer_cache().report()
+        else:
+            shas = [file_to_sha(os.path.realpath(os.path.expanduser(x))) for x in manifests]
+        app_layers = self.load_app_layers()
+        for path, sha in zip(manifests, shas):
+            layer_name = get_layer_full_name(sha)
+            self.resolved[path] = {
+                'sha': sha,
+                'name': layer_name,
+                's3_key': get_layer_s3_key_by_sha(sha, 'python'),
+                'meta': (app_layers.get(layer_name) or {}).get('LatestMatchingVersion') or {},
+            }
+            if build:
+                self.resolved[path]['arn'] = deploy_python_package_layer(sha, app_layers)
+        print(f'RESOLVED [{len(manifests)}] UNIQUE LAYERS FOR [{len(specs_list)}] FUNCTIONS')
+        return self.resolved
+
+    def assign(self, specs_list: list):
+        for specs in specs_list:
+            for layer in specs.get('layers') or []:
+                if layer['type'] == 'python-requirements':
+                    layer.update(self.resolved[self.get_manifest_path(layer)])
+                elif layer['type'] == 'nodejs-package':
+                    pass  # TODO: SUPPORT MORE LANGUAGES
+            specs['layer_arn_list'] = [x['arn'] for x in specs.get('layers', [])]
+        return specs_list
+
+
 def get_func_info_by_short_name(short_name: str, alias: str = settings.FUNC_ALIAS) -> dict:
     full_name = get_func_full_name(f'{short_name}:{alias}')
     return get_func_info_by_name(full_name)
 
 
-def get_func_info_by_name(func_name) -> dict:
+def get_func_info_by_name(func_name, qualifier: str = None) -> dict:
     info = {}
     try:
-        resp = lambda_client.get_function(FunctionName=func_name)
+        resp = lambda_client.get_function(FunctionName=func_name, **({'Qualifier': qualifier} if qualifier else {}))
         resp.pop('ResponseMetadata', None)
         info = resp['Configuration']
     except Exception:
@@ -276,33 +370,39 @@ def get_all_func_versions(func_name: str) -> list:
 def filter_func_latest_version(func_versions: list) -> dict:
     fmap = {func['Version']: func for func in func_versions}
     default = fmap.pop('$LATEST', {})
-    latest = fmap[max([v for v in fmap if is_int(v)])] if len(fmap) else default
+    latest = fmap[str(max([int(v) for v in fmap if is_int(v)]))] if len(fmap) else default
     return latest
 
 
-def compile_and_upload_python_code(repo_path: str, specs: dict) -> str:
-    print('ZIPPING CODE ARCHIVE...')
-    func_s3_key = specs['func_s3_key']
-    tmp_path = '/tmp/code_{}.zip'.format(uuid.uuid4().hex)
-    # # FYI: "git archive" WILL RESPECT [".gitignore", ".gitattributes"]
-    # assert 0 == os.system(f'cd {repo_path} && git archive HEAD . -o {tmp_path}'), 'FAILED TO ARCHIVE'
-    # for ignore in specs.get('upload-ignore') or []:
-    #     assert 0 == os.system(f'zip --delete {tmp_path} "{ignore}" ||true')
-    # assert 0 == os.system(f'zip -sf {tmp_path}'), f'FAILED TO READ ZIP FILE: {tmp_path}'
+def build_python_code_archive(repo_path: str, specs: dict) -> bytes:
+    # FUNCTION PACKAGES ARE SMALL: BUILD IN MEMORY SO THE CodeSha256 IS KNOWN BEFORE ANY UPLOAD
+    print('ZIPPING CODE ARCHIVE FOR [{}]...'.format(specs['name']))
     patterns = ['.git/*', 'tests/*', '*/__pycache__/*', '.DS_Store']
     patterns += specs.get('upload-ignore') or []
-    ignores = ' '.join([f'--exclude="{ptn}"' for ptn in patterns])
-    cmd = f'cd {repo_path} && zip -r {ignores} {tmp_path} .'
-    assert 0 == os.system(cmd), 'FAILED TO ARCHIVE'
-    print('DONE: ZIP ARCHIVED')
-    s3_client.upload_file(tmp_path, func_s3_key)
-    assert s3_client.exists(func_s3_key), f'FAILED TO UPLOAD CODE: {func_s3_key}'
+    relpaths = archive_utils.list_files(repo_path, patterns)
+    buffer = io.BytesIO()
+    summary = archive_utils.build_zip(repo_path, relpaths, buffer)
+    specs['code_archive'] = buffer.getvalue()
+    specs['code_sha256'] = blob_to_code_sha256(specs['code_archive'])
+    print('DONE: ZIP ARCHIVED [{}] FILES ({} BYTES), CodeSha256: [{}]'.format(
+        summary['files'], summary['zip_size'], specs['code_sha256']))
+    return specs['code_archive']
+
+
+def compile_and_upload_python_code(repo_path: str, specs: dict) -> str:
+    func_s3_key = specs['func_s3_key']
+    blob = specs.get('code_archive') or build_python_code_archive(repo_path, specs)
+    s3_client.upload_fileobj(io.BytesIO(blob), func_s3_key)
+    assert s3_client.exists(func_s3_key, cached=False), f'FAILED TO UPLOAD CODE: {func_s3_key}'
     print('DONE: UPLOADED CODE ZIP ARCHIVE')
-    assert 0 == os.system(f'rm {tmp_path} ||true')
-    print('DONE: REMOVED TMP FILES')
+    remove_code_archive(specs)
     return func_s3_key
 
 
+def remove_code_archive(specs: dict):
+    specs.pop('code_archive', None)
+
+
 def create_python_function(specs: dict) -> dict:
     full_name = specs['full_name']
     print(f'CREATING LAMBDA [{full_name}]')
@@ -339,6 +439,7 @@ def create_python_function(specs: dict) -> dict:
         print('\t==>NOTICE: WILL SET LAMBDA INSIDE OF VPC')
     resp = lambda_client.create_function(**args)
     resp.pop('ResponseMetadata', None)
+    track_function_ready(specs)
     version = resp['Version']
     print(f'OK: CREATED LAMBDA FUNCTION {full_name} WITH VERSION [{version}]')
     return resp
@@ -356,13 +457,13 @@ def update_python_function(specs: dict, publish: bool = True) -> dict:
     }
     resp = lambda_client.update_function_code(**args)
     resp.pop('ResponseMetadata', None)
-    waiter = lambda_client.get_waiter('function_updated')
-    waiter.wait(FunctionName=specs['full_name'], WaiterConfig={'Delay': 2, 'MaxAttempts': 30})
+    track_function_ready(specs)
     return resp
 
 
 def update_function_config(specs: dict) -> dict:
-    # ==> UPDATE CONFIG (BLOCKING)
+    # ==> UPDATE CONFIG (BLOCKING: A FUNCTION ONLY ACCEPTS ONE UPDATE AT A TIME)
+    wait_function_ready(specs)
     print('UPDATING LAMBDA CONFIG FOR: {}'.format(specs['full_name']))
     args = {
         'FunctionName': specs['full_name'],
@@ -386,10 +487,35 @@ def update_function_config(specs: dict) -> dict:
         print('\t==>NOTICE: WILL SET LAMBDA INSIDE OF VPC')
     resp = lambda_client.update_function_configuration(**args)
     resp.pop('ResponseMetadata', None)
+    track_function_ready(specs)
     print('DONE: UPDATED LAMBDA: {}'.format(specs['full_name']))
     return resp
 
 
+def publish_function_version(specs: dict) -> dict:
+    # ==> FREEZE THE CURRENT CODE & CONFIG OF "$LATEST" INTO A NEW VERSION
+    wait_function_ready(specs)
+    print('PUBLISHING NEW VERSION OF LAMBDA FOR: {}'.format(specs['full_name']))
+    resp = lambda_client.publish_version(FunctionName=specs['full_name'])
+    resp.pop('ResponseMetadata', None)
+    track_function_ready(specs)
+    print('DONE: PUBLISHED VERSION [{}] FOR: {}'.format(resp['Version'], specs['full_name']))
+    return resp
+
+
+def track_function_ready(specs: dict):
+    # NON-BLOCKING: THE FUTURE IS RESOLVED BY THE SHARED TRACKER ONCE THE FUNCTION SETTLES
+    future = readiness_utils.get_readiness_tracker().track(specs['full_name'])
+    specs.setdefault('pending', []).append(future)
+    return future
+
+
+def wait_function_ready(specs: dict) -> list:
+    results = [future.result() for future in specs.get('pending') or []]
+    specs['pending'] = []
+    return results
+
+
 def get_func_alias(func_name, alias) -> dict:
     response = {}
     try:
@@ -400,6 +526,17 @@ def get_func_alias(func_name, alias) -> dict:
     return response
 
 
+def list_func_aliases(func_name: str) -> dict:
+    aliases = {}
+    try:
+        paginator = lambda_client.get_paginator('list_aliases')
+        for resp in paginator.paginate(FunctionName=func_name):
+            aliases.update({x['Name']: x for x in resp['Aliases']})
+    except Exception:
+        print(f'FAILED TO LIST ALIASES FOR [{func_name}]')
+    return aliases
+
+
 def create_func_alias(func_name, alias, version) -> dict:
     alias_version = None
     resp = lambda_client.create_alias(FunctionName=func_name, Name=alias, FunctionVersion=version)
@@ -425,33 +562,33 @@ def get_function_concurrency(func_name: str, alias: str) -> int:
     }
     try:
         resp = lambda_client.get_provisioned_concurrency_config(**args)
-        count = resp['AllocatedProvisionedConcurrentExecutions']
+        count = resp.get('RequestedProvisionedConcurrentExecutions') or resp['AllocatedProvisionedConcurrentExecutions']
     except Exception:
         print(f'NO FUNCTION PROVISIONED CONCURRENCY FOUND FOR [{func_name}:{alias}]')
     return count
 
 
 def set_function_preservation(specs: dict) -> dict:
+    wait_function_ready(specs)
     args = {
         'FunctionName': specs['full_name'],
         'Qualifier': specs['alias'],
         'ProvisionedConcurrentExecutions': specs['preserve'],
     }
     resp = lambda_client.put_provisioned_concurrency_config(**args)
-    waiter = lambda_client.get_waiter('function_active')
-    waiter.wait(FunctionName=specs['full_name'], WaiterConfig={'Delay': 2, 'MaxAttempts': 30})
+    track_function_ready(specs)
     print('DONE: PUT PROVISIONED CONCURRENCY [{}] TO LAMBDA [{}]'.format(specs['preserve'], specs['name']))
     return resp
 
 
 def remove_function_preservation(specs: dict) -> dict:
+    wait_function_ready(specs)
     args = {
         'FunctionName': specs['full_name'],
         'Qualifier': specs['alias'],
     }
     resp = lambda_client.delete_provisioned_concurrency_config(**args)
-    waiter = lambda_client.get_waiter('function_active')
-    waiter.wait(FunctionName=specs['full_name'], WaiterConfig={'Delay': 2, 'MaxAttempts': 30})
+    track_function_ready(specs)
     print('DONE: REMOVED PROVISIONED CONCURRENCY FOR LAMBDA [{}]'.format(specs['name']))
     return resp
 
@@ -0,0 +1,145 @@
+"""
+Local, content-addressed cache of built layer archives (keyed by the manifest hash),
+so a layer is only built by pip once per machine, no matter how often the bucket is wiped.
+REF: https://pip.pypa.io/en/stable/topics/caching/
+"""
+import os
+import shutil
+import logging
+import tempfile
+import threading
+
+import settings
+from utils import archive_utils
+from utils import profile_utils
+
+logger = logging.getLogger(__name__)
+
+PYTHON_SITE_PACKAGES = 'python/lib/python3.8/site-packages'
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+_LAYER_CACHE = {}
+_LAYER_CACHE_LOCK = threading.Lock()
+
+
+class TeeWriter:
+    """Writable stream which writes every chunk into all of the given streams."""
+
+    def __init__(self, *fileobjs):
+        self.fileobjs = [f for f in fileobjs if f is not None]
+
+    def write(self, blob):
+        for fileobj in self.fileobjs:
+            fileobj.write(blob)
+        return len(blob)
+
+
+class LayerBuildCache:
+    """Layer zips live in "<cache_dir>/layers/<type>/<sha>.zip" and are evicted least-recently-used first.
+
+    Every build gets its own work dir, so different layers can be built at the same time,
+    and all builds share one pip cache dir so wheels are only downloaded once.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int):
+        self.cache_dir = os.path.realpath(os.path.expanduser(cache_dir))
+        self.max_size = max_size
+        self.pip_cache_dir = os.path.join(self.cache_dir, 'pip')
+        self.work_dir = os.path.join(self.cache_dir, 'work')
+        self.stats = {'hit': [], 'miss': [], 'evicted': []}
+        self._lock = threading.Lock()
+        self._sha_locks = {}
+        for path in [self.pip_cache_dir, self.work_dir, os.path.join(self.cache_dir, 'layers')]:
+            os.makedirs(path, exist_ok=True)
+
+    def get_path(self, sha: str, layer_type: str = 'python') -> str:
+        return os.path.join(self.cache_dir, 'layers', layer_type, f'{sha}.zip')
+
+    def lookup(self, sha: str, layer_type: str = 'python') -> str:
+        path = self.get_path(sha, layer_type)
+        if not os.path.isfile(path):
+            return ''
+        os.utime(path)  # MARK AS RECENTLY USED FOR LRU
+        return path
+
+    def get_or_build(self, manifest_path: str, sha: str, stream=None, layer_type: str = 'python') -> str:
+        """Return the path of the cached layer zip, build it (and copy it into "stream") on a miss."""
+        with self._lock:
+            sha_lock = self._sha_locks.setdefault((layer_type, sha), threading.Lock())
+        with sha_lock:  # THE SAME LAYER IS NEVER BUILT TWICE AT THE SAME TIME
+            path = self.lookup(sha, layer_type)
+            if path:
+                print(f'LAYER CACHE HIT: [{sha}]')
+                self._record('hit', sha)
+                if stream is not None:
+                    with open(path, 'rb') as f:
+                        shutil.copyfileobj(f, stream, COPY_CHUNK_SIZE)
+                return path
+            print(f'LAYER CACHE MISS: [{sha}]')
+            self._record('miss', sha)
+            path = self.build_python_layer(manifest_path, sha, stream)
+        self.evict(keep=path)
+        return path
+
+    def build_python_layer(self, manifest_path: str, sha: str, stream=None) -> str:
+        path = self.get_path(sha, 'python')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        build_dir = tempfile.mkdtemp(prefix=f'{sha}-', dir=self.work_dir)
+        try:
+            print('BUILDING PACKAGES...')
+            target = os.path.join(build_dir, PYTHON_SITE_PACKAGES)
+            cmd = (
+                f'pip install -r {manifest_path} --compile --prefer-binary '
+                f'--cache-dir {self.pip_cache_dir} -t {target}'
+            )
+            assert 0 == profile_utils.system(cmd, resource=sha), f'FAILED TO BUILD LAYER: {manifest_path}'
+            print('DONE: BUILD LAYER')
+            relpaths = archive_utils.list_files(build_dir, prefix='python')
+            tmp_path = os.path.join(build_dir, f'{sha}.zip')
+            with open(tmp_path, 'wb') as f:
+                summary = archive_utils.build_zip(build_dir, relpaths, TeeWriter(f, stream))
+            os.replace(tmp_path, path)  # ATOMIC: A HALF-WRITTEN ZIP IS NEVER SEEN AS CACHED
+            print('DONE: ZIPPED LAYER [{}] FILES ({} -> {} BYTES)'.format(
+                summary['files'], summary['raw_size'], summary['zip_size']))
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+        return path
+
+    def evict(self, keep: str = None) -> list:
+        entries = []
+        layers_dir = os.path.join(self.cache_dir, 'layers')
+        for dirpath, _, files in os.walk(layers_dir):
+            for name in files:
+                path = os.path.join(dirpath, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(x[1] for x in entries)
+        evicted = []
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            if path == keep:
+                continue
+            os.remove(path)
+            total -= size
+            evicted.append(path)
+            self._record('evicted', os.path.basename(path))
+            logger.info('EVICTED LAYER CACHE: %s', path)
+        return evicted
+
+    def _record(self, kind: str, sha: str):
+        with self._lock:
+            self.stats[kind].append(sha)
+
+    def report(self):
+        print('LAYER CACHE [{}]: HIT [{}] MISS [{}] EVICTED [{}]'.format(
+            self.cache_dir, len(self.stats['hit']), len(self.stats['miss']), len(self.stats['evicted'])))
+        return self.stats
+
+
+def get_layer_cache() -> LayerBuildCache:
+    with _LAYER_CACHE_LOCK:
+        if 'cache' not in _LAYER_CACHE:
+            _LAYER_CACHE['cache'] = LayerBuildCache(
+                settings.LAYER_CACHE_DIR, settings.LAYER_CACHE_MAX_MB * 1024 * 1024,
+            )
+        return _LAYER_CACHE['cache']
@@ -0,0 +1,195 @@
+"""
+Incremental deployment: snapshot the remote state of the whole app with bulk list calls,
+diff every rendered resource against it, and only act on resources that actually changed.
+"""
+import json
+import asyncio
+import logging
+
+import settings
+from utils import async_utils
+from utils import common_utils
+from utils import rest_api_utils
+from utils import cloudwatch_utils
+
+logger = logging.getLogger(__name__)
+
+
+class RemoteSnapshot:
+    def __init__(self):
+        self.functions = {}
+        self.versions = {}  # {FUNCTION NAME: [VERSION CONFIG, ...]}
+        self.aliases = {}  # {FUNCTION NAME: {ALIAS NAME: ALIAS}}
+        self.state_machines = {}
+        self.log_groups = {}
+        self.rules = {}
+
+    def collect(self, kinds: list = None):
+        return async_utils.run(self.collect_async(kinds))
+
+    async def collect_async(self, kinds: list = None):
+        # ALL BULK LISTINGS RUN CONCURRENTLY
+        aio = async_utils.aio
+        kinds = kinds or ['lambda', 'stepfunc', 'schedule']
+        jobs = {}
+        if 'lambda' in kinds:
+            jobs['functions'] = aio.lambda_utils.list_functions_by_prefix(common_utils.get_name_prefix('lambda'))
+        if 'stepfunc' in kinds:
+            prefix = common_utils.get_name_prefix('stepfunc')
+            jobs['state_machines'] = aio.stepfunc_utils.list_state_machines_by_prefix(prefix)
+            lg_prefix = cloudwatch_utils.get_stepfunc_log_group_name(prefix)
+            jobs['log_groups'] = aio.cloudwatch_utils.list_log_groups_by_prefix(lg_prefix)
+        if 'schedule' in kinds:
+            jobs['rules'] = aio.event_utils.list_rules_by_prefix(common_utils.get_name_prefix('schedule'))
+        results = await asyncio.gather(*jobs.values())
+        for attr, result in zip(jobs, results):
+            setattr(self, attr, result)
+        if 'lambda' in kinds:
+            # NO BULK API FOR VERSIONS & ALIASES: ONE CALL PER FUNCTION, ALL OF THEM CONCURRENTLY
+            names = sorted(self.functions)
+            results = await asyncio.gather(
+                aio.map(aio.lambda_utils.get_all_func_versions, names),
+                aio.map(aio.lambda_utils.list_func_aliases, names),
+            )
+            self.versions = dict(zip(names, results[0]))
+            self.aliases = dict(zip(names, results[1]))
+        return self
+
+
+class DeployPlan:
+    def __init__(self):
+        self.items = {}
+
+    def add(self, kind: str, name: str, changes: list) -> dict:
+        if 'create' in changes:
+            action = 'create'
+        elif changes:
+            action = 'update'
+        else:
+            action = 'noop'
+        item = {'kind': kind, 'name': name, 'action': action, 'changes': changes}
+        self.items[(kind, name)] = item
+        return item
+
+    def get(self, kind: str, name: str) -> dict:
+        return self.items.get((kind, name)) or {'kind': kind, 'name': name, 'action': 'update', 'changes': []}
+
+    def print(self):
+        print('EXECUTION PLAN:')
+        for item in self.items.values():
+            changes = ', '.join(item['changes'])
+            print('\t[{}] {} [{}] {}'.format(item['action'].upper(), item['kind'], item['name'], changes))
+        counts = {}
+        for item in self.items.values():
+            counts[item['action']] = counts.get(item['action'], 0) + 1
+        print('PLAN TOTAL: {}'.format(counts))
+
+
+def diff_lambda(specs: dict) -> list:
+    remote = specs.get('remote') or {}
+    if not remote:
+        return ['create']
+    changes = []
+    # SAME "CodeSha256" AS THE LATEST PUBLISHED VERSION => NO UPLOAD, NO NEW VERSION
+    if settings.DEPLOY_FORCE or not specs.get('code_sha256') or specs['code_sha256'] != specs.get('latest_code_sha256'):
+        changes.append('code')
+    # COMPARE WITH THE VERSION IN SERVICE: "$LATEST" MAY HOLD AN UPDATE THAT WAS NEVER PUBLISHED
+    if settings.DEPLOY_FORCE or diff_lambda_config(specs, specs.get('alias_config') or remote):
+        changes.append('config')
+    if settings.DEPLOY_FORCE or specs['preserve'] != specs.get('remote_preserve', 0):
+        changes.append('concurrency')
+    return changes
+
+
+def diff_lambda_config(specs: dict, remote: dict) -> list:
+    expected = {
+        'Role': specs['role_arn'],
+        'Handler': specs['handler'],
+        'Runtime': specs['runtime'],
+        'Timeout': specs['timeout'],
+        'MemorySize': specs['mem'],
+        'Environment': common_utils.get_app_env_dict(),
+        'TracingConfig': 'Active' if settings.ENABLE_XRAY else 'PassThrough',
+        'Layers': sorted(specs.get('layer_arn_list') or []),
+        'VpcConfig': [sorted(specs['subnet-ids']), sorted(specs['sec-group-ids'])],
+    }
+    actual = {
+        'Role': remote.get('Role'),
+        'Handler': remote.get('Handler'),
+        'Runtime': remote.get('Runtime'),
+        'Timeout': remote.get('Timeout'),
+        'MemorySize': remote.get('MemorySize'),
+        'Environment': (remote.get('Environment') or {}).get('Variables') or {},
+        'TracingConfig': (remote.get('TracingConfig') or {}).get('Mode'),
+        'Layers': sorted(x['Arn'] for x in remote.get('Layers') or []),
+        'VpcConfig': [
+            sorted((remote.get('VpcConfig') or {}).get('SubnetIds') or []),
+            sorted((remote.get('VpcConfig') or {}).get('SecurityGroupIds') or []),
+        ],
+    }
+    if specs.get('tmp-size'):
+        expected['EphemeralStorage'] = int(specs['tmp-size'])
+        actual['EphemeralStorage'] = (remote.get('EphemeralStorage') or {}).get('Size')
+    changed = [k for k in expected if expected[k] != actual[k]]
+    if changed:
+        print('LAMBDA CONFIG CHANGED FOR [{}]: {}'.format(specs['name'], changed))
+    return changed
+
+
+def diff_stepfunc(specs: dict) -> list:
+    machine = specs.get('machine') or {}
+    if not machine:
+        return ['create']
+    if settings.DEPLOY_FORCE:
+        return ['definition', 'config']
+    changes = []
+    if json.loads(machine.get('definition') or '{}') != specs['definition']:
+        changes.append('definition')
+    destinations = (machine.get('loggingConfiguration') or {}).get('destinations') or []
+    log_group_arns = [x.get('cloudWatchLogsLogGroup', {}).get('logGroupArn') for x in destinations]
+    if any([
+        machine.get('roleArn') != specs['role_arn'],
+        specs['log_group_arn'] not in log_group_arns,
+        bool((machine.get('tracingConfiguration') or {}).get('enabled')) != settings.ENABLE_XRAY,
+    ]):
+        changes.append('config')
+    return changes
+
+
+def diff_schedule(specs: dict) -> list:
+    rule = specs.get('rule') or {}
+    if not rule:
+        return ['create']
+    if settings.DEPLOY_FORCE:
+        return ['rule']
+    if specs['event-type'] == 'cron':
+        same_event = rule.get('ScheduleExpression') == specs['cron']
+    else:
+        same_event = json.loads(rule.get('EventPattern') or '{}') == json.loads(specs['filter'])
+    same_role = (rule.get('RoleArn') or '') == (specs.get('ro-arn') or '')
+    if same_event and same_role and rule.get('State') == 'ENABLED':
+        return []
+    return ['rule']
+
+
+def diff_rest_api_routes(fingerprints: dict, state: dict, remote_route_map: dict) -> dict:
+    """
+    Route keys to create / update / delete: the swagger fingerprints vs the ones saved by the last deployment.
+    None when the whole swagger must be imported: first deployment, change outside the routes,
+    or routes created/deleted out of band (the remote routes differ from the saved ones).
+    """
+    shared_key = rest_api_utils.SHARED_ROUTE_KEY
+    saved = state.get('routes') or {}
+    if settings.DEPLOY_FORCE or not saved or saved.get(shared_key) != fingerprints[shared_key]:
+        return None
+    saved_keys = set(saved) - {shared_key}
+    remote_keys = set(rest_api_utils.get_route_key(method, route) for method, route in remote_route_map)
+    if remote_keys != saved_keys:
+        print('REMOTE ROUTES DIFFER FROM THE LAST DEPLOYMENT: {}'.format(sorted(remote_keys ^ saved_keys)))
+        return None
+    keys = set(fingerprints) - {shared_key}
+    return {
+        'create': sorted(keys - saved_keys),
+        'update': sorted(k for k in keys & saved_keys if fingerprints[k] != saved[k]),
+        'delete': sorted(saved_keys - keys),
+    }
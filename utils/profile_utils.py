@@ -0,0 +1,214 @@
+"""
+Deploy profiler: every boto3 call of the registry clients (via botocore events), every shell-out and
+every named span is recorded with its latency, retries, bytes & resource, then saved as a JSON timeline
+plus a Chrome trace (open it in chrome://tracing or https://ui.perfetto.dev).
+
+    with profile_utils.span('deploy-function', resource=name):
+        ...
+    profile_utils.get_recorder().save(settings.PROFILE_DIR, 'deploy-lambda')
+
+REF: https://docs.google.com/document/d/1CvAClvFfyA5R-PhYUmn5OOQtYMH4h6I0nSsKchNAySU (TRACE EVENT FORMAT)
+REF: https://botocore.amazonaws.com/v1/documentation/api/latest/topics/events.html
+"""
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from contextlib import nullcontext
+
+from botocore.utils import determine_content_length
+
+logger = logging.getLogger(__name__)
+
+# PARAMS NAMING THE RESOURCE OF A CALL, THE FIRST ONE PRESENT WINS
+RESOURCE_PARAMS = [
+    'FunctionName', 'LayerName', 'RoleName', 'PolicyArn', 'stateMachineArn', 'name',
+    'restApiId', 'ApiId', 'Rule', 'Name', 'logGroupName', 'Key', 'Bucket', 'Prefix',
+]
+CALL_CATEGORIES = ['aws', 'shell']  # SUMMARIZED, WHILE 'phase' & 'task' SPANS ONLY SHOW IN THE TIMELINE
+_RECORDER = {}
+_RECORDER_LOCK = threading.Lock()
+
+
+class CallRecorder:
+    def __init__(self):
+        self.started = time.time()
+        self.events = []  # {'name', 'cat', 'resource', 'start', 'seconds', 'thread', ...}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, cat: str, start: float, seconds: float, resource: str = None, **info):
+        event = {
+            'name': name,
+            'cat': cat,
+            'resource': resource,
+            'start': round(start - self.started, 6),
+            'seconds': round(seconds, 6),
+            'thread': threading.current_thread().name,
+        }
+        event.update({k: v for k, v in info.items() if v is not None})
+        with self._lock:
+            self.events.append(event)
+        return event
+
+    @contextmanager
+    def span(self, name: str, cat: str = 'phase', resource: str = None):
+        start = time.time()
+        info = {}
+        try:
+            yield info
+        except Exception as e:
+            info['error'] = type(e).__name__
+            raise
+        finally:
+            self.add(name, cat, start, time.time() - start, resource, **info)
+
+    def system(self, cmd: str, resource: str = None) -> int:
+        """os.system, recorded as a "shell" event (named by the executable)."""
+        start = time.time()
+        code = os.system(cmd)
+        self.add(cmd.split()[0], 'shell', start, time.time() - start, resource, cmd=cmd, exit_code=code)
+        return code
+
+    def register(self, client):
+        """Hook a boto3 client (ClientRegistry calls it for every client it creates)."""
+        service = client.meta.service_model.service_name
+        client.meta.events.register('before-parameter-build', self._before_call)
+        client.meta.events.register('request-created', self._request_created)
+        client.meta.events.register('after-call', self._make_after_call(service))
+        client.meta.events.register('after-call-error', self._make_after_call_error(service))
+
+    @staticmethod
+    def _before_call(params, context, **kwargs):
+        resource = next((params[k] for k in RESOURCE_PARAMS if isinstance(params.get(k), str)), None)
+        context['profile'] = {'start': time.time(), 'resource': resource, 'bytes_out': 0}
+
+    @staticmethod
+    def _request_created(request, **kwargs):
+        # ONCE PER ATTEMPT, SO RETRIED UPLOADS COUNT AS MANY TIMES AS THEY WERE SENT
+        profile = (request.context or {}).get('profile')
+        if profile is not None and request.body is not None:
+            try:
+                profile['bytes_out'] += determine_content_length(request.body) or 0
+            except Exception:  # pylint: disable=broad-except
+                pass
+
+    def _make_after_call(self, service: str):
+        def after_call(http_response, parsed, model, context, **kwargs):
+            profile = context.get('profile')
+            if profile is None:
+                return
+            bytes_in = http_response.headers.get('content-length')
+            error = parsed.get('Error', {}).get('Code') if http_response.status_code >= 300 else None
+            self.add(
+                f'{service}.{model.name}', 'aws', profile['start'], time.time() - profile['start'],
+                profile['resource'],
+                retries=parsed.get('ResponseMetadata', {}).get('RetryAttempts', 0),
+                bytes_out=profile['bytes_out'],
+                bytes_in=int(bytes_in) if bytes_in else 0,
+                error=error,
+            )
+        return after_call
+
+    def _make_after_call_error(self, service: str):
+        def after_call_error(event_name, exception, context, **kwargs):
+            profile = context.get('profile')
+            if profile is None:
+                return
+            self.add(
+                f'{service}.{event_name.rsplit(".", 1)[-1]}', 'aws', profile['start'],
+                time.time() - profile['start'], profile['resource'],
+                bytes_out=profile['bytes_out'], error=type(exception).__name__,
+            )
+        return after_call_error
+
+    def get_chrome_trace(self) -> dict:
+        threads = {}
+        trace = []
+        for event in sorted(self.events, key=lambda x: x['start']):
+            args = {k: v for k, v in event.items() if k not in ['name', 'cat', 'start', 'seconds', 'thread']}
+            trace.append({
+                'name': event['name'] if not event['resource'] else f'{event["name"]} {event["resource"]}',
+                'cat': event['cat'],
+                'ph': 'X',
+                'ts': int(event['start'] * 1e6),
+                'dur': max(1, int(event['seconds'] * 1e6)),
+                'pid': 1,
+                'tid': threads.setdefault(event['thread'], len(threads) + 1),
+                'args': args,
+            })
+        for name, tid in threads.items():
+            trace.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': name}})
+        return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+    def save(self, directory: str, name: str) -> tuple:
+        """Write <name>-<ts>.json (timeline) & <name>-<ts>.trace.json (Chrome trace), return both paths."""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, '{}-{}'.format(name, time.strftime('%Y%m%d-%H%M%S', time.gmtime())))
+        with self._lock:
+            events = list(self.events)
+        timeline = {'started': self.started, 'seconds': round(time.time() - self.started, 3), 'events': events}
+        with open(f'{base}.json', 'w') as f:
+            json.dump(timeline, f, indent=2)
+        with open(f'{base}.trace.json', 'w') as f:
+            json.dump(self.get_chrome_trace(), f)
+        print(f'PROFILE SAVED: {base}.json / {base}.trace.json')
+        return f'{base}.json', f'{base}.trace.json'
+
+    def summarize(self) -> dict:
+        """{NAME: {'count', 'seconds', 'max', 'retries', 'errors', 'bytes'}} of aws & shell events."""
+        summary = {}
+        for event in self.events:
+            if event['cat'] not in CALL_CATEGORIES:
+                continue
+            item = summary.setdefault(event['name'], {
+                'count': 0, 'seconds': 0, 'max': 0, 'retries': 0, 'errors': 0, 'bytes': 0,
+            })
+            item['count'] += 1
+            item['seconds'] += event['seconds']
+            item['max'] = max(item['max'], event['seconds'])
+            item['retries'] += event.get('retries', 0)
+            item['errors'] += 1 if event.get('error') else 0
+            item['bytes'] += event.get('bytes_out', 0) + event.get('bytes_in', 0)
+        return summary
+
+    def report(self, top: int = 10):
+        print('=' * 60)
+        print(f'TOP [{top}] OPERATIONS BY TOTAL TIME (COUNT / SECONDS / MAX / RETRIES / ERRORS / BYTES):')
+        summary = sorted(self.summarize().items(), key=lambda x: x[1]['seconds'], reverse=True)
+        for name, s in summary[:top]:
+            print('\t{}: {} / {:.2f} / {:.2f} / {} / {} / {}'.format(
+                name, s['count'], s['seconds'], s['max'], s['retries'], s['errors'], s['bytes']))
+        print(f'TOP [{top}] SLOWEST CALLS:')
+        calls = [x for x in self.events if x['cat'] in CALL_CATEGORIES]
+        calls.sort(key=lambda x: x['seconds'], reverse=True)
+        for event in calls[:top]:
+            print('\t{:.2f}s {} [{}]'.format(event['seconds'], event['name'], event['resource'] or ''))
+        print('=' * 60)
+
+
+def get_recorder() -> CallRecorder:
+    with _RECORDER_LOCK:
+        if 'recorder' not in _RECORDER:
+            _RECORDER['recorder'] = CallRecorder()
+        return _RECORDER['recorder']
+
+
+def enable_profile():
+    """Record the spans & shell-outs too (settings does it when "ENABLE_PROFILE" is on)."""
+    with _RECORDER_LOCK:
+        _RECORDER['enabled'] = True
+
+
+def span(name: str, cat: str = 'phase', resource: str = None):
+    # PROFILING OFF: NOTHING IS RECORDED, SO NOTHING PILES UP IN THE RECORDER
+    if not _RECORDER.get('enabled'):
+        return nullcontext({})
+    return get_recorder().span(name, cat, resource)
+
+
+def system(cmd: str, resource: str = None) -> int:
+    if not _RECORDER.get('enabled'):
+        return os.system(cmd)
+    return get_recorder().system(cmd, resource)
@@ -0,0 +1,112 @@
+"""
+One background poller which waits for many Lambda functions to settle (State / LastUpdateStatus)
+instead of every deploy thread blocking on its own boto3 waiter with a fixed delay.
+REF: https://docs.aws.amazon.com/lambda/latest/dg/functions-states.html
+"""
+import time
+import random
+import logging
+import threading
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+
+import settings
+
+logger = logging.getLogger(__name__)
+
+READY_STATES = ['Active']
+READY_UPDATE_STATUSES = [None, 'Successful']
+FAILED_STATES = ['Failed', 'Inactive']
+FAILED_UPDATE_STATUSES = ['Failed']
+_TRACKER = {}
+_TRACKER_LOCK = threading.Lock()
+
+
+class FunctionReadinessTracker:
+    """Track functions until they are ready, every tracked function gets a Future.
+
+    Every round polls all due functions at once (in parallel, "batch_size" at a time).
+    Each function backs off exponentially (with jitter) from "min_delay" to "max_delay"
+    while it is still pending, so fast updates resolve quickly and slow ones cost few calls.
+    """
+
+    def __init__(self, client=None, min_delay=0.5, max_delay=8, timeout=300, batch_size=10):
+        self.client = client or settings.lambda_client
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.pending = {}  # {FUNC_NAME: {'future', 'delay', 'next_poll', 'deadline'}}
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def track(self, func_name: str) -> Future:
+        with self._cond:
+            item = self.pending.get(func_name)
+            if item is None:
+                now = time.time()
+                item = {
+                    'future': Future(),
+                    'delay': self.min_delay,
+                    'next_poll': now + self.min_delay,
+                    'deadline': now + self.timeout,
+                }
+                self.pending[func_name] = item
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='lambda-readiness', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+            return item['future']
+
+    def wait(self, func_name: str) -> dict:
+        return self.track(func_name).result()
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=self.batch_size) as executor:
+            while True:
+                with self._cond:
+                    if not self.pending:
+                        self._thread = None
+                        return
+                    now = time.time()
+                    due = [name for name, item in self.pending.items() if item['next_poll'] <= now]
+                    if not due:
+                        self._cond.wait(min(item['next_poll'] for item in self.pending.values()) - now)
+                        continue
+                results = list(executor.map(self._poll, due))
+                with self._cond:
+                    for name, (config, error) in zip(due, results):
+                        self._update(name, config, error)
+
+    def _poll(self, func_name: str) -> tuple:
+        try:
+            return self.client.get_function_configuration(FunctionName=func_name), None
+        except Exception as e:  # pylint: disable=broad-except
+            return {}, e
+
+    def _update(self, func_name: str, config: dict, error: Exception):
+        item = self.pending[func_name]
+        state, status = config.get('State'), config.get('LastUpdateStatus')
+        if error is None and state in READY_STATES and status in READY_UPDATE_STATUSES:
+            config.pop('ResponseMetadata', None)
+            item['future'].set_result(config)
+        elif error is None and (state in FAILED_STATES or status in FAILED_UPDATE_STATUSES):
+            reason = config.get('LastUpdateStatusReason') or config.get('StateReason')
+            msg = f'LAMBDA [{func_name}] IS NOT READY: [{state}/{status}] {reason}'
+            item['future'].set_exception(RuntimeError(msg))
+        elif time.time() >= item['deadline']:
+            item['future'].set_exception(TimeoutError(f'TIMEOUT WAITING FOR LAMBDA [{func_name}]: {error or status}'))
+        else:
+            if error is not None:
+                logger.info('FAILED TO POLL LAMBDA [%s]: %s', func_name, error)
+            item['delay'] = min(self.max_delay, item['delay'] * 2)
+            item['next_poll'] = time.time() + item['delay'] * random.uniform(0.8, 1.2)
+            return
+        self.pending.pop(func_name)
+
+
+def get_readiness_tracker() -> FunctionReadinessTracker:
+    with _TRACKER_LOCK:
+        if 'tracker' not in _TRACKER:
+            _TRACKER['tracker'] = FunctionReadinessTracker()
+        return _TRACKER['tracker']
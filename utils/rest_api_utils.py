@@ -3,15 +3,24 @@ REF: https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/
 """
 
 import re
+import json
 import yaml
+import hashlib
 import logging
 
+from botocore.exceptions import ClientError
+
 import settings
 from utils import common_utils
+from utils.s3_utils import S3Bucket
 
 rest_client = settings.rest_client
+s3_client = S3Bucket(settings.AWS_LAMBDA_BUCKET)
 logger = logging.getLogger(__name__)
 
+HTTP_METHODS = ['get', 'put', 'post', 'delete', 'options', 'head', 'patch', 'x-amazon-apigateway-any-method']
+SHARED_ROUTE_KEY = '*'  # FINGERPRINT OF EVERYTHING OUTSIDE "paths" (DEFINITIONS, SECURITY, EXTENSIONS...)
+
 
 def render_specs(specs: dict) -> dict:
     specs['full-name'] = get_api_full_name(specs['name'])
@@ -94,10 +103,32 @@ def get_api_latest_deployment(api_id: str) -> dict:
     return latest
 
 
-def create_api_deployment(api_id: str) -> dict:
+def get_api_stage(api_id: str, stage_name: str) -> dict:
+    if not api_id:
+        return {}
+    response = rest_client.get_stages(restApiId=api_id)
+    stage = next((x for x in response['item'] if x['stageName'] == stage_name), {})
+    return stage
+
+
+def update_api_stage_deployment(api_id: str, stage_name: str, deployment_id: str) -> dict:
     args = {
         'restApiId': api_id,
+        'stageName': stage_name,
+        'patchOperations': [{'op': 'replace', 'path': '/deploymentId', 'value': deployment_id}],
     }
+    response = rest_client.update_stage(**args)
+    response.pop('ResponseMetadata', None)
+    print(f'DONE: POINTED STAGE [{stage_name}] TO DEPLOYMENT [{deployment_id}]')
+    return response
+
+
+def create_api_deployment(api_id: str, description: str = None) -> dict:
+    args = {
+        'restApiId': api_id,
+    }
+    if description:
+        args['description'] = description
     response = rest_client.create_deployment(**args)
     print(f'DONE: CREATED A DEPLOYMENT FOR API: [{api_id}]')
     return response
@@ -144,17 +175,86 @@ def get_api_route_map(api_id: str) -> dict:
     return route_map
 
 
-def import_routes(api_id: str, swagger_definition: dict):
+def get_route_key(method: str, route: str) -> str:
+    # SAME KEY AS "common_utils.parse_swagger_route_map", API GATEWAY NAMES "x-amazon-apigateway-any-method" "ANY"
+    method = 'X-AMAZON-APIGATEWAY-ANY-METHOD' if method.upper() == 'ANY' else method.upper()
+    return ' '.join([method, route])
+
+
+def get_fingerprint(data) -> str:
+    raw = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def get_swagger_fingerprints(swagger: dict) -> dict:
+    """{ROUTE_KEY: FINGERPRINT} of every route of the swagger, plus SHARED_ROUTE_KEY for the rest of it."""
+    paths = swagger.get('paths') or {}
+    operations = {
+        route: {k: v for k, v in methods.items() if k.lower() in HTTP_METHODS}
+        for route, methods in paths.items()
+    }
+    fingerprints = {SHARED_ROUTE_KEY: get_fingerprint({k: v for k, v in swagger.items() if k != 'paths'})}
+    for route_key, info in common_utils.parse_swagger_route_map(operations).items():
+        # PATH LEVEL KEYS (EX: "parameters") ARE PART OF EVERY ROUTE OF THE PATH
+        shared = {k: v for k, v in paths[info['route']].items() if k.lower() not in HTTP_METHODS}
+        fingerprints[route_key] = get_fingerprint([info, shared])
+    return fingerprints
+
+
+def get_partial_swagger(swagger: dict, route_keys: list) -> dict:
+    """The swagger restricted to the paths of the given routes (for a "merge" import)."""
+    routes = set(x.split(' ', 1)[1] for x in route_keys)
+    partial = dict(swagger)
+    partial['paths'] = {k: v for k, v in (swagger.get('paths') or {}).items() if k in routes}
+    return partial
+
+
+def get_route_state_s3_key(full_name: str) -> str:
+    state_s3_key = 'rest-api/{}/{}/{}/{}-ROUTES.json'.format(
+        settings.STAGE_NAME, settings.STAGE_SUBNAME, settings.APPLICATION_NAME, full_name,
+    )
+    return state_s3_key
+
+
+def get_route_state(full_name: str) -> dict:
+    """{'api_id', 'deployment_id', 'routes': FINGERPRINTS} saved by the last deployment ({} IF NONE)."""
+    try:
+        return json.loads(s3_client.download_file_blob(get_route_state_s3_key(full_name)))
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') not in ('404', 'NoSuchKey', 'NotFound'):
+            raise
+        return {}
+
+
+def save_route_state(full_name: str, state: dict):
+    s3_client.upload_file_blob(json.dumps(state, indent=2).encode('utf-8'), get_route_state_s3_key(full_name))
+    print(f'DONE: SAVED [{len(state["routes"]) - 1}] ROUTE FINGERPRINTS OF API [{full_name}]')
+
+
+def remove_route_state(full_name: str):
+    s3_client.delete_file(get_route_state_s3_key(full_name))
+    print(f'DONE: REMOVED ROUTE FINGERPRINTS OF API [{full_name}]')
+
+
+def import_routes(api_id: str, swagger_definition: dict, mode: str = 'overwrite'):
+    # "overwrite" REPLACES THE WHOLE API, "merge" ONLY ADDS/UPDATES THE GIVEN PATHS
     swagger_content = yaml.safe_dump(swagger_definition)
     args = {
         'restApiId': api_id,
         'body': swagger_content,
-        'mode': 'overwrite',
+        'mode': mode,
         'failOnWarnings': True,
     }
     response = rest_client.put_rest_api(**args)
     response.pop('ResponseMetadata', None)
-    print('DONE: IMPORTED ROUTES FROM SWAGGER')
+    print(f'DONE: IMPORTED [{len(swagger_definition.get("paths") or {})}] PATHS FROM SWAGGER ({mode.upper()})')
+    return response
+
+
+def delete_api_method(api_id: str, resource_id: str, method: str):
+    response = rest_client.delete_method(restApiId=api_id, resourceId=resource_id, httpMethod=method)
+    response.pop('ResponseMetadata', None)
+    print(f'DONE: DELETED METHOD [{method}] OF ROUTE [{resource_id}]')
     return response
 
 
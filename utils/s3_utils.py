@@ -1,11 +1,33 @@
 import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+
+import settings
 from settings import s3_client
 from settings import s3_resource
 
 import logging
 logger = logging.getLogger(__name__)
 
+MB = 1024 * 1024
+MIN_PART_SIZE = 5 * MB  # S3 LIMIT FOR EVERY PART EXCEPT THE LAST ONE
+DEFAULT_EXISTS_TTL = 300  # SECONDS A PREFETCHED PREFIX LISTING IS TRUSTED
+
+
+def get_transfer_profile(chunk_size=None, max_concurrency=None, threshold=None) -> dict:
+    profile = {
+        'chunk_size': chunk_size or settings.S3_TRANSFER_CHUNK_SIZE_MB * MB,
+        'max_concurrency': max_concurrency or settings.S3_TRANSFER_MAX_CONCURRENCY,
+        'threshold': threshold or settings.S3_TRANSFER_THRESHOLD_MB * MB,
+    }
+    profile['chunk_size'] = max(MIN_PART_SIZE, int(profile['chunk_size']))
+    return profile
+
 
 def get_s3_file_arn(bucket_name: str, s3_key: str) -> str:
     arn = f'arn:aws:s3:::{bucket_name}/{s3_key}'
@@ -13,34 +35,119 @@ def get_s3_file_arn(bucket_name: str, s3_key: str) -> str:
 
 
 class S3Bucket:
-    def __init__(self, bucket_name):
+    def __init__(self, bucket_name, transfer: dict = None):
         self.bucket_name = bucket_name
+        self.transfer = get_transfer_profile(**(transfer or {}))
+        self.transfer_config = TransferConfig(
+            multipart_threshold=self.transfer['threshold'],
+            multipart_chunksize=self.transfer['chunk_size'],
+            max_concurrency=self.transfer['max_concurrency'],
+            use_threads=True,
+        )
+        self.key_cache = KeyExistenceCache()
 
-    def exists(self, key_name):
+    def exists(self, key_name, cached=True):
+        if cached and self.key_cache.covers(key_name):
+            return self.key_cache.contains(key_name)
         is_existed = False
         try:
-            result = self.list_files(key_name)
-            is_existed = bool(result)
+            s3_client.head_object(Bucket=self.bucket_name, Key=key_name)
+            is_existed = True
+        except ClientError as ex:
+            if ex.response.get('Error', {}).get('Code') not in ('404', 'NoSuchKey', 'NotFound'):
+                logger.info('check_if_key_exist_in_s3 false. key = %s, msg = %s', key_name, ex)
         except Exception as ex:  # pylint: disable=broad-except
             logger.info('check_if_key_exist_in_s3 false. key = %s, msg = %s', key_name, ex)
+        self.key_cache.set(key_name, is_existed)
         return is_existed
 
-    def upload_file(self, localpath, s3_key=None):
+    def prefetch(self, path_prefix, ttl=DEFAULT_EXISTS_TTL):
+        """List a prefix once, so "exists" answers every key under it from memory until the TTL expires."""
+        keys = []
+        paginator = s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=path_prefix):
+            keys += [obj['Key'] for obj in page.get('Contents') or []]
+        self.key_cache.load(path_prefix, keys, ttl)
+        logger.info('PREFETCHED [%s] S3 KEYS UNDER [%s]', len(keys), path_prefix)
+        return len(keys)
+
+    def upload_file(self, localpath, s3_key=None, callback=None):
         if not os.path.exists(localpath):
             return False
         s3_key = s3_key or os.path.basename(localpath)
-        s3_client.upload_file(localpath, self.bucket_name, s3_key)
+        callback = callback or TransferProgress(s3_key, os.path.getsize(localpath))
+        s3_client.upload_file(localpath, self.bucket_name, s3_key, Config=self.transfer_config, Callback=callback)
+        self.key_cache.set(s3_key, True)
         return True
 
+    def upload_fileobj(self, fileobj, s3_key, callback=None):
+        s3_client.upload_fileobj(fileobj, self.bucket_name, s3_key, Config=self.transfer_config, Callback=callback)
+        self.key_cache.set(s3_key, True)
+        return True
+
+    def open_multipart_writer(self, s3_key, part_size=None, max_concurrency=None):
+        part_size = part_size or self.transfer['chunk_size']
+        max_concurrency = max_concurrency or self.transfer['max_concurrency']
+        return MultipartUploadWriter(self.bucket_name, s3_key, part_size, max_concurrency)
+
     def upload_file_blob(self, file_blob, s3_key):
         s3_client.put_object(Bucket=self.bucket_name, Key=s3_key, Body=file_blob)
+        self.key_cache.set(s3_key, True)
+        return True
+
+    def delete_file(self, s3_key):
+        s3_client.delete_object(Bucket=self.bucket_name, Key=s3_key)
+        self.key_cache.set(s3_key, False)
         return True
 
     def download_file_blob(self, s3_key):
-        obj = s3_resource.Object(self.bucket_name, s3_key)
-        body = obj.get()
-        blob = body['Body'].read()
-        return blob
+        # FYI: LARGE OBJECTS ARE FETCHED AS PARALLEL RANGED GETS, USE "iter_chunks" TO KEEP MEMORY CONSTANT
+        return b''.join(self.iter_chunks(s3_key))
+
+    def download_file(self, s3_key, localpath, callback=None):
+        if callback is None:
+            size = s3_client.head_object(Bucket=self.bucket_name, Key=s3_key)['ContentLength']
+            callback = TransferProgress(s3_key, size)
+        s3_client.download_file(self.bucket_name, s3_key, localpath, Config=self.transfer_config, Callback=callback)
+        return localpath
+
+    def iter_chunks(self, s3_key, chunk_size=None, max_concurrency=None, callback=None):
+        """Yield the object content in order, chunk by chunk.
+
+        Objects above the threshold are fetched as ranged GETs in parallel, at most
+        "max_concurrency" chunks are in flight (or buffered) at the same time.
+        """
+        chunk_size = chunk_size or self.transfer['chunk_size']
+        max_concurrency = max_concurrency or self.transfer['max_concurrency']
+        size = s3_client.head_object(Bucket=self.bucket_name, Key=s3_key)['ContentLength']
+        if size <= self.transfer['threshold']:
+            body = s3_client.get_object(Bucket=self.bucket_name, Key=s3_key)['Body']
+            for chunk in body.iter_chunks(chunk_size):
+                if callback:
+                    callback(len(chunk))
+                yield chunk
+            return
+        ranges = deque((start, min(start + chunk_size, size) - 1) for start in range(0, size, chunk_size))
+        window = deque()
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            while ranges or window:
+                while ranges and len(window) < max_concurrency:
+                    window.append(executor.submit(self._get_range, s3_key, *ranges.popleft()))
+                chunk = window.popleft().result()
+                if callback:
+                    callback(len(chunk))
+                yield chunk
+
+    def _get_range(self, s3_key, start, end):
+        resp = s3_client.get_object(Bucket=self.bucket_name, Key=s3_key, Range=f'bytes={start}-{end}')
+        return resp['Body'].read()
+
+    def download_fileobj(self, s3_key, fileobj, callback=None):
+        size = 0
+        for chunk in self.iter_chunks(s3_key, callback=callback):
+            fileobj.write(chunk)
+            size += len(chunk)
+        return size
 
     def get_signed_url(self, s3_key, expiredin=86400, httpmethod=None):
         try:
@@ -87,3 +194,137 @@ class S3Bucket:
         else:
             keys = [obj.key for obj in s3_resource.Bucket(self.bucket_name).objects.all()]
         return keys
+
+
+class KeyExistenceCache:
+    """In-memory set of keys known to exist under prefetched prefixes, each prefix listing expires after a TTL."""
+
+    def __init__(self):
+        self.prefixes = {}
+        self.keys = set()
+        self._lock = threading.Lock()
+
+    def load(self, prefix, keys, ttl=DEFAULT_EXISTS_TTL):
+        with self._lock:
+            self.keys = {k for k in self.keys if not k.startswith(prefix)} | set(keys)
+            self.prefixes[prefix] = time.time() + ttl
+
+    def covers(self, key):
+        now = time.time()
+        with self._lock:
+            return any(key.startswith(p) and expires > now for p, expires in self.prefixes.items())
+
+    def contains(self, key):
+        with self._lock:
+            return key in self.keys
+
+    def set(self, key, is_existed):
+        with self._lock:
+            if is_existed:
+                self.keys.add(key)
+            else:
+                self.keys.discard(key)
+
+
+class TransferProgress:
+    """Thread-safe progress callback for boto3 transfers, prints every 10 percent."""
+
+    def __init__(self, label, total_size, step=10):
+        self.label = label
+        self.total_size = total_size
+        self.step = step
+        self.transferred = 0
+        self.reported = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, bytes_amount):
+        with self._lock:
+            self.transferred += bytes_amount
+            if not self.total_size:
+                return
+            percent = int(self.transferred * 100 / self.total_size)
+            if percent - self.reported >= self.step or (percent >= 100 and self.reported < 100):
+                self.reported = percent - percent % self.step if percent < 100 else 100
+                print(f'TRANSFERRED [{self.label}]: {self.reported}% OF [{self.total_size}] BYTES')
+
+
+class MultipartUploadWriter:
+    """Writable stream which uploads into S3 part by part while it is being written.
+
+    Parts are uploaded by background threads, at most "max_concurrency * 2" parts are
+    buffered in memory at the same time. Small payloads fall back to a single put_object.
+    """
+
+    def __init__(self, bucket_name, s3_key, part_size=8 * MB, max_concurrency=4):
+        self.bucket_name = bucket_name
+        self.s3_key = s3_key
+        self.part_size = max(MIN_PART_SIZE, int(part_size))
+        self.upload_id = None
+        self.buffer = bytearray()
+        self.size = 0
+        self.futures = []
+        self.slots = threading.BoundedSemaphore(max_concurrency * 2)
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    def write(self, blob):
+        self.buffer.extend(blob)
+        self.size += len(blob)
+        while len(self.buffer) >= self.part_size:
+            self._submit_part(bytes(self.buffer[:self.part_size]))
+            del self.buffer[:self.part_size]
+        return len(blob)
+
+    def _submit_part(self, data):
+        if not self.upload_id:
+            resp = s3_client.create_multipart_upload(Bucket=self.bucket_name, Key=self.s3_key)
+            self.upload_id = resp['UploadId']
+        part_number = len(self.futures) + 1
+        self.slots.acquire()
+        self.futures.append(self.executor.submit(self._upload_part, part_number, data))
+
+    def _upload_part(self, part_number, data):
+        try:
+            resp = s3_client.upload_part(
+                Bucket=self.bucket_name, Key=self.s3_key, UploadId=self.upload_id,
+                PartNumber=part_number, Body=data,
+            )
+            return {'PartNumber': part_number, 'ETag': resp['ETag']}
+        finally:
+            self.slots.release()
+
+    def close(self):
+        try:
+            if not self.upload_id:
+                s3_client.put_object(Bucket=self.bucket_name, Key=self.s3_key, Body=bytes(self.buffer))
+                return True
+            if self.buffer:
+                self._submit_part(bytes(self.buffer))
+                self.buffer = bytearray()
+            parts = [f.result() for f in self.futures]
+            s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name, Key=self.s3_key, UploadId=self.upload_id,
+                MultipartUpload={'Parts': parts},
+            )
+            print(f'DONE: UPLOADED [{self.size}] BYTES IN [{len(parts)}] PARTS TO [{self.s3_key}]')
+            return True
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self.executor.shutdown(wait=True)
+
+    def abort(self):
+        self.executor.shutdown(wait=True)
+        if self.upload_id:
+            s3_client.abort_multipart_upload(Bucket=self.bucket_name, Key=self.s3_key, UploadId=self.upload_id)
+            print(f'ABORTED MULTIPART UPLOAD TO [{self.s3_key}]')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+            return False
+        self.close()
+        return False
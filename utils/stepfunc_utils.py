@@ -15,7 +15,7 @@ sfn_client = settings.sfn_client
 logger = logging.getLogger(__name__)
 
 
-def render_specs(specs: dict) -> dict:
+def render_specs(specs: dict, snapshot=None) -> dict:
     specs['ro_name'] = iam_utils.get_role_full_name('ro-' + specs['name'])
     specs['role_arn'] = iam_utils.get_role_arn_by_name(specs['ro_name'])
     specs['po_name'] = iam_utils.get_policy_full_name('stepfunc-general')
@@ -24,11 +24,17 @@ def render_specs(specs: dict) -> dict:
     with open(specs['definition-path']) as f:
         raw = f.read()
     specs['definition'] = render_state_machine_expression(raw)
-    specs['machine'] = get_state_machine_by_name(specs['full_name'])
-    specs['arn'] = specs['machine'].get('stateMachineArn')
     specs['type'] = specs.get('type') or 'STANDARD'
     specs['log_group_name'] = cloudwatch_utils.get_stepfunc_log_group_name(specs['full_name'])
-    specs['log_group_info'] = cloudwatch_utils.get_log_group(specs['log_group_name'])
+    if snapshot is not None:
+        # ONLY DESCRIBE MACHINES THAT EXIST, LOG GROUPS ARE ALREADY LISTED IN BULK
+        exists = specs['full_name'] in snapshot.state_machines
+        specs['machine'] = get_state_machine_by_name(specs['full_name']) if exists else {}
+        specs['log_group_info'] = snapshot.log_groups.get(specs['log_group_name']) or {}
+    else:
+        specs['machine'] = get_state_machine_by_name(specs['full_name'])
+        specs['log_group_info'] = cloudwatch_utils.get_log_group(specs['log_group_name'])
+    specs['arn'] = specs['machine'].get('stateMachineArn')
     specs['log_group_arn'] = specs['log_group_info'].get('arn')
     return specs
 
@@ -55,6 +61,16 @@ def get_state_machine_by_name(name: str) -> dict:
     return step_func
 
 
+def list_state_machines_by_prefix(prefix: str) -> dict:
+    machine_map = {}
+    paginator = sfn_client.get_paginator('list_state_machines')
+    response_iterator = paginator.paginate()
+    for resp in response_iterator:
+        machine_map.update({x['name']: x for x in resp['stateMachines'] if x['name'].startswith(prefix)})
+    print(f'FOUND [{len(machine_map)}] STATE MACHINES BY PREFIX [{prefix}]')
+    return machine_map
+
+
 def render_state_machine_expression(expression: str) -> dict:
     ptn = re.compile(r'("FunctionName"\s?:\s?"([^"]+)")')
     funcs = ptn.findall(expression) or []
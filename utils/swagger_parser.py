@@ -1,17 +1,17 @@
 # FORK FROM: https://github.com/cyprieng/swagger-parser
 # import codecs
 import datetime
+from copy import deepcopy
 import hashlib
 # import jinja2
 import json
 import logging
+import os
 import re
 import six
 import sys
 import yaml
 
-from copy import deepcopy
-
 try:
     from StringIO import StringIO
 except ImportError:  # Python 3
@@ -19,6 +19,292 @@ except ImportError:  # Python 3
 
 from swagger_spec_validator.validator20 import validate_spec
 
+try:
+    from importlib.metadata import version as _get_version
+    _VALIDATOR_VERSION = _get_version('swagger-spec-validator')
+except Exception:  # pylint: disable=broad-except
+    _VALIDATOR_VERSION = ''
+
+
+class _SpecLoader(getattr(yaml, 'CSafeLoader', yaml.SafeLoader)):
+    """Safe YAML loader (libyaml when available) building JSON compatible data.
+
+    Mapping keys are strings (ex: unquoted response codes) and timestamps are kept as strings.
+    """
+
+
+def _construct_json_mapping(loader, node):
+    data = {}
+    yield data
+    mapping = loader.construct_mapping(node)
+    data.update((key if isinstance(key, six.string_types) else json.dumps(key), value)
+                for key, value in mapping.items())
+
+
+_SpecLoader.add_constructor('tag:yaml.org,2002:map', _construct_json_mapping)
+_SpecLoader.add_constructor('tag:yaml.org,2002:timestamp', yaml.SafeLoader.construct_yaml_str)
+
+
+def load_spec(content):
+    """Load a swagger YAML (or JSON) document.
+
+    Args:
+        content: the document, as a string, bytes or file.
+
+    Returns:
+        The specification dict.
+    """
+    return yaml.load(content, Loader=_SpecLoader)
+
+
+def validate_spec_cached(specification, content, cache_dir=None):
+    """Validate a swagger specification, unless a spec with the same content already passed.
+
+    The cache is opt-in. It is only trusted in a directory private to the current user
+    (created with 0700 when missing), and every marker holds the hash it stands for.
+
+    Args:
+        specification: swagger dict.
+        content: raw document the specification was loaded from (None to hash the dict).
+        cache_dir: directory of the validation cache (None to always validate).
+
+    Raises:
+        - SwaggerValidationError: if the specification is not valid (never cached).
+    """
+    if cache_dir is not None and not _is_private_dir(cache_dir):
+        logging.warning("the swagger validation cache is ignored, it is not private: {0}".format(cache_dir))
+        cache_dir = None
+    if cache_dir is None:
+        validate_spec(specification, '')
+        return
+    if content is None:
+        content = json.dumps(specification, sort_keys=True, default=str)
+    if isinstance(content, six.text_type):
+        content = content.encode('utf-8')
+    h = hashlib.sha256()
+    h.update(_VALIDATOR_VERSION.encode('utf-8'))
+    h.update(content)
+    digest = h.hexdigest()
+    cache_path = os.path.join(cache_dir, digest)
+    try:
+        with open(cache_path) as f:
+            if f.read() == digest:
+                return
+    except (IOError, OSError):
+        pass
+    validate_spec(specification, '')
+    try:
+        tmp_path = '{0}.{1}.tmp'.format(cache_path, os.getpid())
+        with open(tmp_path, 'w') as f:
+            f.write(digest)
+        os.replace(tmp_path, cache_path)
+    except (IOError, OSError) as e:
+        logging.warning("the swagger validation cache could not be written: {0}".format(e))
+
+
+def _is_private_dir(path):
+    """Create the directory (0700) if missing, then check nobody else can write into it."""
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        stat = os.stat(path)
+    except (IOError, OSError):
+        return False
+    if hasattr(os, 'getuid') and stat.st_uid != os.getuid():
+        return False
+    return not stat.st_mode & 0o022
+
+
+_PARAM_REGEX = re.compile('{([^/{}]*)}')
+_REF_REGEX = re.compile('#/definitions/(.*)')
+_INTEGER_REGEX = re.compile(r'\s*[+-]?\d+(?:_\d+)*\s*')  # What int() accepts, without raising on the rest
+_BOOLEAN_STRINGS = frozenset(['true', 'false'])
+
+
+def _is_integer(value):
+    if isinstance(value, six.string_types):
+        # We accept string with integer ex: '123'
+        return _INTEGER_REGEX.fullmatch(value) is not None
+    try:
+        int(value)
+        return True
+    except ValueError:
+        return isinstance(value, six.integer_types) and not isinstance(value, bool)
+
+
+def _is_number(value):
+    return isinstance(value, (six.integer_types, float)) and not isinstance(value, bool)
+
+
+def _is_string(value):
+    return isinstance(value, (six.text_type, six.string_types, datetime.datetime))
+
+
+def _is_boolean(value):
+    return (isinstance(value, bool) or
+            (isinstance(value, (six.text_type, six.string_types,)) and value.lower() in _BOOLEAN_STRINGS))
+
+
+def _accept(value):
+    return True
+
+
+def _reject(value):
+    return False
+
+
+_TYPE_CHECKS = {
+    'integer': _is_integer,
+    'number': _is_number,
+    'string': _is_string,
+    'boolean': _is_boolean,
+}
+
+
+def _get_type_check(type_def):
+    """Return the function checking a value against the given swagger type (rejecting unknown types)."""
+    if not isinstance(type_def, six.string_types):
+        return _reject
+    return _TYPE_CHECKS.get(type_def, _reject)
+
+
+def _check_column(param_spec, values):
+    """Check all the values of a parameter at once.
+
+    Args:
+        param_spec: specification of the parameter.
+        values: list of values of the parameter.
+
+    Returns:
+        A list of booleans, True for each valid value.
+    """
+    if param_spec.get('type') != 'array':
+        return list(map(_get_type_check(param_spec.get('type')), values))
+
+    # Check the items of all the arrays as one column
+    result = [isinstance(value, list) for value in values]
+    items = []
+    owners = []
+    for row, value in enumerate(values):
+        if result[row]:
+            items.extend(value)
+            owners.extend([row] * len(value))
+    for row, is_ok in zip(owners, _check_column(param_spec['items'], items)):
+        if not is_ok:
+            result[row] = False
+    return result
+
+
+class _RouteNode(object):
+    """A segment of the route trie."""
+
+    __slots__ = ('literals', 'templated', 'path_name')
+
+    def __init__(self):
+        self.literals = {}  # {segment: _RouteNode}
+        self.templated = {}  # {segment: (regex or None, param names, _RouteNode)}
+        self.path_name = None
+
+
+class DefinitionValidator(object):
+    """A definition compiled once: required keys as a set, and one check function per property.
+
+    References to other definitions are resolved to their validator at compile time.
+    """
+
+    __slots__ = ('name', 'required', 'properties')
+
+    def __init__(self, name):
+        self.name = name
+        self.required = frozenset()
+        self.properties = {}  # {property name: check(value) -> bool}
+
+    def validate(self, dict_to_test):
+        """Return True if the given dict match the definition, False otherwise."""
+        if not isinstance(dict_to_test, dict):
+            return False
+        if not self.required <= dict_to_test.keys():
+            return False
+        properties = self.properties
+        for key, value in dict_to_test.items():
+            if value is not None:
+                check = properties.get(key)
+                if check is None or not check(value):  # Extra arg or wrong type
+                    return False
+        return True
+
+    def validate_batch(self, dicts_to_test):
+        """Return a list of booleans, one per given dict."""
+        validate = self.validate
+        return [validate(x) for x in dicts_to_test]
+
+
+class RouteTrie(object):
+    """Segment trie of the path templates, built once so that matching a path is O(path depth).
+
+    Literal segments are tried first, then the templated ones ("{id}" or "{id}.json"),
+    backtracking when a branch does not lead to a complete template.
+    """
+
+    def __init__(self):
+        self.root = _RouteNode()
+
+    def add(self, path_name):
+        """Add a path template (ex: "/v1/users/{id}")."""
+        node = self.root
+        for segment in path_name.split('/'):
+            names = _PARAM_REGEX.findall(segment)
+            if not names:
+                node = node.literals.setdefault(segment, _RouteNode())
+                continue
+            if segment not in node.templated:
+                regex = None
+                if segment != u'{{{0}}}'.format(names[0]):
+                    parts = _PARAM_REGEX.split(segment)
+                    regex = re.compile(''.join(re.escape(x) if i % 2 == 0 else '([^/]*)' for i, x in enumerate(parts)))
+                node.templated[segment] = (regex, names, _RouteNode())
+            node = node.templated[segment][2]
+        node.path_name = path_name
+
+    def match(self, path):
+        """Match a request path.
+
+        Args:
+            path: path of the request (ex: "/v1/users/42").
+
+        Returns:
+            A tuple with the matched path template and a dict of the path parameters.
+            Or (None, None) if no template matches.
+        """
+        params = []
+        path_name = self._match(self.root, path.split('/'), 0, params)
+        if path_name is None:
+            return (None, None)
+        return (path_name, dict(params))
+
+    def _match(self, node, segments, index, params):
+        if index == len(segments):
+            return node.path_name
+        segment = segments[index]
+        child = node.literals.get(segment)
+        if child is not None:
+            path_name = self._match(child, segments, index + 1, params)
+            if path_name is not None:
+                return path_name
+        for regex, names, child in node.templated.values():
+            if regex is None:
+                values = (segment,)
+            else:
+                match = regex.fullmatch(segment)
+                if match is None:
+                    continue
+                values = match.groups()
+            params.extend(zip(names, values))
+            path_name = self._match(child, segments, index + 1, params)
+            if path_name is not None:
+                return path_name
+            del params[len(params) - len(names):]
+        return None
+
 
 class SwaggerParser(object):
     """Parse a swagger YAML file.
@@ -28,27 +314,34 @@ class SwaggerParser(object):
 
     Attributes:
         specification: dict of the yaml file.
-        definitions_example: dict of definition with an example.
+        definitions_example: dict of definition with an example (built on first access).
         paths: dict of path with their actions, parameters, and responses.
+        routes: RouteTrie of the paths, matching a request path to its template & path parameters.
     """
 
     _HTTP_VERBS = set(['get', 'put', 'post', 'delete', 'options', 'head', 'patch'])
 
-    def __init__(self, swagger_path=None, swagger_dict=None, swagger_yaml=None, use_example=True):
+    def __init__(self, swagger_path=None, swagger_dict=None, swagger_yaml=None, use_example=True,
+                 validation_cache_dir=None):
         """Run parsing from either a file or a dict.
 
         Args:
             swagger_path: path of the swagger file.
             swagger_dict: swagger dict.
+            swagger_yaml: swagger YAML (or JSON) string.
             use_example: Define if we use the example from the YAML when we
                          build definitions example (False value can be useful
                          when making test. Problem can happen if set to True, eg
                          POST {'id': 'example'}, GET /string => 404).
+            validation_cache_dir: private directory recording the specs which passed the validation,
+                                  so that an unchanged spec is only validated once (None, the default, to
+                                  always validate).
 
         Raises:
             - ValueError: if no swagger_path or swagger_dict is specified.
                           Or if the given swagger is not valid.
         """
+        content = None
         try:
             if swagger_path is not None:
                 # Open yaml file
@@ -57,20 +350,17 @@ class SwaggerParser(object):
                 #     swagger_template = swagger_yaml.read()
                 #     swagger_string = jinja2.Template(swagger_template).render(**arguments)
                 #     self.specification = yaml.safe_load(swagger_string)
-                with open(swagger_path, "r") as f:
-                    try:
-                        self.specification = yaml.safe_load(f)
-                    except yaml.YAMLError as exc:
-                        print(exc)
+                with open(swagger_path, "rb") as f:
+                    content = f.read()
+                self.specification = load_spec(content)
             elif swagger_yaml is not None:
-                json_ = yaml.safe_load(swagger_yaml)
-                json_string = json.dumps(json_)
-                self.specification = json.loads(json_string)
+                content = swagger_yaml
+                self.specification = load_spec(content)
             elif swagger_dict is not None:
                 self.specification = swagger_dict
             else:
                 raise ValueError('You must specify a swagger_path or dict')
-            validate_spec(self.specification, '')
+            validate_spec_cached(self.specification, content, validation_cache_dir)
         except Exception as e:
             six.reraise(
                 ValueError,
@@ -80,17 +370,95 @@ class SwaggerParser(object):
         # Run parsing
         self.use_example = use_example
         self.base_path = self.specification.get('basePath', '')
-        self.definitions_example = {}
-        self.build_definitions_example()
+        self.validators = {}
+        self._definitions_by_property = {}
+        self.compile_definitions()
+        self._definitions_example = {}  # Built on demand, one definition at a time
+        self._all_examples_built = False
+        self._building = set()  # Definitions whose example is being built
+        self._prop_examples = {}  # {(id(prop_spec), from_allof): (prop_spec, example)}
         self.paths = {}
+        self.routes = RouteTrie()
         self.operation = {}
         self.generated_operation = {}
         self.get_paths_data()
 
+    def compile_definitions(self):
+        """Compile every definition of the swagger specification into a DefinitionValidator."""
+        definitions = self.specification.get('definitions', {})
+        # Create all the validators first, so that the references (even recursive ones) can be resolved
+        for def_name in definitions.keys():
+            self.validators[def_name] = DefinitionValidator(def_name)
+        for def_name, def_spec in definitions.items():
+            self._compile_definition(def_spec, self.validators[def_name])
+            for prop_name in self.validators[def_name].properties.keys():
+                self._definitions_by_property.setdefault(prop_name, set()).add(def_name)
+
+    def _compile_definition(self, def_spec, validator):
+        """Fill the given validator from the definition specification.
+
+        Args:
+            def_spec: specification of the definition.
+            validator: DefinitionValidator to fill.
+
+        Returns:
+            The validator.
+        """
+        validator.required = frozenset(def_spec.get('required', []))
+        validator.properties = dict(
+            (prop_name, self._compile_property(prop_spec))
+            for prop_name, prop_spec in def_spec.get('properties', {}).items())
+        return validator
+
+    def _compile_property(self, properties_spec):
+        """Compile a property specification into a check function.
+
+        Args:
+            properties_spec: specification of the property (From definition not route).
+
+        Returns:
+            A function taking a value and returning True if it is valid for the given spec.
+        """
+        if 'type' not in properties_spec.keys():
+            # Sub definition
+            if '$ref' not in properties_spec:
+                return _accept
+            validator = self.validators.get(self.get_definition_name_from_ref(properties_spec['$ref']))
+            return validator.validate if validator is not None else _reject
+
+        if properties_spec['type'] != 'array':  # Classic types
+            return _get_type_check(properties_spec['type'])
+
+        items_spec = properties_spec.get('items', {})
+        if 'type' in items_spec.keys():
+            check_item = _get_type_check(items_spec['type'])
+        elif '$ref' in items_spec.keys():
+            validator = self.validators.get(self.get_definition_name_from_ref(items_spec['$ref']))
+            check_item = validator.validate if validator is not None else _reject
+        else:
+            check_item = _accept
+
+        def check_array(value):
+            return isinstance(value, list) and all(check_item(item) for item in value)
+        return check_array
+
+    @property
+    def definitions_example(self):
+        """Dict of definition with an example, all of them are built on the first access."""
+        if not self._all_examples_built:
+            self.build_definitions_example()
+        return self._definitions_example
+
     def build_definitions_example(self):
         """Parse all definitions in the swagger specification."""
         for def_name, def_spec in self.specification.get('definitions', {}).items():
             self.build_one_definition_example(def_name)
+        self._all_examples_built = True
+
+    def _get_definition_example(self, def_name):
+        """Return the (shared) example of one definition, building only this one if needed."""
+        self.build_one_definition_example(def_name)
+        return self._definitions_example[def_name]
 
     def build_one_definition_example(self, def_name):
         """Build the example for the given definition.
@@ -101,29 +469,36 @@ class SwaggerParser(object):
         Returns:
             True if the example has been created, False if an error occured.
         """
-        if def_name in self.definitions_example.keys():  # Already processed
+        if def_name in self._definitions_example:  # Already processed
             return True
-        elif def_name not in self.specification['definitions'].keys():  # Def does not exist
+        elif def_name not in self.specification.get('definitions', {}).keys():  # Def does not exist
             return False
 
-        self.definitions_example[def_name] = {}
+        self._building.add(def_name)
+        try:
+            return self._build_one_definition_example(def_name)
+        finally:
+            self._building.discard(def_name)
+
+    def _build_one_definition_example(self, def_name):
+        self._definitions_example[def_name] = {}
         def_spec = self.specification['definitions'][def_name]
 
         if def_spec.get('type') == 'array' and 'items' in def_spec:
-            item = self.get_example_from_prop_spec(def_spec['items'])
-            self.definitions_example[def_name] = [item]
+            item = self._get_shared_example(def_spec['items'])
+            self._definitions_example[def_name] = [item]
             return True
 
         if 'properties' not in def_spec:
-            self.definitions_example[def_name] = self.get_example_from_prop_spec(def_spec)
+            self._definitions_example[def_name] = self._get_shared_example(def_spec)
             return True
 
         # Get properties example value
         for prop_name, prop_spec in def_spec['properties'].items():
-            example = self.get_example_from_prop_spec(prop_spec)
+            example = self._get_shared_example(prop_spec)
             if example is None:
                 return False
-            self.definitions_example[def_name][prop_name] = example
+            self._definitions_example[def_name][prop_name] = example
 
         return True
 
@@ -138,24 +513,7 @@ class SwaggerParser(object):
         Returns:
             True if the type is correct, False otherwise.
         """
-        if type_def == 'integer':
-            try:
-                # We accept string with integer ex: '123'
-                int(value)
-                return True
-            except ValueError:
-                return isinstance(value, six.integer_types) and not isinstance(value, bool)
-        elif type_def == 'number':
-            return isinstance(value, (six.integer_types, float)) and not isinstance(value, bool)
-        elif type_def == 'string':
-            return isinstance(value, (six.text_type, six.string_types, datetime.datetime))
-        elif type_def == 'boolean':
-            return (isinstance(value, bool) or
-                    (isinstance(value, (six.text_type, six.string_types,)) and
-                     value.lower() in ['true', 'false'])
-                    )
-        else:
-            return False
+        return _get_type_check(type_def)(value)
 
     def get_example_from_prop_spec(self, prop_spec, from_allof=False):
         """Return an example value from a property specification.
@@ -168,6 +526,21 @@ class SwaggerParser(object):
         Returns:
             An example value
         """
+        return deepcopy(self._get_shared_example(prop_spec, from_allof))
+
+    def _get_shared_example(self, prop_spec, from_allof=False):
+        """Same as get_example_from_prop_spec, but the example is shared between the calls: never modify it."""
+        # Examples depending on a definition being built are partial: they are not memoized
+        key = (id(prop_spec), from_allof)
+        if key in self._prop_examples:
+            return self._prop_examples[key][1]
+        example = self._get_example_from_prop_spec(prop_spec, from_allof)
+        if not self._building and prop_spec.get('type') != 'file':
+            # Keep a reference to prop_spec, so that its id is not reused
+            self._prop_examples[key] = (prop_spec, example)
+        return example
+
+    def _get_example_from_prop_spec(self, prop_spec, from_allof=False):
         # Read example directly from (X-)Example or Default value
         easy_keys = ['example', 'x-example', 'default']
         for key in easy_keys:
@@ -218,38 +591,35 @@ class SwaggerParser(object):
             An example for the given spec
             A boolean, whether we had additionalProperties in the spec, or not
         """
-        local_spec = deepcopy(spec)
+        properties = spec.get('properties')
+        required = spec.get('required')
 
         # Handle additionalProperties if they exist
-        # we replace additionalProperties with two concrete
-        # properties so that examples can be generated
+        # we add two concrete properties for additionalProperties
+        # so that examples can be generated (without modifying the spec)
         additional_property = False
-        if 'additionalProperties' in local_spec:
+        if 'additionalProperties' in spec:
             additional_property = True
-            if 'properties' not in local_spec:
-                local_spec['properties'] = {}
-
-            if isinstance(local_spec['additionalProperties'], bool):
-                local_spec['additionalProperties'] = {}
-
-            local_spec['properties'].update({
-                'any_prop1': local_spec['additionalProperties'],
-                'any_prop2': local_spec['additionalProperties'],
+            additional_spec = spec['additionalProperties']
+            if isinstance(additional_spec, bool):
+                additional_spec = {}
+
+            properties = dict(properties or {})
+            properties.update({
+                'any_prop1': additional_spec,
+                'any_prop2': additional_spec,
             })
-            del(local_spec['additionalProperties'])
-            required = local_spec.get('required', [])
-            required += ['any_prop1', 'any_prop2']
-            local_spec['required'] = required
+            required = list(required or []) + ['any_prop1', 'any_prop2']
 
         example = {}
-        properties = local_spec.get('properties')
         if properties is not None:
-            required = local_spec.get('required', properties.keys())
+            if required is None:
+                required = properties.keys()
 
             for inner_name, inner_spec in properties.items():
                 if inner_name not in required:
                     continue
-                partial = self.get_example_from_prop_spec(inner_spec)
+                partial = self._get_shared_example(inner_spec)
                 # While get_example_from_prop_spec is supposed to return a list,
                 # we don't actually want that when recursing to build from
                 # properties
@@ -333,7 +703,7 @@ class SwaggerParser(object):
         """
         example_dict = {}
         for definition in prop_spec['allOf']:
-            update = self.get_example_from_prop_spec(definition, True)
+            update = self._get_shared_example(definition, True)
             example_dict.update(update)
         return example_dict
 
@@ -350,11 +720,11 @@ class SwaggerParser(object):
         definition_name = self.get_definition_name_from_ref(prop_spec['$ref'])
 
         if self.build_one_definition_example(definition_name):
-            example_dict = self.definitions_example[definition_name]
-            if not isinstance(example_dict, dict):
+            example_dict = self._definitions_example[definition_name]
+            if not isinstance(example_dict, dict) or definition_name not in self._building:
                 return example_dict
-            example = dict((example_name, example_value) for example_name, example_value in example_dict.items())
-            return example
+            # Recursive definition: copy the partial example, it must not contain itself
+            return dict(example_dict)
 
     def _example_from_complex_def(self, prop_spec):
         """Get an example from a property specification.
@@ -372,7 +742,7 @@ class SwaggerParser(object):
         elif 'type' not in prop_spec['schema']:
             definition_name = self.get_definition_name_from_ref(prop_spec['schema']['$ref'])
             if self.build_one_definition_example(definition_name):
-                return self.definitions_example[definition_name]
+                return self._definitions_example[definition_name]
         elif prop_spec['schema']['type'] == 'array':  # Array with definition
             # Get value from definition
             if 'items' in prop_spec.keys():
@@ -383,9 +753,9 @@ class SwaggerParser(object):
                 else:
                     definition_name = self.get_definition_name_from_ref(prop_spec['schema']['items']['type'])
                     return [definition_name]
-            return [self.definitions_example[definition_name]]
+            return [self._get_definition_example(definition_name)]
         else:
-            return self.get_example_from_prop_spec(prop_spec['schema'])
+            return self._get_shared_example(prop_spec['schema'])
 
     def _example_from_array_spec(self, prop_spec):
         """Get an example from a property specification of an array.
@@ -398,7 +768,7 @@ class SwaggerParser(object):
         """
         # if items is a list, then each item has its own spec
         if isinstance(prop_spec['items'], list):
-            return [self.get_example_from_prop_spec(item_prop_spec) for item_prop_spec in prop_spec['items']]
+            return [self._get_shared_example(item_prop_spec) for item_prop_spec in prop_spec['items']]
         # Standard types in array
         elif 'type' in prop_spec['items'].keys():
             if 'format' in prop_spec['items'].keys() and prop_spec['items']['format'] == 'date-time':
@@ -413,7 +783,7 @@ class SwaggerParser(object):
             definition_name = self.get_definition_name_from_ref(prop_spec['items']['$ref']) or \
                 self.get_definition_name_from_ref(prop_spec['schema']['items']['$ref'])
             if self.build_one_definition_example(definition_name):
-                example_dict = self.definitions_example[definition_name]
+                example_dict = self._definitions_example[definition_name]
                 if not isinstance(example_dict, dict):
                     return [example_dict]
                 if len(example_dict) == 1:
@@ -431,7 +801,7 @@ class SwaggerParser(object):
         elif 'properties' in prop_spec['items']:
             prop_example = {}
             for prop_name, prop_spec in prop_spec['items']['properties'].items():
-                example = self.get_example_from_prop_spec(prop_spec)
+                example = self._get_shared_example(prop_spec)
                 if example is not None:
                     prop_example[prop_name] = example
             return [prop_example]
@@ -448,9 +818,20 @@ class SwaggerParser(object):
             The definition name or None if the dict does not match any definition.
             If get_list is True, return a list of definition_name.
         """
+        # Only the definitions having all the (non None) keys of the dict as properties can match
+        candidates = None
+        for key, value in dict.items():
+            if value is not None:
+                names = self._definitions_by_property.get(key, set())
+                candidates = names if candidates is None else candidates & names
+                if not candidates:
+                    break
+
         list_def_candidate = []
-        for definition_name in self.specification['definitions'].keys():
-            if self.validate_definition(definition_name, dict):
+        for definition_name, validator in self.validators.items():
+            if candidates is not None and definition_name not in candidates:
+                continue
+            if validator.validate(dict):
                 if not get_list:
                     return definition_name
                 list_def_candidate.append(definition_name)
@@ -482,17 +863,13 @@ class SwaggerParser(object):
         # dict
         if isinstance(first_value, dict):
             # try to find a definition for that first value
-            definition = None
             definition_name = self.get_dict_definition(first_value)
             if definition_name is None:
-                definition = self._definition_from_example(first_value)
-                definition_name = 'self generated'
-            for item in response.values():
-                if not self.validate_definition(definition_name,
-                                                item,
-                                                definition=definition):
-                    return False
-            return True
+                validator = self._compile_definition(self._definition_from_example(first_value),
+                                                     DefinitionValidator('self generated'))
+            else:
+                validator = self.validators[definition_name]
+            return all(validator.validate(item) for item in response.values())
 
         # TODO: list
         if isinstance(first_value, list):
@@ -517,28 +894,29 @@ class SwaggerParser(object):
         Returns:
             True if the given dict match the definition, False otherwise.
         """
-        if (definition_name not in self.specification['definitions'].keys() and
-                definition is None):
+        if definition is not None:
+            validator = self._compile_definition(definition, DefinitionValidator(definition_name))
+        else:
+            validator = self.validators.get(definition_name)
+        if validator is None:
             # reject unknown definition
             return False
+        return validator.validate(dict_to_test)
 
-        # Check all required in dict_to_test
-        spec_def = definition or self.specification['definitions'][definition_name]
-        all_required_keys_present = all(req in dict_to_test.keys() for req in spec_def.get('required', {}))
-        if 'required' in spec_def and not all_required_keys_present:
-            return False
+    def validate_definition_batch(self, definition_name, dicts_to_test):
+        """Validate a list of dicts according to the given definition, in one call.
 
-        # Check no extra arg & type
-        properties_dict = spec_def.get('properties', {})
-        for key, value in dict_to_test.items():
-            if value is not None:
-                if key not in properties_dict:  # Extra arg
-                    return False
-                else:  # Check type
-                    if not self._validate_type(properties_dict[key], value):
-                        return False
+        Args:
+            definition_name: name of the the definition.
+            dicts_to_test: list of dicts to test.
 
-        return True
+        Returns:
+            A list of booleans: True for each dict matching the definition, False otherwise.
+        """
+        validator = self.validators.get(definition_name)
+        if validator is None:
+            return [False] * len(dicts_to_test)
+        return validator.validate_batch(dicts_to_test)
 
     def _validate_type(self, properties_spec, value):
         """Validate the given value with the given property spec.
@@ -550,31 +928,7 @@ class SwaggerParser(object):
         Returns:
             True if the value is valid for the given spec.
         """
-        if 'type' not in properties_spec.keys():
-            # Validate sub definition
-            def_name = self.get_definition_name_from_ref(properties_spec['$ref'])
-            return self.validate_definition(def_name, value)
-
-        # Validate array
-        elif properties_spec['type'] == 'array':
-            if not isinstance(value, list):
-                return False
-
-            # Check type
-            if ('type' in properties_spec['items'].keys() and
-                    any(not self.check_type(item, properties_spec['items']['type']) for item in value)):
-                return False
-            # Check ref
-            elif ('$ref' in properties_spec['items'].keys()):
-                def_name = self.get_definition_name_from_ref(properties_spec['items']['$ref'])
-                if any(not self.validate_definition(def_name, item) for item in value):
-                    return False
-
-        else:  # Classic types
-            if not self.check_type(value, properties_spec['type']):
-                return False
-
-        return True
+        return self._compile_property(properties_spec)(value)
 
     def get_paths_data(self):
         """Get data for each paths in the swagger specification.
@@ -584,6 +938,7 @@ class SwaggerParser(object):
         for path, path_spec in self.specification['paths'].items():
             path = u'{0}{1}'.format(self.base_path, path)
             self.paths[path] = {}
+            self.routes.add(path)
 
             # Add path-level parameters
             default_parameters = {}
@@ -644,8 +999,7 @@ class SwaggerParser(object):
         Returns:
             The definition name corresponding to the ref.
         """
-        p = re.compile('#/definitions/(.*)')
-        definition_name = re.sub(p, r'\1', ref)
+        definition_name = _REF_REGEX.sub(r'\1', ref)
         return definition_name
 
     def get_path_spec(self, path, action=None):
@@ -660,20 +1014,8 @@ class SwaggerParser(object):
             Or (None, None) if no specification is found.
         """
         # Get the specification of the given path
-        path_spec = None
-        path_name = None
-        for base_path in self.paths.keys():
-            if path == base_path:
-                path_spec = self.paths[base_path]
-                path_name = base_path
-
-        # Path parameter
-        if path_spec is None:
-            for base_path in self.paths.keys():
-                regex_from_path = re.compile(re.sub('{[^/]*}', '([^/]*)', base_path) + r'$')
-                if re.match(regex_from_path, path):
-                    path_spec = self.paths[base_path]
-                    path_name = base_path
+        path_name = self.routes.match(path)[0]
+        path_spec = self.paths[path_name] if path_name is not None else None
 
         # Test action if given
         if path_spec is not None and action is not None:
@@ -784,6 +1126,40 @@ class SwaggerParser(object):
             return False
         return True
 
+    def validate_query_batch(self, path, action, queries):
+        """Check the query parameters of many requests to the same operation, column by column.
+
+        The values are grouped per parameter, and each column is type-checked at once.
+        The result for each query is the same as _validate_query_parameters would give.
+
+        Args:
+            path: path of the requests.
+            action: action of the requests (get, post, delete...).
+            queries: list of dicts with the query parameters.
+
+        Returns:
+            A list of booleans (the validity mask): True for each valid query, False otherwise.
+        """
+        path_spec = self.get_path_spec(path, action)[1]
+        if path_spec is None:  # reject unknown path or http method
+            return [False] * len(queries)
+
+        mask = [True] * len(queries)
+        for param_name, param_spec in path_spec['parameters'].items():
+            required = param_spec['in'] == 'query' and param_spec.get('required')
+            rows = []
+            values = []
+            for row, query in enumerate(queries):
+                if param_name in query:
+                    rows.append(row)
+                    values.append(query[param_name])
+                elif required:
+                    mask[row] = False
+            for row, is_ok in zip(rows, _check_column(param_spec, values)):
+                if not is_ok:
+                    mask[row] = False
+        return mask
+
     def _validate_body_parameters(self, body, action_spec):
         """Check the body parameter for the action specification.
 
@@ -838,7 +1214,7 @@ class SwaggerParser(object):
         if 'schema' in resp_spec.keys():
             if '$ref' in resp_spec['schema']:  # Standard definition
                 definition_name = self.get_definition_name_from_ref(resp_spec['schema']['$ref'])
-                return self.definitions_example[definition_name]
+                return deepcopy(self._get_definition_example(definition_name))
             elif 'items' in resp_spec['schema'] and resp_spec['schema']['type'] == 'array':  # Array
                 if '$ref' in resp_spec['schema']['items']:
                     definition_name = self.get_definition_name_from_ref(resp_spec['schema']['items']['$ref'])
@@ -849,7 +1225,7 @@ class SwaggerParser(object):
                     else:
                         logging.warn("No item type in: " + resp_spec['schema'])
                         return ''
-                return [self.definitions_example[definition_name]]
+                return [deepcopy(self._get_definition_example(definition_name))]
             elif 'type' in resp_spec['schema']:
                 return self.get_example_from_prop_spec(resp_spec['schema'])
         else:
@@ -911,7 +1287,7 @@ class SwaggerParser(object):
                             if '$ref' in spec['schema']['items']:
                                 definition_name = self.get_definition_name_from_ref(spec['schema']
                                                                                     ['items']['$ref'])
-                                return [self.definitions_example[definition_name]]
+                                return [deepcopy(self._get_definition_example(definition_name))]
                             else:
                                 definition_name = self.get_definition_name_from_ref(spec['schema']
                                                                                     ['items']['type'])
@@ -922,7 +1298,7 @@ class SwaggerParser(object):
                         else:
                             # Get value from definition
                             definition_name = self.get_definition_name_from_ref(spec['schema']['$ref'])
-                            return self.definitions_example[definition_name]
+                            return deepcopy(self._get_definition_example(definition_name))
 
 
 def _validate_post_body(actual_request_body, body_specification):
@@ -0,0 +1,188 @@
+"""
+Client-side rate limiting for the AWS control-plane APIs: one token bucket per (service, operation group),
+seeded with the documented quotas, hooked into every boto3 client of the registry via botocore events.
+
+    before-send -> take a token (every attempt, including botocore's own retries)
+    needs-retry -> a throttled response halves the rate of the bucket, a success raises it back step by step
+
+So parallel deploys run close to the maximum rate AWS accepts, and throttles are counted per operation.
+REF: https://docs.aws.amazon.com/lambda/latest/dg/gettingstarted-limits.html#api-requests
+REF: https://docs.aws.amazon.com/apigateway/latest/developerguide/limits.html#api-gateway-control-service-limits-table
+REF: https://docs.aws.amazon.com/step-functions/latest/dg/service-quotas.html#service-limits-api-action-throttling-general
+REF: https://botocore.amazonaws.com/v1/documentation/api/latest/topics/events.html
+"""  # NOQA
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_ERRORS = [
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'TooManyRequestsException',
+    'RequestLimitExceeded',
+    'RequestThrottled',
+    'SlowDown',
+]
+# {SERVICE: {OPERATION | '*': (REQUESTS PER SECOND, BURST)}}, '*' IS SHARED BY ALL OTHER OPERATIONS OF THE SERVICE
+RATE_LIMITS = {
+    'lambda': {
+        '*': (15, 15),  # CONTROL PLANE (EXCLUDES INVOCATION, GetFunction AND GetPolicy)
+        'GetFunction': (100, 100),
+        'GetPolicy': (15, 15),
+        'Invoke': None,
+    },
+    'apigateway': {
+        '*': (10, 40),
+        'CreateDeployment': (0.2, 1),
+        'CreateRestApi': (0.05, 1),
+        'ImportRestApi': (0.05, 1),
+        'PutRestApi': (1, 1),
+        'DeleteRestApi': (0.03, 1),
+        'CreateResource': (5, 5),
+        'DeleteResource': (5, 5),
+        'UpdateStage': (5, 5),
+        'GetResources': (5, 5),
+    },
+    'apigatewayv2': {
+        '*': (10, 40),
+    },
+    'stepfunctions': {
+        '*': (5, 100),
+        'CreateStateMachine': (1, 100),
+        'UpdateStateMachine': (1, 200),
+        'DeleteStateMachine': (1, 100),
+        'DescribeStateMachine': (20, 200),
+        'ListStateMachines': (5, 100),
+    },
+    'iam': {
+        '*': (10, 20),
+    },
+    'events': {
+        '*': (50, 50),
+    },
+    'logs': {
+        '*': (5, 10),
+        'DescribeLogGroups': (10, 10),
+    },
+}
+MIN_RATE_RATIO = 0.05  # A BUCKET NEVER GOES BELOW 5% OF ITS SEED RATE
+RECOVERY_RATIO = 0.05  # EVERY SUCCESS ADDS 5% OF THE SEED RATE BACK
+_LIMITER = {}
+_LIMITER_LOCK = threading.Lock()
+
+
+class TokenBucket:
+    """Token bucket whose rate adapts: multiplicative decrease on throttles, additive increase on success."""
+
+    def __init__(self, rate: float, burst: float):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def acquire(self) -> float:
+        """Take one token, sleep until one is available, return the seconds waited."""
+        waited = 0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def on_throttle(self):
+        with self._lock:
+            self.rate = max(self.max_rate * MIN_RATE_RATIO, self.rate / 2)
+            self.tokens = min(self.tokens, 0)
+
+    def on_success(self):
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * RECOVERY_RATIO)
+
+
+class RateLimiter:
+    """Shared token buckets & throttle metrics for all clients, see "register"."""
+
+    def __init__(self, limits: dict = None):
+        self.limits = limits if limits is not None else RATE_LIMITS
+        self.buckets = {}  # {(SERVICE, OPERATION | '*'): TokenBucket}
+        self.metrics = {}  # {(SERVICE, OPERATION): {'calls', 'throttles', 'waited'}}
+        self._lock = threading.Lock()
+
+    def get_bucket(self, service: str, operation: str):
+        limits = self.limits.get(service) or {}
+        key = operation if operation in limits else '*'
+        if not limits.get(key):
+            return None
+        with self._lock:
+            if (service, key) not in self.buckets:
+                self.buckets[(service, key)] = TokenBucket(*limits[key])
+            return self.buckets[(service, key)]
+
+    def record(self, service: str, operation: str, name: str, value: float = 1):
+        with self._lock:
+            metrics = self.metrics.setdefault((service, operation), {'calls': 0, 'throttles': 0, 'waited': 0})
+            metrics[name] += value
+
+    def register(self, client):
+        """Hook a boto3 client (ClientRegistry calls it for every client it creates)."""
+        service = client.meta.service_model.service_name
+        if service not in self.limits:
+            return
+        client.meta.events.register('before-send', self._make_before_send(service))
+        client.meta.events.register('needs-retry', self._make_needs_retry(service))
+
+    def _make_before_send(self, service: str):
+        def before_send(event_name, **kwargs):
+            operation = event_name.rsplit('.', 1)[-1]
+            bucket = self.get_bucket(service, operation)
+            if bucket is None:
+                return
+            waited = bucket.acquire()
+            self.record(service, operation, 'calls')
+            if waited:
+                self.record(service, operation, 'waited', waited)
+        return before_send
+
+    def _make_needs_retry(self, service: str):
+        def needs_retry(operation, response=None, **kwargs):
+            bucket = self.get_bucket(service, operation.name)
+            if bucket is None or response is None:
+                return
+            code = response[1].get('Error', {}).get('Code')
+            if code in THROTTLE_ERRORS:
+                logger.info('THROTTLED: %s.%s (%s)', service, operation.name, code)
+                self.record(service, operation.name, 'throttles')
+                bucket.on_throttle()
+            elif response[0].status_code < 300:
+                bucket.on_success()
+        return needs_retry
+
+    def report(self, force: bool = False):
+        throttled = {k: v for k, v in self.metrics.items() if v['throttles']}
+        if not (throttled or force):
+            return
+        print('AWS API RATE LIMITS (CALLS / THROTTLES / SECONDS WAITED):')
+        for (service, operation), m in sorted(self.metrics.items()):
+            if force or m['throttles'] or m['waited'] >= 1:
+                print(f'\t{service}.{operation}: {m["calls"]} / {m["throttles"]} / {round(m["waited"], 1)}')
+
+
+def get_rate_limiter() -> RateLimiter:
+    with _LIMITER_LOCK:
+        if 'limiter' not in _LIMITER:
+            _LIMITER['limiter'] = RateLimiter()
+        return _LIMITER['limiter']